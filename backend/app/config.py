@@ -8,14 +8,14 @@ load_dotenv()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Thư mục Data (Chứa DB SQLite, log...)
-DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(BASE_DIR, "data"))
 
 # --- QUAN TRỌNG: CẤU HÌNH ĐƯỜNG DẪN ẢNH ---
 
 # 1. Ảnh Static (Logo, Background, và Ảnh Nhân viên cũ)
 # URL truy cập sẽ là: /static/images/...
 STATIC_DIR = os.path.join(BASE_DIR, "static")
-EMPLOYEE_IMAGES_DIR = os.path.join(STATIC_DIR, "images")
+EMPLOYEE_IMAGES_DIR = os.getenv("EMPLOYEE_IMAGES_DIR", os.path.join(STATIC_DIR, "images"))
 
 # 2. Ảnh Upload (Dành cho Ticket và các file người dùng đẩy lên sau này)
 # Đổi tên folder 'images' gốc thành 'uploads' để không nhầm với 'static/images'
@@ -29,11 +29,83 @@ EMPLOYEES_FILE = os.path.join(DATA_DIR, "source.json")
 BACKUP_FILE = os.path.join(DATA_DIR, "employees_backup.json")
 LOG_FILE = os.path.join(DATA_DIR, "print_logs.json")
 
+# Snapshot HR dùng chung giữa các worker (SQLite, ghi atomic)
+HR_SNAPSHOT_DB = os.path.join(DATA_DIR, "hr_snapshot.db")
+
 # --- 2. CẤU HÌNH SERVER ---
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
 HR_API_URL = os.getenv("HR_API_URL", "http://113.160.232.187:81/pidn/api/gwhrWebService.asmx/GetEmployeeList")
 
+# Cache dữ liệu HR (Stale-While-Revalidate)
+# - HR_CACHE_TTL: quá thời gian này thì làm mới ngầm, nhưng vẫn trả dữ liệu cũ ngay
+# - HR_CACHE_HARD_EXPIRY: quá thời gian này thì KHÔNG dùng dữ liệu cũ nữa, phải chờ HR
+# - HR_REFRESH_RETRY_INTERVAL: sau 1 lần gọi HR thất bại, chờ bấy nhiêu giây mới thử lại
+HR_CACHE_TTL = int(os.getenv("HR_CACHE_TTL", 300))
+HR_CACHE_HARD_EXPIRY = int(os.getenv("HR_CACHE_HARD_EXPIRY", 3600))
+HR_REFRESH_RETRY_INTERVAL = int(os.getenv("HR_REFRESH_RETRY_INTERVAL", 30))
+
+# Client HR dùng chung (app/services/hr_service.py)
+# - HR_TIMEOUT_BUDGET: tổng thời gian tối đa cho 1 lượt lấy dữ liệu (gồm cả các lần retry)
+# - HR_MAX_RETRIES: số lần thử lại khi lỗi mạng / HTTP 5xx
+# - Lỗi liên tiếp HR_CIRCUIT_FAILURE_THRESHOLD lần -> ngắt mạch HR_CIRCUIT_RESET_SECONDS giây
+HR_TIMEOUT_BUDGET = float(os.getenv("HR_TIMEOUT_BUDGET", 15))
+HR_CONNECT_TIMEOUT = float(os.getenv("HR_CONNECT_TIMEOUT", 5))
+HR_MAX_RETRIES = int(os.getenv("HR_MAX_RETRIES", 2))
+HR_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HR_CIRCUIT_FAILURE_THRESHOLD", 3))
+HR_CIRCUIT_RESET_SECONDS = float(os.getenv("HR_CIRCUIT_RESET_SECONDS", 30))
+
+# Xử lý ảnh nhân viên (decode / xoay / encode chạy trong process pool riêng)
+# - PHOTO_WORKERS: số process xử lý ảnh song song
+# - PHOTO_MAX_PIXELS: ảnh giải mã ra nhiều pixel hơn mức này thì từ chối (chống ảnh "bom")
+# - PHOTO_MAX_SIDE: cạnh dài tối đa của ảnh lưu (JPEG được giải mã thu nhỏ luôn bằng draft mode).
+#   Ảnh thẻ 3x4 cm in 600 dpi chỉ cần ~710x945 px -> 1200 px là đủ cả khi cắt lại khung
+# - PHOTO_ENCODING_PROFILE: định dạng lưu ảnh (xem ENCODING_PROFILES trong app/services/photo_service.py):
+#   png_fast | png_optimized | webp_lossless | jpeg_hq
+# - PHOTO_MAX_UPLOAD_BYTES: dung lượng tối đa 1 file upload (khớp client_max_body_size của nginx)
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+PHOTO_MAX_PIXELS = int(os.getenv("PHOTO_MAX_PIXELS", 40_000_000))
+PHOTO_MAX_SIDE = int(os.getenv("PHOTO_MAX_SIDE", 1200))
+PHOTO_ENCODING_PROFILE = os.getenv("PHOTO_ENCODING_PROFILE", "png_fast")
+PHOTO_MAX_UPLOAD_BYTES = int(os.getenv("PHOTO_MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+
+# Nhập ảnh hàng loạt từ 1 file ZIP (POST /api/upload-zip)
+# - PHOTO_ZIP_MAX_BYTES: dung lượng tối đa file ZIP (khớp client_max_body_size của location nginx)
+# - Mỗi ảnh trong ZIP vẫn bị giới hạn bởi PHOTO_MAX_UPLOAD_BYTES (sau giải nén)
+PHOTO_ZIP_MAX_BYTES = int(os.getenv("PHOTO_ZIP_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Ảnh thu nhỏ (WebP + PNG) cho lưới nhân viên / xem trước thẻ: /images/{id}?w=160
+# - PHOTO_DERIVATIVE_WIDTHS: các mốc chiều rộng (px) được tạo sẵn
+# - PHOTO_DERIVATIVE_BUDGET_MB: dung lượng tối đa thư mục ảnh thu nhỏ (vượt -> xóa ảnh lâu không dùng)
+PHOTO_DERIVATIVES_DIR = os.getenv("PHOTO_DERIVATIVES_DIR", os.path.join(BASE_DIR, "cache", "images"))
+PHOTO_DERIVATIVE_WIDTHS = tuple(
+    sorted(int(w) for w in os.getenv("PHOTO_DERIVATIVE_WIDTHS", "64,160,400").split(",") if w.strip())
+)
+PHOTO_DERIVATIVE_BUDGET_MB = int(os.getenv("PHOTO_DERIVATIVE_BUDGET_MB", 256))
+
+# Job đồng bộ ảnh Mã Cũ -> Mã Mới chạy nền (checkpoint để chạy tiếp khi bị ngắt)
+# - PHOTO_SYNC_CONCURRENCY: số ảnh copy cùng lúc (convert vẫn bị giới hạn bởi PHOTO_WORKERS)
+PHOTO_SYNC_DIR = os.path.join(DATA_DIR, "photo_sync")
+PHOTO_SYNC_CONCURRENCY = int(os.getenv("PHOTO_SYNC_CONCURRENCY", 8))
+
+# Render thẻ nhân viên phía server (POST /api/print/render)
+# - CARD_ASSETS_DIR: thư mục nền thẻ / con dấu (dùng chung với Frontend: frontend/public/assets)
+# - CARD_FONT_DIR: thư mục font (Roboto-Regular/Medium/Bold.ttf). Không có -> font hệ thống (Arial, DejaVu)
+# - CARD_RENDER_DPI: độ phân giải khi in (thẻ CR80 87x55 mm ở 300 dpi = 1028x650 px)
+# - CARD_RENDER_MAX_CARDS: số thẻ tối đa 1 lần render
+CARD_ASSETS_DIR = os.getenv("CARD_ASSETS_DIR", os.path.join(os.path.dirname(BASE_DIR), "frontend", "public", "assets"))
+CARD_FONT_DIR = os.getenv("CARD_FONT_DIR", os.path.join(STATIC_DIR, "fonts"))
+CARD_RENDER_DPI = int(os.getenv("CARD_RENDER_DPI", 300))
+CARD_RENDER_MAX_CARDS = int(os.getenv("CARD_RENDER_MAX_CARDS", 2000))
+
+# Xuất Excel báo cáo ticket chạy nền (POST /api/tickets/export-jobs)
+# - TICKET_EXPORT_DIR: file XLSX đã tạo (cache theo bộ lọc + phiên bản dữ liệu) và trạng thái job
+# - TICKET_EXPORT_WORKERS: số file được tạo cùng lúc trong 1 worker (mỗi file giữ 1 kết nối DB)
+# - TICKET_EXPORT_CACHE_FILES: số file giữ lại tối đa (xóa file lâu không được tải nhất)
+TICKET_EXPORT_DIR = os.getenv("TICKET_EXPORT_DIR", os.path.join(DATA_DIR, "ticket_exports"))
+TICKET_EXPORT_WORKERS = int(os.getenv("TICKET_EXPORT_WORKERS", 2))
+TICKET_EXPORT_CACHE_FILES = int(os.getenv("TICKET_EXPORT_CACHE_FILES", 50))
+
 # --- 3. CẤU HÌNH DATABASE ---
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
 
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 import uvicorn
 from fastapi import FastAPI, Request
@@ -21,12 +22,22 @@ from app.config import (
 # Import Database
 from app.database import engine, SessionLocal
 from app import models
+from app.services.print_service import backfill_last_print
+from app.services import hr_service
+from app.services.photo_service import photo_processor
+from app.services.photo_index_service import photo_index
+from app.services.photo_derivative_service import derivative_cache
+from app.services.photo_sync_service import photo_sync
+from app.services.ticket_query_service import ensure_ticket_indexes
+from app.services.ticket_stats_service import rebuild_daily_stats
+from app.services.ticket_export_job_service import ticket_exports
+from app.services.ticket_search_service import ensure_search_index, search_index_empty, rebuild_search_index
 
 # Import Routers
 from app.routers import (
     auth, employees, assets, upload, users, 
     print as print_router, categories, 
-    tickets, ticket_categories, ticket_upload
+    tickets, ticket_categories, ticket_upload, images
 )
 
 # --- 1. CẤU HÌNH LOGGING ---
@@ -39,6 +50,8 @@ logger = logging.getLogger(__name__)
 
 # Tạo bảng DB (nếu chưa có)
 models.Base.metadata.create_all(bind=engine)
+ensure_ticket_indexes(engine)
+ensure_search_index(engine)
 
 
 # --- HÀM KHỞI TẠO DỮ LIỆU MẪU (SEED DATA) ---
@@ -76,6 +89,30 @@ def init_db_data():
             db.add_all(ticket_defaults)
             db.commit()
             print(" [System Init] Ticket Categories created.")
+
+        # 3. Bảng last_print (nâng cấp từ bản cũ: dựng lại 1 lần từ print_logs)
+        if (
+            db.query(models.LastPrint).first() is None
+            and db.query(models.PrintLog).first() is not None
+        ):
+            print(" [System Init] Backfilling last_print from print_logs...")
+            count = backfill_last_print(db)
+            print(f" [System Init] last_print rebuilt for {count} employees.")
+
+        # 4. Bảng ticket_daily_stats (nâng cấp từ bản cũ: dựng lại 1 lần từ tickets)
+        if (
+            db.query(models.TicketDailyStats).first() is None
+            and db.query(models.Ticket).first() is not None
+        ):
+            print(" [System Init] Building ticket_daily_stats from tickets...")
+            count = rebuild_daily_stats(db)
+            print(f" [System Init] ticket_daily_stats built for {count} days.")
+
+        # 5. Chỉ mục tìm kiếm ticket (nâng cấp từ bản cũ / lần dựng trước bị lỗi: đánh chỉ mục toàn bộ ticket)
+        if search_index_empty(db) and db.query(models.Ticket).first() is not None:
+            print(" [System Init] Building ticket search index...")
+            count = rebuild_search_index(db)
+            print(f" [System Init] Search index built for {count} tickets.")
             
     except Exception as e:
         print(f" [System Init] Error seeding data: {e}")
@@ -106,12 +143,29 @@ async def lifespan(app: FastAPI):
         # print(f"[Check Dir] OK: {directory}") 
 
     init_db_data()
+
+    # Client HR dùng chung (giữ kết nối keep-alive cho mọi lượt gọi HR)
+    await hr_service.startup()
+
+    # Chỉ mục ảnh nhân viên (1 lần quét thư mục ảnh)
+    await asyncio.to_thread(photo_index.rebuild)
+    await asyncio.to_thread(derivative_cache.load)
+
+    # Nạp snapshot HR đã lưu để trả lời được ngay, không chờ HR Server
+    await employees.warm_up_hr_cache()
+
     print(" System Startup Complete")
     print("---------------------------------------------------\n")
     
     yield  # Server chạy tại đây
 
     # --- SHUTDOWN ---
+    # Job đồng bộ ảnh đang chạy -> dừng, giữ checkpoint để lần sau chạy tiếp
+    await photo_sync.shutdown()
+    # Job xuất Excel đang chạy -> dừng ở lô dòng kế tiếp (người dùng xuất lại sau)
+    ticket_exports.shutdown()
+    await hr_service.shutdown()
+    photo_processor.shutdown()
     print("\n---------------------------------------------------")
     print(" System Shutting Down...")
     print("---------------------------------------------------")
@@ -165,6 +219,8 @@ app.include_router(users.router)
 app.include_router(tickets.router)
 app.include_router(ticket_categories.router)
 app.include_router(ticket_upload.router) # Router upload mới xử lý logic lưu vào uploads/tickets
+# Ảnh nhân viên + ảnh thu nhỏ (?w=): khai báo trước mount "/images" bên dưới
+app.include_router(images.router, tags=["Images"])
 
 
 # --- 5. [QUAN TRỌNG] MOUNT STATIC FILES ---
@@ -8,7 +8,8 @@ from sqlalchemy import (
     Boolean,
     JSON,
     DateTime,
-    Text
+    Text,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -93,6 +94,15 @@ class PrintLog(Base):
     reason = Column(String, default="New Issue")
 
 
+# --- BẢNG LẦN IN CUỐI (Tổng hợp từ print_logs, cập nhật cùng transaction khi ghi log in) ---
+class LastPrint(Base):
+    __tablename__ = "last_print"
+
+    employee_id = Column(String, primary_key=True)
+    last_printed_at = Column(DateTime, index=True)
+    print_count = Column(Integer, default=0)
+
+
 class ToolPrintLog(Base):
     __tablename__ = "tool_print_logs"
 
@@ -153,12 +163,19 @@ class Ticket(Base):
         "TicketComment", back_populates="ticket", cascade="all, delete-orphan"
     )
 
+    # Index cho phân trang theo (created_at, id) - mới nhất trước (xem ticket_query_service)
+    __table_args__ = (
+        Index("ix_tickets_created_id", "created_at", "id"),  # Admin xem tất cả, lọc khoảng ngày tạo
+        Index("ix_tickets_status_created_id", "status", "created_at", "id"),  # Admin lọc theo trạng thái
+        Index("ix_tickets_requester_created_id", "requester_id", "created_at", "id"),  # Ticket của tôi
+    )
+
 
 class TicketComment(Base):
     __tablename__ = "ticket_comments"
 
     id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"))
+    ticket_id = Column(Integer, ForeignKey("tickets.id"), index=True)
     user_id = Column(Integer, ForeignKey("users.id"))  # Người comment
 
     content = Column(Text)
@@ -171,6 +188,19 @@ class TicketComment(Base):
     user = relationship("User")
 
 
+# --- BẢNG THỐNG KÊ TICKET THEO NGÀY (Cộng dồn khi tạo / sửa / xóa ticket, dùng cho dashboard khoảng dài) ---
+class TicketDailyStats(Base):
+    __tablename__ = "ticket_daily_stats"
+
+    day = Column(Date, primary_key=True)  # Ngày tạo ticket
+    total = Column(Integer, default=0)
+    open = Column(Integer, default=0)
+    in_progress = Column(Integer, default=0)
+    resolved = Column(Integer, default=0)
+    critical = Column(Integer, default=0)  # Priority '4' và chưa Resolved
+    changes = Column(Integer, default=0)  # Số lần ticket của ngày này được tạo / sửa / xóa (phiên bản dữ liệu)
+
+
 # --- BẢNG DANH MỤC LOẠI TICKET ---
 class TicketCategory(Base):
     __tablename__ = "ticket_categories"
@@ -1,193 +1,596 @@
 import os
-import json
+import asyncio
+import hashlib
 import logging
 import time
-from typing import List, Optional, Dict, Any
-from datetime import datetime
-# Thay thế requests bằng httpx để chạy bất đồng bộ
-import httpx
+from typing import List, Optional, Dict, Any, Tuple
 
-from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from sqlalchemy import func
+from sqlalchemy.orm import Session
 from app.database import get_db
 from app import models
-from app.config import HR_API_URL
+from app.config import (
+    HR_API_URL,
+    HR_CACHE_TTL,
+    HR_CACHE_HARD_EXPIRY,
+    HR_REFRESH_RETRY_INTERVAL,
+)
+from app.services.snapshot_service import (
+    SnapshotStore,
+    snapshot_store,
+    compute_record_hashes,
+    HR_REFRESH_LEASE,
+)
+from app.services.hr_service import get_hr_client
+from app.services.roster_service import EmployeeRoster
+from app.services.payload_service import employee_payload_cache, encode_employee_list
+from app.services.employee_index_service import employee_index, SORT_FIELDS
+from app.services.employee_search_service import employee_search
 
 # Cấu hình URL HR
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# --- CẤU HÌNH CACHE ĐƠN GIẢN ---
-CACHE_DATA = {"employees": [], "last_updated": 0}
-CACHE_TIMEOUT = 300  # 5 phút
 
 
+# --- HÀM HELPER: GỌI HR (ASYNC) ---
+async def _fetch_hr_employees() -> EmployeeRoster:
+    """
+    Gọi HR Server 1 lần và trả về danh sách nhân viên đã chuẩn hóa (dạng cột, xem roster_service).
+    Response được parse theo luồng (app/services/hr_service.py), không giữ nguyên văn bản gốc.
+    Lỗi (mất kết nối, sai format, success=False, circuit mở) -> raise HRServiceError.
+    """
+    logger.info(f"Connecting to HR System (Async): {HR_API_URL}")
+    return await get_hr_client().fetch_roster()
+
 
-def normalize_date(date_str):
+# --- CACHE HR: STALE-WHILE-REVALIDATE + SINGLE-FLIGHT ---
+class HRSnapshotCache:
     """
-    Chuyển đổi các định dạng ngày lộn xộn (DD/MM/YYYY, YYYY-MM-DD...)
-    về chuẩn duy nhất: YYYY-MM-DD để Frontend không bị hiểu nhầm.
+    Giữ snapshot HR tốt gần nhất trong RAM, đồng bộ với SnapshotStore trên ổ cứng.
+    - Tuổi < ttl: trả ngay.
+    - ttl <= tuổi < hard_expiry: trả ngay dữ liệu cũ, làm mới ngầm phía sau.
+    - Chưa có dữ liệu hoặc tuổi >= hard_expiry: chờ lượt làm mới.
+    - HR lỗi: trả snapshot tốt gần nhất (source = "offline") thay vì báo lỗi.
+    Trong 1 process chỉ có 1 lượt làm mới (single-flight); giữa các worker thì
+    lease trong SnapshotStore đảm bảo chỉ 1 process gọi HR, các worker còn lại
+    đọc kết quả từ file snapshot.
     """
-    if not date_str or str(date_str).strip() == "":
-        return None
-    
-    s = str(date_str).strip()
-    
-    # Cắt bỏ phần giờ nếu có (ví dụ: 2026-01-09T00:00:00)
-    if "T" in s:
-        s = s.split("T")[0]
-    elif " " in s:
-        s = s.split(" ")[0]
-
-    # Danh sách các format ưu tiên thử parse
-    # ƯU TIÊN SỐ 1: DD/MM/YYYY (Format Việt Nam) -> Để sửa lỗi 09/01 bị hiểu nhầm
-    formats = [
-        "%d/%m/%Y",  # 09/01/2026 -> 9 Jan
-        "%Y-%m-%d",  # 2026-01-09 -> 9 Jan
-        "%d-%m-%Y",  # 09-01-2026
-        "%m/%d/%Y",  # Format Mỹ (Thử cuối cùng)
-    ]
-
-    for fmt in formats:
+
+    # Thời gian giữ lease khi gọi HR (phải lớn hơn timeout gọi HR)
+    LEASE_SECONDS = 60
+    # Chu kỳ kiểm tra snapshot khi đang chờ worker khác gọi HR
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, ttl: int, hard_expiry: int, retry_interval: int, store: SnapshotStore):
+        self.ttl = ttl
+        self.hard_expiry = hard_expiry
+        self.retry_interval = retry_interval
+        self.store = store
+
+        self.roster: Optional[EmployeeRoster] = None
+        self.version = 0
+        self.content_hash: Optional[str] = None
+        self.record_hashes: Dict[str, str] = {}
+        self.last_updated = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        # Số liệu theo dõi (phục vụ tinh chỉnh TTL / timeout)
+        self.refresh_count = 0
+        self.refresh_failures = 0
+        self.consecutive_failures = 0
+        self.last_refresh_at: Optional[float] = None
+        self.last_refresh_duration: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.stale_served = 0
+        self.offline_served = 0
+        self.hr_fetches = 0
+        self.store_loads = 0
+
+    def age(self) -> Optional[float]:
+        if not self.last_updated:
+            return None
+        return time.time() - self.last_updated
+
+    def is_refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    def _in_retry_backoff(self) -> bool:
+        # Vừa thất bại xong thì không gọi HR dồn dập, chờ hết retry_interval
+        return (
+            self.last_failure_at is not None
+            and time.time() - self.last_failure_at < self.retry_interval
+        )
+
+    def start_refresh(self) -> asyncio.Task:
+        # Single-flight: nếu đã có lượt làm mới đang chạy thì dùng chung task đó
+        if not self.is_refreshing():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def load_from_store(self, fresh_only: bool = False) -> bool:
+        """
+        Nạp snapshot mới hơn bản trong RAM từ file (do worker khác hoặc lần chạy trước ghi).
+        fresh_only=True: chỉ nạp nếu snapshot đó còn trong TTL.
+        """
         try:
-            dt = datetime.strptime(s, fmt)
-            return dt.strftime("%Y-%m-%d") # Trả về chuẩn ISO
-        except ValueError:
-            continue
-            
-    return s # Nếu bó tay thì trả về nguyên gốc
+            latest = await asyncio.to_thread(self.store.latest_version)
+            if not latest:
+                return False
+            version, fetched_at = latest
+            if fresh_only and time.time() - fetched_at >= self.ttl:
+                return False
+            if version < self.version:
+                return False
+            if version == self.version:
+                # Worker khác gọi HR nhưng dữ liệu không đổi -> chỉ cập nhật thời điểm
+                if fetched_at <= self.last_updated:
+                    return False
+                self.last_updated = fetched_at
+                return True
+
+            snapshot = await asyncio.to_thread(self.store.load_latest)
+            if snapshot is None:
+                return False
+            self.roster = snapshot.roster
+            self.version = snapshot.version
+            self.content_hash = snapshot.content_hash
+            self.record_hashes = snapshot.record_hashes
+            self.last_updated = snapshot.fetched_at
+            self.store_loads += 1
+            logger.info(
+                f"HR snapshot v{snapshot.version} loaded from store: {len(snapshot.roster)} employees"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"HR snapshot store read error: {e}")
+            return False
+
+    async def _wait_for_other_worker(self) -> bool:
+        # Worker khác đang giữ lease và gọi HR -> chờ nó ghi snapshot mới
+        deadline = time.monotonic() + self.LEASE_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.POLL_INTERVAL)
+            if await self.load_from_store(fresh_only=True):
+                return True
+            acquired = await asyncio.to_thread(
+                self.store.try_acquire_lease, HR_REFRESH_LEASE, self.LEASE_SECONDS
+            )
+            if acquired:
+                # Worker kia đã nhả lease mà không ghi được gì -> tự gọi HR
+                await asyncio.to_thread(self.store.release_lease, HR_REFRESH_LEASE)
+                return False
+        return False
+
+    async def _refresh(self) -> bool:
+        started = time.perf_counter()
+        try:
+            # 1. Worker khác vừa làm mới xong -> dùng luôn, không gọi HR
+            if await self.load_from_store(fresh_only=True):
+                self.consecutive_failures = 0
+                self.last_error = None
+                return True
+
+            # 2. Giành quyền gọi HR
+            acquired = await asyncio.to_thread(
+                self.store.try_acquire_lease, HR_REFRESH_LEASE, self.LEASE_SECONDS
+            )
+            if not acquired:
+                if await self._wait_for_other_worker():
+                    self.consecutive_failures = 0
+                    self.last_error = None
+                    return True
+                acquired = await asyncio.to_thread(
+                    self.store.try_acquire_lease, HR_REFRESH_LEASE, self.LEASE_SECONDS
+                )
+                if not acquired:
+                    raise RuntimeError("Timed out waiting for another worker to refresh HR data")
+
+            # 3. Gọi HR và ghi snapshot cho mọi worker
+            try:
+                self.hr_fetches += 1
+                roster = await _fetch_hr_employees()
+                fetched_at = time.time()
+                content_hash, record_hashes = await asyncio.to_thread(
+                    compute_record_hashes, roster.iter_rows()
+                )
+                version = await asyncio.to_thread(
+                    self.store.save, roster, fetched_at, content_hash, record_hashes
+                )
+            finally:
+                await asyncio.to_thread(self.store.release_lease, HR_REFRESH_LEASE)
+
+            # Dữ liệu không đổi thì giữ nguyên roster cũ (các chỉ mục không phải dựng lại)
+            if version != self.version:
+                self.roster = roster
+                self.version = version
+                self.content_hash = content_hash
+                self.record_hashes = record_hashes
+            self.last_updated = fetched_at
+            self.consecutive_failures = 0
+            self.last_error = None
+            logger.info(f"HR snapshot v{version} refreshed: {len(roster)} employees")
+            return True
+        except Exception as e:
+            self.refresh_failures += 1
+            self.consecutive_failures += 1
+            self.last_failure_at = time.time()
+            self.last_error = str(e) or e.__class__.__name__
+            logger.error(f"HR CONNECTION ERROR: {self.last_error}")
+            return False
+        finally:
+            self.refresh_count += 1
+            self.last_refresh_at = time.time()
+            self.last_refresh_duration = time.perf_counter() - started
+
+    async def get(self) -> Tuple[Optional[EmployeeRoster], str]:
+        """
+        Trả về (roster nhân viên, source):
+        - "online": snapshot còn trong hạn cứng
+        - "offline": HR lỗi, đang dùng snapshot tốt gần nhất (last-known-good)
+        - "error": không có dữ liệu nào dùng được
+        """
+        age = self.age()
+
+        # 1. Còn tươi
+        if age is not None and age < self.ttl:
+            return self.roster, "online"
+
+        # 2. Đã cũ nhưng chưa quá hạn cứng -> trả ngay, làm mới ngầm
+        if age is not None and age < self.hard_expiry:
+            if not self._in_retry_backoff():
+                self.start_refresh()
+            self.stale_served += 1
+            return self.roster, "online"
+
+        # 3. Chưa có dữ liệu / quá hạn cứng -> phải chờ HR
+        if self.is_refreshing() or not self._in_retry_backoff():
+            # shield: 1 request bị hủy (client đóng kết nối) không làm hủy lượt làm mới chung
+            await asyncio.shield(self.start_refresh())
+
+        age = self.age()
+        if age is not None and age < self.hard_expiry:
+            return self.roster, "online"
+
+        # 4. HR lỗi -> dùng snapshot tốt gần nhất (RAM hoặc file)
+        if not self.roster:
+            await self.load_from_store()
+        if self.roster:
+            self.offline_served += 1
+            return self.roster, "offline"
+        return None, "error"
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "version": self.version,
+            "employee_count": len(self.roster) if self.roster is not None else 0,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "is_stale": age is None or age >= self.ttl,
+            "is_expired": age is None or age >= self.hard_expiry,
+            "is_refreshing": self.is_refreshing(),
+            "ttl_seconds": self.ttl,
+            "hard_expiry_seconds": self.hard_expiry,
+            "retry_interval_seconds": self.retry_interval,
+            "refresh_count": self.refresh_count,
+            "refresh_failures": self.refresh_failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_refresh_duration_ms": (
+                round(self.last_refresh_duration * 1000, 1)
+                if self.last_refresh_duration is not None
+                else None
+            ),
+            "last_refresh_at": self.last_refresh_at,
+            "last_error": self.last_error,
+            "hr_fetches": self.hr_fetches,
+            "store_loads": self.store_loads,
+            "stale_served": self.stale_served,
+            "offline_served": self.offline_served,
+        }
+
+
+HR_CACHE = HRSnapshotCache(
+    ttl=HR_CACHE_TTL,
+    hard_expiry=HR_CACHE_HARD_EXPIRY,
+    retry_interval=HR_REFRESH_RETRY_INTERVAL,
+    store=snapshot_store,
+)
+
+
+async def warm_up_hr_cache():
+    """Gọi lúc khởi động: nạp snapshot từ file để worker mới trả lời được ngay."""
+    if not await HR_CACHE.load_from_store():
+        # Chưa có snapshot nào -> làm mới ngầm, không chặn quá trình khởi động
+        HR_CACHE.start_refresh()
+
 
-# --- HÀM HELPER: GỌI HR (ASYNC) ---
 async def fetch_hr_data_async() -> Dict[str, Any]:
-    # 1. KIỂM TRA CACHE TRƯỚC (RAM)
-    current_time = time.time()
-    if CACHE_DATA["employees"] and (
-        current_time - CACHE_DATA["last_updated"] < CACHE_TIMEOUT
-    ):
-        logger.info("Serving HR data from CACHE (RAM)")
-        return {"data": CACHE_DATA["employees"], "source": "online"}
-
-    payload = {"arg_UserId": "", "arg_Pass": ""}
-    headers = {"Content-Type": "application/json; charset=utf-8"}
-    final_employees = []
-
-    # 2. GỌI HR SERVER
+    roster, source = await HR_CACHE.get()
+    if roster is None:
+        # TRẢ VỀ LỖI
+        logger.error("Failed to fetch HR Data. Returning empty list.")
+        return {"data": EmployeeRoster(), "source": "error"}
+    return {"data": roster, "source": source}
+
+
+# --- THEO DÕI TRẠNG THÁI CACHE HR ---
+@router.get("/api/employees/cache-status")
+def get_hr_cache_status():
+    return {
+        **HR_CACHE.stats(),
+        "hr_client": get_hr_client().stats(),
+        "payload_cache": employee_payload_cache.stats(),
+    }
+
+def _print_map_version(db: Session) -> str:
+    """Phiên bản của bảng last_print: đổi mỗi khi có lượt in mới (đọc qua index, rất rẻ)."""
     try:
-        logger.info(f"Connecting to HR System (Async): {HR_API_URL}")
-
-        async with httpx.AsyncClient(timeout=15.0) as client: # Tăng timeout lên 15s cho chắc
-            response = await client.post(HR_API_URL, json=payload, headers=headers)
-
-        if response.status_code == 200:
-            raw_text = response.text
-            
-            # Logic parse JSON đặc thù của webservice .asmx
-            decoder = json.JSONDecoder()
-            json_response, idx = decoder.raw_decode(raw_text)
-
-            if "d" in json_response:
-                data_obj = (
-                    json.loads(json_response["d"])
-                    if isinstance(json_response["d"], str)
-                    else json_response["d"]
-                )
-            else:
-                data_obj = json_response
-
-            if (
-                isinstance(data_obj, dict)
-                and data_obj.get("success") == True
-                and "data" in data_obj
-            ):
-                hr_list = data_obj["data"]
-
-                for raw in hr_list:
-                    emp = {
-                        "employee_id": raw.get("employee_id", "N/A"),
-                        "employee_name": raw.get("employee_name", "N/A"),
-                        "employee_department": raw.get("employee_department", ""),
-                        "employee_position": raw.get("employee_position", ""),
-                        "employee_status": raw.get("employee_status", "Active"),
-                        "employee_type": raw.get("employee_type", "Worker"),
-                        "id": raw.get("id", ""),
-                        "employee_gender": raw.get("employee_gender", ""),
-                        "employee_old_id": raw.get("employee_old_id", ""),
-                        
-                        # 🔥 CHUẨN HÓA DATE TẠI ĐÂY (SỬA LỖI)
-                        "employee_birth_date": normalize_date(raw.get("employee_birth_date")),
-                        "employee_join_date": normalize_date(raw.get("employee_join_date")),
-                        "employee_left_date": normalize_date(raw.get("employee_left_date")),
-                        "contract_begin": normalize_date(raw.get("contract_begin")),
-                        "contract_end": normalize_date(raw.get("contract_end")),
-                        "maternity_begin": normalize_date(raw.get("maternity_begin")),
-                        "maternity_end": normalize_date(raw.get("maternity_end")),
-                        # -----------------------------------
-
-                        "contract_type": raw.get("contract_type", ""),
-                        "contract_id": raw.get("contract_id", ""),
-                        "maternity_type": raw.get("maternity_type", ""),
-                        
-                        "employee_image": f"/images/{raw.get('employee_id', '')}.png",
-                        "last_printed_at": None,
-                    }
-                    final_employees.append(emp)
-
-                # CẬP NHẬT CACHE RAM
-                CACHE_DATA["employees"] = final_employees
-                CACHE_DATA["last_updated"] = current_time
-
-                return {"data": final_employees, "source": "online"}
+        latest = db.query(func.max(models.LastPrint.last_printed_at)).scalar()
+    except Exception as e:
+        logger.error(f"Database Query Error (LastPrint): {e}")
+        return "error"
+    return latest.isoformat() if latest else "0"
+
+
+def _make_etag(content_hash: Optional[str], print_version: str, source: str) -> str:
+    print_part = hashlib.blake2b(print_version.encode("utf-8"), digest_size=6).hexdigest()
+    return f'W/"{(content_hash or "none")[:20]}-{print_part}-{source}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # So khớp kiểu "weak": bỏ tiền tố W/
+    wanted = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(",")
+    )
 
+
+def _merge_last_printed(db: Session, items: List[Dict[str, Any]]):
+    """Ghép 'Lần in cuối' cho 1 nhóm nhỏ nhân viên (items đã là bản copy)."""
+    if not items:
+        return
+    try:
+        rows = (
+            db.query(models.LastPrint.employee_id, models.LastPrint.last_printed_at)
+            .filter(models.LastPrint.employee_id.in_([e["employee_id"] for e in items]))
+            .all()
+        )
+        print_map = {row.employee_id: row.last_printed_at for row in rows}
     except Exception as e:
-        logger.error(f"HR CONNECTION ERROR: {e}")
+        logger.error(f"Database Query Error (LastPrint): {e}")
+        print_map = {}
+    for emp in items:
+        emp["last_printed_at"] = print_map.get(emp["employee_id"])
 
-    # 3. TRẢ VỀ LỖI
-    logger.error("Failed to fetch HR Data. Returning empty list.")
-    return {"data": [], "source": "error"}
 
 # --- ROUTE CHÍNH: LẤY DANH SÁCH NHÂN VIÊN ---
 @router.get("/api/employees")
-async def get_employees(db: Session = Depends(get_db)):
+async def get_employees(request: Request, db: Session = Depends(get_db)):
     # BƯỚC 1: Lấy kết quả từ hàm fetch
     hr_result = await fetch_hr_data_async()
+    content_hash = HR_CACHE.content_hash
+    version = HR_CACHE.version
     
     hr_data = hr_result["data"]
     source = hr_result["source"]
 
     # --- SỬA ĐỔI: Chặn ngay nếu nguồn dữ liệu báo lỗi ---
-    # Vì logic "No Backup", nên nếu lỗi là trả về 503 luôn để Frontend bắt vào catch
+    # HR lỗi nhưng còn snapshot cũ thì source = "offline" (vẫn trả dữ liệu).
+    # Chỉ khi không còn dữ liệu nào mới trả 503 để Frontend bắt vào catch
     if source == "error":
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Mất kết nối đến hệ thống nhân sự (HR Server).",
         )
 
-    # BƯỚC 2: Lấy thông tin 'Lần in cuối' từ Database nội bộ
-    # (Phần này giữ nguyên: Nếu DB nội bộ lỗi thì vẫn hiển thị list nhân viên bình thường)
+    # Conditional GET: snapshot HR + bảng last_print không đổi -> 304, không gửi lại body
+    etag = _make_etag(content_hash, _print_map_version(db), source)
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    # Body đã encode + nén sẵn cho (version, ETag): lần gọi sau chỉ việc gửi bytes
+    payload_key = (version, etag)
+    payload = employee_payload_cache.peek(payload_key)
+    if payload is None:
+        # BƯỚC 2: Lấy thông tin 'Lần in cuối' từ Database nội bộ
+        # (Phần này giữ nguyên: Nếu DB nội bộ lỗi thì vẫn hiển thị list nhân viên bình thường)
+        # Đọc bảng tổng hợp last_print (1 dòng / nhân viên) thay vì GROUP BY cả print_logs
+        try:
+            last_print_query = db.query(
+                models.LastPrint.employee_id, models.LastPrint.last_printed_at
+            ).all()
+            print_map = {row.employee_id: row.last_printed_at for row in last_print_query}
+        except Exception as e:
+            logger.error(f"Database Query Error (LastPrint): {e}")
+            print_map = {}
+
+        # BƯỚC 3: Ghép dữ liệu + encode JSON + nén (trong thread, theo từng lô)
+        header = {
+            "source": source, # "online" hoặc "offline" (dữ liệu snapshot cũ khi HR lỗi)
+            "version": version,
+        }
+        payload = await employee_payload_cache.get(
+            payload_key, lambda: encode_employee_list(hr_data, print_map, header)
+        )
+
+    # TRẢ VỀ
+    body, encoding = payload.choose(request.headers.get("accept-encoding"))
+    headers = dict(cache_headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# --- DELTA: CHỈ TRẢ CÁC NHÂN VIÊN THÊM / XÓA / THAY ĐỔI KỂ TỪ 1 VERSION ---
+@router.get("/api/employees/changes")
+async def get_employee_changes(
+    since: int = Query(..., ge=0),
+    db: Session = Depends(get_db),
+):
+    hr_data, source = await HR_CACHE.get()
+    version = HR_CACHE.version
+    current_hashes = HR_CACHE.record_hashes
+    if hr_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Mất kết nối đến hệ thống nhân sự (HR Server).",
+        )
+
+    if since == version:
+        return {"source": source, "since": since, "version": version,
+                "added": [], "modified": [], "removed": []}
+
+    old_hashes = None
+    if since < version:
+        old_hashes = await asyncio.to_thread(HR_CACHE.store.load_record_hashes, since)
+    if old_hashes is None:
+        # Version quá cũ (đã bị dọn) hoặc không tồn tại -> Client phải tải lại toàn bộ
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Version {since} không còn lưu. Vui lòng tải lại toàn bộ danh sách.",
+        )
+
+    added, modified = [], []
+    for pos, emp_id in enumerate(hr_data.employee_ids()):
+        emp_id = str(emp_id)
+        old_hash = old_hashes.get(emp_id)
+        if old_hash is None:
+            added.append(hr_data.row(pos))
+        elif old_hash != current_hashes.get(emp_id):
+            modified.append(hr_data.row(pos))
+    removed = [emp_id for emp_id in old_hashes if emp_id not in current_hashes]
+
+    _merge_last_printed(db, added + modified)
+
+    return {
+        "source": source,
+        "since": since,
+        "version": version,
+        "added": added,
+        "modified": modified,
+        "removed": removed,
+    }
+
+
+# --- TRUY VẤN NHÂN VIÊN PHÍA SERVER (LỌC / TÌM / SẮP XẾP / PHÂN TRANG) ---
+@router.get("/api/employees/query")
+async def query_employees(
+    department: Optional[List[str]] = Query(None),
+    employee_status: Optional[List[str]] = Query(None, alias="status"),
+    employee_type: Optional[List[str]] = Query(None, alias="type"),
+    maternity_type: Optional[List[str]] = Query(None),
+    join_from: Optional[str] = None,
+    join_to: Optional[str] = None,
+    contract_begin_from: Optional[str] = None,
+    contract_begin_to: Optional[str] = None,
+    contract_end_from: Optional[str] = None,
+    contract_end_to: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: str = "employee_id",
+    order: str = "asc",
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Chỉ trả về 1 trang nhân viên thay vì toàn bộ danh sách.
+    Ngày lọc theo định dạng YYYY-MM-DD (giống dữ liệu đã chuẩn hóa).
+    """
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort field: {sort}")
+
+    hr_data, source = await HR_CACHE.get()
+    version = HR_CACHE.version
+    if hr_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Mất kết nối đến hệ thống nhân sự (HR Server).",
+        )
+
+    # Chỉ mục dựng 1 lần cho mỗi snapshot
+    index = await employee_index.get(hr_data, version)
+
     try:
-        last_print_query = (
-            db.query(
-                models.PrintLog.employee_id,
-                func.max(models.PrintLog.printed_at).label("last_printed"),
-            )
-            .group_by(models.PrintLog.employee_id)
-            .all()
+        candidates = index.filter(
+            filters={
+                "employee_department": department,
+                "employee_status": employee_status,
+                "employee_type": employee_type,
+                "maternity_type": maternity_type,
+            },
+            date_ranges={
+                "employee_join_date": (join_from, join_to),
+                "contract_begin": (contract_begin_from, contract_begin_to),
+                "contract_end": (contract_end_from, contract_end_to),
+            },
+            q=q,
         )
-        print_map = {row.employee_id: row.last_printed for row in last_print_query}
-    except Exception as e:
-        logger.error(f"Database Query Error (PrintLog): {e}")
-        print_map = {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = len(index) if candidates is None else len(candidates)
+    positions = index.page(
+        candidates,
+        sort=sort,
+        descending=order.lower() == "desc",
+        offset=(page - 1) * size,
+        limit=size,
+    )
 
-    # BƯỚC 3: Ghép dữ liệu (Merge In-Memory)
-    for emp in hr_data:
-        emp_id = emp.get("employee_id")
-        if emp_id in print_map:
-            emp["last_printed_at"] = print_map[emp_id]
+    # Chỉ dựng dict cho các nhân viên trong trang
+    items = index.roster.rows(positions)
+
+    # Chỉ tra 'Lần in cuối' cho các nhân viên trong trang
+    _merge_last_printed(db, items)
+
+    return {
+        "source": source,
+        "version": version,
+        "items": items,
+        "total": total,
+        "page": page,
+        "size": size,
+    }
+
+
+# --- TÌM KIẾM NHÂN VIÊN (KHÔNG DẤU, GẦN ĐÚNG) THEO TÊN / MÃ NV / MÃ CŨ ---
+@router.get("/api/employees/search")
+async def search_employees(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    hr_data, source = await HR_CACHE.get()
+    version = HR_CACHE.version
+    if hr_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Mất kết nối đến hệ thống nhân sự (HR Server).",
+        )
+
+    index = await employee_search.get(hr_data, version)
+    started = time.perf_counter()
+    matches = index.search(q, limit)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    items = []
+    for score, item in matches:
+        item["score"] = score
+        items.append(item)
+
+    _merge_last_printed(db, items)
 
-    # TRẢ VỀ
     return {
-        "source": "online", # Lúc nào cũng là online vì nếu lỗi đã raise Exception ở trên rồi
-        "data": hr_data
-    }
\ No newline at end of file
+        "source": source,
+        "version": version,
+        "query": q,
+        "took_ms": took_ms,
+        "items": items,
+    }
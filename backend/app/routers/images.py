@@ -0,0 +1,67 @@
+import os
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Request, Query, HTTPException
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from app.config import EMPLOYEE_IMAGES_DIR, PHOTO_DERIVATIVES_DIR
+from app.services.photo_service import clean_photo_name
+from app.services.photo_index_service import photo_index
+from app.services.photo_derivative_service import derivative_cache, pick_width, pick_format
+
+router = APIRouter()
+
+# Ảnh gốc và ảnh thu nhỏ vẫn gửi qua StaticFiles (ETag / Last-Modified / 304 như trước)
+_originals = StaticFiles(directory=EMPLOYEE_IMAGES_DIR)
+_derivatives = StaticFiles(directory=PHOTO_DERIVATIVES_DIR, check_dir=False)
+
+
+async def _original_response(name: str, request: Request):
+    """
+    Ảnh gốc. URL trong danh sách nhân viên luôn là /images/{id}.png, nhưng ảnh có thể được
+    lưu đuôi khác (PHOTO_ENCODING_PROFILE = jpeg_hq / webp_lossless) -> tra chỉ mục theo mã.
+    """
+    try:
+        return await _originals.get_response(name, request.scope)
+    except StarletteHTTPException as e:
+        # StaticFiles báo thiếu file bằng HTTPException của Starlette
+        if e.status_code != 404:
+            raise
+    emp_id = clean_photo_name(name)
+    index = await asyncio.to_thread(photo_index.ensure_fresh)
+    entry = index.get(emp_id) if emp_id else None
+    if entry is None or entry.filename == name:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await _originals.get_response(entry.filename, request.scope)
+
+
+@router.get("/images/{name}")
+async def get_employee_image(
+    name: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096),
+):
+    """
+    Ảnh nhân viên.
+    - /images/NV01.png        : ảnh gốc (như trước; ảnh lưu đuôi khác vẫn tìm được theo mã)
+    - /images/NV01.png?w=160  : ảnh thu nhỏ theo mốc gần nhất (64 / 160 / 400 px),
+      WebP nếu trình duyệt nhận (Accept: image/webp), ngược lại PNG
+    """
+    width = pick_width(w) if w else None
+    if width is None:
+        return await _original_response(name, request)
+
+    emp_id = clean_photo_name(name)
+    if not emp_id:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    fmt = pick_format(request.headers.get("accept"))
+    path = await derivative_cache.get(emp_id, width, fmt)
+    if path is None:
+        # Không tạo được ảnh thu nhỏ (ảnh gốc hỏng...) -> trả ảnh gốc nếu có
+        return await _original_response(name, request)
+
+    response = await _derivatives.get_response(os.path.basename(path), request.scope)
+    response.headers["Vary"] = "Accept"
+    return response
@@ -1,14 +1,26 @@
+import os
+import shutil
+import asyncio
 import logging
+import tempfile
 from datetime import datetime
 import pytz
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, or_
+from starlette.background import BackgroundTask
 
 # Import nội bộ
 from app.database import get_db
 from app import models, schemas
-from app.config import LOG_FILE
+from app.config import LOG_FILE, CARD_RENDER_DPI, CARD_RENDER_MAX_CARDS
+from app.services.print_service import record_last_prints
+from app.services.photo_index_service import photo_index
+from app.services.card_render_service import render_cards, iter_pdf_from_jpegs
+from app.services.zip_stream_service import iter_zip_stored
+from app.routers.employees import HR_CACHE
 
 # Khởi tạo Router và Logger
 router = APIRouter(prefix="/api/print", tags=["Print & Stats"])
@@ -22,9 +34,12 @@ logger = logging.getLogger(__name__)
 def log_print(request: schemas.PrintRequest, db: Session = Depends(get_db)):
     try:
         count = 0
+        # employee_id -> (lần in cuối, số lần in trong lô) để cập nhật bảng last_print
+        printed = {}
         for item in request.employees:
             # Ưu tiên lý do của từng nhân viên, nếu không có thì lấy lý do chung
             final_reason = item.reason if item.reason else request.reason
+            printed_at = datetime.now()
 
             new_log = models.PrintLog(
                 employee_id=item.employee_id,
@@ -32,11 +47,16 @@ def log_print(request: schemas.PrintRequest, db: Session = Depends(get_db)):
                 department=item.department,
                 reason=final_reason,  # Lưu ý: Frontend cần gửi đúng format (vd: 'pregnancy', 'normal')
                 printed_by=request.printed_by,
-                printed_at=datetime.now(),
+                printed_at=printed_at,
             )
             db.add(new_log)
             count += 1
 
+            _, prev_count = printed.get(item.employee_id, (None, 0))
+            printed[item.employee_id] = (printed_at, prev_count + 1)
+
+        # Cùng transaction với PrintLog: commit cả hai hoặc không gì cả
+        record_last_prints(db, printed)
         db.commit()
         return {"status": "success", "message": f"Logged {count} prints"}
 
@@ -164,3 +184,98 @@ def log_tool_print(request: schemas.ToolPrintCreate, db: Session = Depends(get_d
             status_code=500, 
             detail=f"Không thể lưu lịch sử in công cụ: {str(e)}"
         )
+
+
+# ============================================================
+# 4. API RENDER THẺ PHÍA SERVER (PDF / PNG SẴN SÀNG ĐỂ IN)
+# ============================================================
+@router.post("/render")
+async def render_id_cards(request: schemas.CardRenderRequest, db: Session = Depends(get_db)):
+    """
+    Ghép nền thẻ + ảnh + chữ cho cả lô nhân viên ngay trên server (cùng bố cục với thẻ trên web).
+    - format=pdf: 1 file PDF | format=png: 1 thẻ/trang -> PNG, nhiều trang -> ZIP các PNG
+    - layout=card: mỗi trang 1 thẻ đúng khổ CR80 (máy in thẻ) | layout=a4: xếp nhiều thẻ trên A4
+    - Dữ liệu nhân viên lấy từ cache HR theo employee_id; in xong ghi lịch sử qua log_print
+    """
+    if request.format not in ("pdf", "png"):
+        raise HTTPException(status_code=400, detail=f"Invalid format: {request.format} (pdf | png)")
+    if request.layout not in ("card", "a4"):
+        raise HTTPException(status_code=400, detail=f"Invalid layout: {request.layout} (card | a4)")
+    if not request.employees:
+        raise HTTPException(status_code=400, detail="No employees provided")
+    if len(request.employees) > CARD_RENDER_MAX_CARDS:
+        raise HTTPException(status_code=400, detail=f"Too many cards (max {CARD_RENDER_MAX_CARDS})")
+
+    roster, _ = await HR_CACHE.get()
+    if roster is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Mất kết nối đến hệ thống nhân sự (HR Server).",
+        )
+    positions = {emp_id: pos for pos, emp_id in enumerate(roster.employee_ids())}
+    missing = [item.employee_id for item in request.employees if item.employee_id.strip() not in positions]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Employees not found: {', '.join(missing[:20])}")
+    employees = roster.rows(positions[item.employee_id.strip()] for item in request.employees)
+
+    index = await asyncio.to_thread(photo_index.ensure_fresh)
+    workdir = tempfile.mkdtemp(prefix="cards_")
+    cleanup = BackgroundTask(shutil.rmtree, workdir, ignore_errors=True)
+    try:
+        result = await render_cards(
+            employees,
+            index,
+            workdir,
+            fmt=request.format,
+            layout=request.layout,
+            show_stamp=request.show_stamp,
+            bg_option=request.bg_option,
+        )
+        if request.log:
+            # Ghi lịch sử in bằng đúng API log cũ (PrintLog + bảng last_print trong 1 transaction)
+            log_request = schemas.PrintRequest(
+                employees=[
+                    schemas.PrintItem(
+                        employee_id=emp["employee_id"],
+                        employee_name=emp.get("employee_name") or "",
+                        department=emp.get("employee_department") or "",
+                        job_title=emp.get("employee_position") or "",
+                        reason=item.reason,
+                    )
+                    for emp, item in zip(employees, request.employees)
+                ],
+                reason=request.reason,
+                printed_by=request.printed_by,
+            )
+            await run_in_threadpool(log_print, log_request, db)
+    except HTTPException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    except Exception as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        logger.error(f"Lỗi render thẻ: {e}")
+        raise HTTPException(status_code=500, detail=f"Không thể render thẻ: {e}")
+
+    pages = result["pages"]
+    headers = {
+        "X-Cards-Rendered": str(result["cards"]),
+        "X-Missing-Photos": str(result["missing_photos"]),
+        "X-Render-Seconds": str(result["seconds"]),
+    }
+    if request.format == "pdf":
+        return StreamingResponse(
+            iter_pdf_from_jpegs(pages, CARD_RENDER_DPI),
+            media_type="application/pdf",
+            headers={**headers, "Content-Disposition": "attachment; filename=ID_Cards.pdf"},
+            background=cleanup,
+        )
+    if len(pages) == 1:
+        return FileResponse(
+            pages[0]["path"], media_type="image/png", filename="ID_Card.png", headers=headers, background=cleanup
+        )
+    return StreamingResponse(
+        iter_zip_stored((page["path"], os.path.basename(page["path"])) for page in pages),
+        media_type="application/zip",
+        headers={**headers, "Content-Disposition": "attachment; filename=ID_Cards.zip"},
+        background=cleanup,
+    )
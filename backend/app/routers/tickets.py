@@ -1,25 +1,29 @@
 import os
 from typing import List, Optional
 from datetime import datetime
-from datetime import date, timedelta
+from datetime import date
 from fastapi.responses import StreamingResponse # Để xuất file
 from fastapi.responses import FileResponse
 import os
-import tempfile
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import desc
 from fastapi.responses import StreamingResponse
-import io 
-from openpyxl import Workbook # <--- Import thư viện Excel
-from openpyxl.cell import WriteOnlyCell
-from openpyxl.styles import Font, PatternFill, Alignment #<--- Import các style cho Excel
 from typing import Optional
 from app.config import TICKET_IMAGES_DIR
 
 from app.database import get_db
 from app import models, schemas
 from app.oauth2 import get_current_user
+from app.services.ticket_query_service import keyset_page, ticket_counts, CursorError
+from app.services.ticket_stats_service import (
+    ticket_stats,
+    ticket_snapshot,
+    record_ticket_stats,
+)
+from app.services.ticket_export_service import iter_tickets_xlsx, XLSX_MEDIA_TYPE
+from app.services.ticket_export_job_service import ticket_exports, ExportNotReady
+from app.services.ticket_search_service import search_tickets as run_ticket_search, index_ticket, unindex_ticket
 
 router = APIRouter(prefix="/api/tickets", tags=["Tickets"])
 
@@ -52,7 +56,11 @@ async def create_ticket(
 
     try:
         db.add(new_ticket)
+        record_ticket_stats(db, None, ticket_snapshot(new_ticket))
+        db.flush()
+        index_ticket(db, new_ticket.id)
         db.commit()
+        ticket_counts.invalidate()
         db.refresh(new_ticket)
         return new_ticket
     except Exception as e:
@@ -67,43 +75,49 @@ async def create_ticket(
 # app/routers/tickets.py
 
 
-# Sửa hàm get_my_tickets
+# Phân trang: trang kế / trang trước dùng cursor (next_cursor / prev_cursor) -> không OFFSET, trang sâu vẫn nhanh.
+# Không gửi cursor thì dùng page như cũ (nhảy tới trang bất kỳ).
+# include_total=false bỏ qua COUNT (total = null); tổng được cache ngắn hạn theo bộ lọc.
+def _ticket_page(query, conditions, count_key, page, size, cursor, include_total):
+    try:
+        result = keyset_page(query.filter(*conditions), size, cursor=cursor, page=page)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["total"] = ticket_counts.count(query.session, count_key, conditions) if include_total else None
+    result["page"] = page
+    result["size"] = size
+    return result
+
+
 @router.get(
     "/my-tickets", response_model=schemas.TicketPaginationResponse
 )  # Đổi Schema trả về
 def get_my_tickets(
-    page: int = 1,
-    size: int = 10,
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    # Query cơ bản: Lọc theo người tạo (requester_id)
-    query = (
-        db.query(models.Ticket)
-        .options(joinedload(models.Ticket.ticket_category))
-        .filter(models.Ticket.requester_id == current_user.id)
-    )
-
-    # Đếm tổng số
-    total_records = query.count()
+    # Query cơ bản: Lọc theo người tạo (requester_id) - dùng index (requester_id, created_at, id)
+    query = db.query(models.Ticket).options(joinedload(models.Ticket.ticket_category))
+    conditions = [models.Ticket.requester_id == current_user.id]
 
-    # Phân trang
-    skip = (page - 1) * size
-    tickets = (
-        query.order_by(desc(models.Ticket.created_at)).offset(skip).limit(size).all()
+    return _ticket_page(
+        query, conditions, ("my", current_user.id), page, size, cursor, include_total
     )
 
-    # Trả về đúng format Schema phân trang
-    return {"items": tickets, "total": total_records, "page": page, "size": size}
-
 
 # --- 3. QUẢN LÝ TICKET (Cho Admin/Manager) ---
 @router.get("/manage", response_model=schemas.TicketPaginationResponse)
 def manage_tickets(
     status: Optional[str] = None,
     priority: Optional[str] = None,
-    page: int = 1,  # Trang hiện tại (Mặc định trang 1)
-    size: int = 10,  # Số lượng mỗi trang (Mặc định 10)
+    page: int = Query(1, ge=1),  # Trang hiện tại (Mặc định trang 1)
+    size: int = Query(10, ge=1, le=100),  # Số lượng mỗi trang (Mặc định 10)
+    cursor: Optional[str] = None,  # next_cursor / prev_cursor của lần gọi trước
+    include_total: bool = True,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
@@ -117,28 +131,43 @@ def manage_tickets(
         joinedload(models.Ticket.ticket_category),
     )
 
-    # 2. Áp dụng bộ lọc (Filter)
+    # 2. Áp dụng bộ lọc (Filter) - lọc status dùng index (status, created_at, id)
+    conditions = []
     if status and status != "All":
-        query = query.filter(models.Ticket.status == status)
+        conditions.append(models.Ticket.status == status)
     if priority and priority != "All":
-        query = query.filter(models.Ticket.priority == priority)
-
-    # 3. Đếm tổng số bản ghi (Total) TRƯỚC khi cắt trang
-    total_records = query.count()
+        conditions.append(models.Ticket.priority == priority)
 
-    # 4. Tính toán Skip (Offset) và lấy dữ liệu
-    skip = (page - 1) * size
-    tickets = (
-        query.order_by(desc(models.Ticket.created_at)).offset(skip).limit(size).all()
+    # 3. Lấy trang + tổng (cache theo bộ lọc)
+    return _ticket_page(
+        query, conditions, ("manage", status, priority), page, size, cursor, include_total
     )
 
-    # 5. Trả về đúng format Schema
-    return {"items": tickets, "total": total_records, "page": page, "size": size}
-
-
-# --- 4. CHI TIẾT TICKET & COMMENT ---
-from sqlalchemy.orm import joinedload
 
+# --- TÌM KIẾM TICKET (tiêu đề, mô tả, cách khắc phục, bình luận) ---
+# Full-text: Postgres tsvector + GIN, SQLite FTS5 (app/services/ticket_search_service.py)
+@router.get("/search", response_model=schemas.TicketSearchResponse)
+def search_tickets(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # User thường chỉ tìm trong ticket của mình, Admin/Manager tìm tất cả
+    requester_id = None if current_user.role in ["Admin", "Manager"] else current_user.id
+    result = run_ticket_search(
+        db, q, status=status, start_date=start_date, end_date=end_date,
+        requester_id=requester_id, limit=limit, offset=offset,
+    )
+    result["items"] = [
+        schemas.TicketSearchHit.model_validate(hit["ticket"]).model_copy(update={"rank": hit["rank"]})
+        for hit in result["items"]
+    ]
+    return result
 
 
 # --- 6. GỬI COMMENT ---
@@ -152,6 +181,7 @@ def create_comment(
     ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    stats_before = ticket_snapshot(ticket)
 
     # 1. Tạo Comment
     new_comment = models.TicketComment(
@@ -169,6 +199,7 @@ def create_comment(
         # Tự động đổi trạng thái về "In Progress" để IT chú ý xử lý tiếp
         ticket.status = "In Progress"
         ticket.updated_at = datetime.now()
+        record_ticket_stats(db, stats_before, ticket_snapshot(ticket))
         
         # Thêm một dòng log hệ thống để báo hiệu
         system_note = models.TicketComment(
@@ -180,8 +211,13 @@ def create_comment(
         db.add(system_note)
 
     # Nếu là Admin comment thì giữ nguyên trạng thái (ví dụ Admin vào dặn dò thêm)
-    
+
+    # Nội dung bình luận mới vào chỉ mục tìm kiếm
+    db.flush()
+    index_ticket(db, ticket_id)
     db.commit()
+    if ticket.status != stats_before[1]:
+        ticket_counts.invalidate()
     db.refresh(new_comment)
     return new_comment
 
@@ -198,61 +234,16 @@ def get_ticket_stats(
     if current_user.role not in ["Admin", "Manager"]:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # --- TẠO QUERY CƠ BẢN (BASE QUERY) ---
-    # Thay vì query trực tiếp db.query(models.Ticket), ta tạo 1 query có thể lọc
-    base_query = db.query(models.Ticket)
-
-    # --- ÁP DỤNG BỘ LỌC NGÀY (NẾU CÓ) ---
-    if start_date:
-        # So sánh ngày tạo >= start_date
-        base_query = base_query.filter(func.date(models.Ticket.created_at) >= start_date)
-    if end_date:
-        # So sánh ngày tạo <= end_date
-        base_query = base_query.filter(func.date(models.Ticket.created_at) <= end_date)
-
-    # --- ĐẾM DỮ LIỆU (LOGIC CŨ ĐƯỢC GIỮ NGUYÊN, CHỈ THAY NGUỒN QUERY) ---
-    
-    # Tổng số (dựa trên bộ lọc ngày)
-    total = base_query.count()
-
-    # Open (Lọc tiếp status từ base_query)
-    open_count = base_query.filter(models.Ticket.status == "Open").count()
-    
-    # In Progress
-    in_progress = base_query.filter(models.Ticket.status == "In Progress").count()
-    
-    # Resolved
-    resolved = base_query.filter(models.Ticket.status == "Resolved").count()
-
-    # Critical (Priority '4' và chưa xong)
-    critical = (
-        base_query
-        .filter(models.Ticket.priority == "4", models.Ticket.status != "Resolved")
-        .count()
-    )
-
-    return {
-        "total": total,
-        "open": open_count,
-        "in_progress": in_progress,
-        "resolved": resolved,
-        "critical": critical,
-    }
+    # 1 câu SELECT đếm có điều kiện trên khoảng created_at (dùng index),
+    # khoảng dài / không giới hạn ngày thì cộng từ bảng ticket_daily_stats
+    return ticket_stats(db, start_date, end_date)
 
 
-# Hàm phụ trợ: Xóa file tạm sau khi tải xong
-def remove_file(path: str):
-    try:
-        os.remove(path)
-    except Exception:
-        pass
-
 # ==================================================================
 # API XUẤT EXCEL (.xlsx) - BẢN HIGH PERFORMANCE (100k+ rows)
 # ==================================================================
 @router.get("/export")
 def export_tickets(
-    background_tasks: BackgroundTasks, # <--- Để xóa file sau khi gửi
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     db: Session = Depends(get_db),
@@ -262,101 +253,50 @@ def export_tickets(
     if current_user.role not in ["Admin", "Manager"]:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # 2. Chuẩn bị Query (Chưa tải dữ liệu ngay)
-    query = db.query(models.Ticket)
-    if start_date:
-        query = query.filter(func.date(models.Ticket.created_at) >= start_date)
-    if end_date:
-        query = query.filter(func.date(models.Ticket.created_at) <= end_date)
-    
-    # Sắp xếp để dữ liệu ra tuần tự đẹp mắt
-    query = query.order_by(models.Ticket.created_at.desc())
+    # 2. Ghi XLSX thẳng vào response theo từng lô dòng (app/services/ticket_export_service.py):
+    # 1 câu SELECT có JOIN, không file tạm, client nhận byte đầu tiên ngay
+    filename = f"Report_{start_date if start_date else 'All'}_to_{end_date if end_date else 'All'}.xlsx"
+    return StreamingResponse(
+        iter_tickets_xlsx(start_date, end_date),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    # 3. Tạo file tạm trên ổ cứng (Tránh dùng RAM)
-    # delete=False để file tồn tại cho đến khi gửi xong
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
 
-    try:
-        # 4. Khởi tạo Workbook chế độ Write-Only (Siêu tiết kiệm RAM)
-        wb = Workbook(write_only=True)
-        ws = wb.create_sheet("Ticket Report")
-
-        # --- TẠO HEADER CÓ STYLE ---
-        # Trong chế độ write_only, ta phải tạo Cell object để style trước khi append
-        headers = [
-            "Ticket ID", "Title", "Requester", "Assignee", 
-            "Category", "Status", "Priority", "Created At (VN)", 
-            "Resolved At (VN)", "Resolution Note"
-        ]
-        
-        # Định nghĩa Style
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-        alignment = Alignment(horizontal="center")
-
-        styled_header_cells = []
-        for title in headers:
-            cell = WriteOnlyCell(ws, value=title)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = alignment
-            styled_header_cells.append(cell)
-        
-        # Ghi dòng Header vào file
-        ws.append(styled_header_cells)
-
-        # 5. Lấy dữ liệu theo từng lô (Batching)
-        # yield_per(1000): Chỉ tải 1000 dòng vào RAM mỗi lần -> RAM luôn nhẹ
-        ticket_cursor = query.yield_per(1000)
-
-        for t in ticket_cursor:
-            # --- XỬ LÝ MÚI GIỜ VIỆT NAM (GMT+7) ---
-            created_at_vn = ""
-            if t.created_at:
-                created_at_vn = (t.created_at + timedelta(hours=7)).strftime("%d/%m/%Y %H:%M")
-            
-            resolved_at_vn = ""
-            if t.resolved_at:
-                resolved_at_vn = (t.resolved_at + timedelta(hours=7)).strftime("%d/%m/%Y %H:%M")
-
-            # --- XỬ LÝ AN TOÀN DỮ LIỆU ---
-            safe_resolution_note = getattr(t, "resolution_note", "") or ""
-
-            # Ghi dòng dữ liệu
-            ws.append([
-                t.id,
-                t.title,
-                t.requester.full_name if t.requester else "Unknown",
-                t.assignee.full_name if t.assignee else "Unassigned",
-                t.ticket_category.name if t.ticket_category else "General",
-                t.status,
-                t.priority,
-                created_at_vn,
-                resolved_at_vn,
-                safe_resolution_note
-            ])
-
-        # 6. Lưu file và đóng
-        wb.save(tmp_file.name)
-        tmp_file.close() # Đóng để giải phóng khóa file của HDH
-
-        # 7. Trả về file và dọn dẹp
-        # Đăng ký task xóa file sau khi response được gửi đi
-        background_tasks.add_task(remove_file, tmp_file.name)
-
-        filename = f"Report_{start_date if start_date else 'All'}_to_{end_date if end_date else 'All'}.xlsx"
-        
-        # Dùng FileResponse để stream file từ ổ cứng
-        return FileResponse(
-            path=tmp_file.name,
-            filename=filename,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+# --- XUẤT EXCEL CHẠY NỀN (khoảng ngày dài): gửi yêu cầu -> hỏi trạng thái -> tải file ---
+# File xong được cache theo (khoảng ngày, phiên bản dữ liệu): xuất lại khi dữ liệu chưa đổi -> có ngay
+@router.post("/export-jobs", status_code=202)
+def create_export_job(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return ticket_exports.submit(start_date, end_date)
 
-    except Exception as e:
-        # Nếu lỗi giữa chừng, xóa file rác
-        remove_file(tmp_file.name)
-        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/export-jobs/{job_id}")
+def get_export_job(job_id: str, current_user: models.User = Depends(get_current_user)):
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    job = ticket_exports.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Export job {job_id} not found")
+    return job
+
+
+@router.get("/export-jobs/{job_id}/download")
+def download_export_job(job_id: str, current_user: models.User = Depends(get_current_user)):
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    try:
+        path, filename = ticket_exports.download(job_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail=f"Export job {job_id} not found")
+    except ExportNotReady as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FileResponse(path, filename=filename, media_type=XLSX_MEDIA_TYPE)
 
 
 # --- 4. CHI TIẾT TICKET & COMMENT ---
@@ -408,6 +348,7 @@ def update_ticket(
     ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    stats_before = ticket_snapshot(ticket)
 
     is_manager = current_user.role in ["Admin", "Manager"]
 
@@ -492,7 +433,11 @@ def update_ticket(
         db.add(log)
 
     try:
+        record_ticket_stats(db, stats_before, ticket_snapshot(ticket))
+        db.flush()
+        index_ticket(db, ticket.id)
         db.commit()
+        ticket_counts.invalidate()
         db.refresh(ticket)
     except Exception as e:
         db.rollback()
@@ -539,8 +484,11 @@ def delete_ticket(ticket_id: int, db: Session = Depends(get_db), current_user =
             print(f"Lỗi xử lý xóa ảnh: {e}")
 
     # 4. Xóa dữ liệu trong DB
+    record_ticket_stats(db, ticket_snapshot(ticket), None)
+    unindex_ticket(db, ticket.id)
     db.delete(ticket)
     db.commit()
+    ticket_counts.invalidate()
 
     return {"message": "Ticket deleted successfully"}
 
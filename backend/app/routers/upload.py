@@ -1,18 +1,20 @@
 import os
-import io
-import zipfile
+import asyncio
 import logging
-import httpx
-import json
 from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, Header, HTTPException
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Request
 from fastapi.responses import FileResponse
-from PIL import Image, ImageOps
 from fastapi.responses import StreamingResponse # <--- Để trả về file dạng stream
 from pydantic import BaseModel # <--- Để validate dữ liệu gửi lên
 
 # --- SỬA ĐỔI QUAN TRỌNG: Import đúng biến thư mục nhân viên ---
-from app.config import EMPLOYEE_IMAGES_DIR, HR_API_URL 
+from app.config import HR_API_URL, PHOTO_MAX_UPLOAD_BYTES, PHOTO_ZIP_MAX_BYTES
+from app.services.photo_service import photo_processor, clean_photo_name, photo_target_path, PhotoError
+from app.services.photo_index_service import photo_index
+from app.services.photo_derivative_service import derivative_cache
+from app.services.zip_stream_service import iter_zip_stored
+from app.services.photo_sync_service import photo_sync
+from app.services.photo_import_service import spool_archive, ZipPhotoImport, ArchiveError, ArchiveTooLarge
 
 router = APIRouter()
 
@@ -26,37 +28,67 @@ async def upload_employee_images(
     if current_role not in ["admin", "manager", "hr"]:
         raise HTTPException(403, "Access Denied: Only HR/Admin can upload employee photos.")
 
-    saved_files = []
-    for file in files:
+    async def process(file: UploadFile) -> dict:
+        # Xử lý tên file: Giữ nguyên tên gốc (thường là Mã NV) để dễ map
+        clean_name = clean_photo_name(file.filename)
+        if not clean_name:
+            return {"filename": file.filename, "saved": None, "error": "Invalid file name"}
+        if file.size is not None and file.size > PHOTO_MAX_UPLOAD_BYTES:
+            return {"filename": file.filename, "saved": None, "error": "File too large"}
+
+        # Lưu vào EMPLOYEE_IMAGES_DIR, đuôi file theo PHOTO_ENCODING_PROFILE (mặc định .png)
+        path = photo_target_path(clean_name)
+        stamp = photo_index.stamp()
         try:
-            # Xử lý tên file: Giữ nguyên tên gốc (thường là Mã NV) để dễ map
-            name = os.path.splitext(file.filename)[0]
-            clean_name = "".join([c for c in name if c.isalnum() or c in ("-", "_")]).strip()
-
-            if not clean_name:
-                continue
-
-            # --- SỬA ĐỔI: Dùng đường dẫn EMPLOYEE_IMAGES_DIR ---
-            path = os.path.join(EMPLOYEE_IMAGES_DIR, f"{clean_name}.png")
-
-            # Xử lý ảnh: Convert sang PNG, xoay đúng chiều
-            content = await file.read()
-            img = Image.open(io.BytesIO(content))
-            img = ImageOps.exif_transpose(img) 
-
-            if img.mode != "RGB":
-                img = img.convert("RGB")
+            # Xử lý ảnh trong process pool: xoay đúng chiều, lưu theo profile.
+            # File upload đã được Starlette spool ra đĩa, không đọc cả file vào RAM.
+            result = await photo_processor.convert_upload(file.file, path, derivative_stem=clean_name)
+            photo_index.record(path, stamp)
+            # Ảnh cũ khác đuôi (đổi profile, ảnh .jpg chép tay) -> xóa để không che mất ảnh mới
+            await asyncio.to_thread(photo_index.remove_other_variants, path)
+            derivative_cache.record(result["derivatives"])
+        except PhotoError as e:
+            logging.warning(f"Error uploading {file.filename}: {e}")
+            return {"filename": file.filename, "saved": None, "error": str(e)}
+        finally:
+            await file.close()
+        # Trả về tên file để lưu vào DB (ví dụ: NV001.png)
+        return {"filename": file.filename, "saved": os.path.basename(path), "error": None}
+
+    # Các file xử lý song song (số ảnh chạy cùng lúc do photo_processor giới hạn)
+    results = await asyncio.gather(*(process(file) for file in files))
+    saved_files = [r["saved"] for r in results if r["saved"]]
+
+    return {"success": True, "files": saved_files, "results": results}
+
+
+@router.post("/api/upload-zip")
+async def upload_employee_zip(request: Request, x_user_role: Optional[str] = Header(None)):
+    """
+    Nhập ảnh hàng loạt từ 1 file ZIP (ảnh thợ chụp gửi), body là nguyên file ZIP
+    (Content-Type: application/zip, không phải multipart).
+    Tên từng file trong ZIP là Mã NV như upload lẻ; thư mục con không quan trọng.
+    Trả về NDJSON: mỗi dòng 1 kết quả {"filename", "saved", "error"} ngay khi ảnh đó xử lý xong,
+    dòng cuối {"done": true, "total", "saved", "failed", "seconds", "photos_per_sec"}.
+    """
+    current_role = x_user_role.strip().lower() if x_user_role else ""
+    if current_role not in ["admin", "manager", "hr"]:
+        raise HTTPException(403, "Access Denied: Only HR/Admin can upload employee photos.")
 
-            img.save(path, "PNG", optimize=True)
-            
-            # Trả về tên file để lưu vào DB (ví dụ: NV001.png)
-            saved_files.append(f"{clean_name}.png")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > PHOTO_ZIP_MAX_BYTES:
+        raise HTTPException(413, f"Archive too large (max {PHOTO_ZIP_MAX_BYTES // (1024 * 1024)} MB)")
 
-        except Exception as e:
-            print(f"Error uploading {file.filename}: {e}")
-            continue
+    try:
+        zip_path = await spool_archive(request.stream())
+        job = ZipPhotoImport(zip_path)
+        await job.open()
+    except ArchiveTooLarge as e:
+        raise HTTPException(413, str(e))
+    except ArchiveError as e:
+        raise HTTPException(400, str(e))
 
-    return {"success": True, "files": saved_files}
+    return StreamingResponse(job.stream(), media_type="application/x-ndjson")
 
 
 
@@ -69,27 +101,15 @@ def download_employee_image(employee_id: str):
     API Download ảnh nhân viên.
     Tự động tìm file theo thứ tự ưu tiên: png -> jpg -> jpeg -> webp
     """
-    # 1. Danh sách các đuôi file có thể xảy ra
-    possible_extensions = [".png", ".jpg", ".jpeg", ".webp"]
-    
-    file_path = None
-    
-    # 2. Thử tìm file với từng đuôi
-    for ext in possible_extensions:
-        # Tạo đường dẫn giả định: backend/static/images/NV01.png, NV01.jpg...
-        temp_path = os.path.join(EMPLOYEE_IMAGES_DIR, f"{employee_id}{ext}")
-        
-        if os.path.exists(temp_path):
-            file_path = temp_path
-            break # Tìm thấy thì dừng lại ngay
-    
-    # 3. Trả về file nếu tìm thấy
-    if file_path:
+    # 1. Tra chỉ mục ảnh (1 lần stat thư mục thay vì thử os.path.exists từng đuôi)
+    entry = photo_index.ensure_fresh().get(employee_id)
+
+    # 2. Trả về file nếu tìm thấy
+    if entry:
         # Lấy tên file thực tế để browser hiểu (VD: NV01.jpg)
-        filename = os.path.basename(file_path)
-        return FileResponse(file_path, filename=filename)
+        return FileResponse(entry.path, filename=entry.filename)
     
-    # 4. Nếu chạy hết vòng lặp mà vẫn không thấy -> Lỗi 404
+    # 3. Không có ảnh -> Lỗi 404
     raise HTTPException(status_code=404, detail=f"Image for employee {employee_id} not found on server.")
 
 
@@ -107,65 +127,47 @@ async def download_zip_images(request: BulkDownloadRequest):
     if not request.employee_ids:
         raise HTTPException(status_code=400, detail="No employee IDs provided")
 
-    # Tạo một file ZIP ảo trên RAM (io.BytesIO) để không hại ổ cứng
-    zip_buffer = io.BytesIO()
+    # Chỉ mục ảnh: kiểm tra thư mục 1 lần cho cả request
+    index = await asyncio.to_thread(photo_index.ensure_fresh)
 
-    # Các đuôi file ảnh cần tìm
-    possible_extensions = [".png", ".jpg", ".jpeg", ".webp"]
-    
-    files_found = 0
-
-    # Mở file ZIP để ghi dữ liệu
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        
-        # Duyệt qua từng mã nhân viên frontend gửi lên
-        for emp_id in request.employee_ids:
-            
-            # Làm sạch mã nhân viên (đề phòng injection path)
-            safe_id = "".join([c for c in emp_id if c.isalnum() or c in ("-", "_")]).strip()
-            if not safe_id: 
-                continue
-
-            # Tìm xem có file ảnh nào khớp với mã này không
-            image_path = None
-            found_ext = ""
-            
-            for ext in possible_extensions:
-                temp_path = os.path.join(EMPLOYEE_IMAGES_DIR, f"{safe_id}{ext}")
-                if os.path.exists(temp_path):
-                    image_path = temp_path
-                    found_ext = ext
-                    break
-            
-            # Nếu tìm thấy ảnh -> Nhét vào file ZIP
-            if image_path:
-                # arcname là tên file sẽ hiển thị khi giải nén ra (ví dụ: NV001.png)
-                zip_file.write(image_path, arcname=f"{safe_id}{found_ext}")
-                files_found += 1
+    # Tra trước toàn bộ ảnh (trong RAM) để còn trả 404 khi không có ảnh nào
+    found = {}
+    # Duyệt qua từng mã nhân viên frontend gửi lên
+    for emp_id in request.employee_ids:
+        # Làm sạch mã nhân viên (đề phòng injection path)
+        safe_id = "".join([c for c in emp_id if c.isalnum() or c in ("-", "_")]).strip()
+        if not safe_id or safe_id in found:
+            continue
+
+        # Tìm xem có file ảnh nào khớp với mã này không
+        entry = index.get(safe_id)
+        if entry:
+            # arcname là tên file sẽ hiển thị khi giải nén ra (ví dụ: NV001.png)
+            found[safe_id] = (entry.path, entry.filename)
 
     # Nếu chạy hết vòng lặp mà không tìm thấy ảnh nào
-    if files_found == 0:
+    if not found:
         raise HTTPException(status_code=404, detail="No images found for the provided IDs")
 
-    # Đưa con trỏ file về đầu để chuẩn bị đọc trả về client
-    zip_buffer.seek(0)
-
-    # Trả về file ZIP dưới dạng Stream
+    # Trả về file ZIP dưới dạng Stream: ghi từng ảnh (không nén lại) rồi gửi ngay,
+    # không dựng cả file ZIP trên RAM
     filename = "Employee_Images.zip"
     return StreamingResponse(
-        zip_buffer, 
+        iter_zip_stored(found.values()),
         media_type="application/zip", 
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
 
-# --- 4. API ĐỒNG BỘ ẢNH TỪ MÃ CŨ (CẬP NHẬT CHUẨN ASMX) ---
-@router.post("/api/sync-old-photos")
+# --- 4. API ĐỒNG BỘ ẢNH TỪ MÃ CŨ (CHẠY NỀN, CÓ CHECKPOINT) ---
+@router.post("/api/sync-old-photos", status_code=202)
 async def sync_old_photos(x_user_role: Optional[str] = Header(None)):
     """
     Tự động copy ảnh từ Mã Cũ -> Mã Mới.
-    Sử dụng logic gọi HR Server chuẩn (POST + Parse 'd').
+    Chạy nền (app/services/photo_sync_service.py): API trả ngay job_id,
+    Frontend theo dõi tiến độ qua GET /api/sync-old-photos/{job_id}.
+    Job trước bị ngắt giữa chừng -> gọi lại API này sẽ chạy tiếp từ checkpoint.
     """
     # 1. Check quyền
     current_role = x_user_role.strip().lower() if x_user_role else ""
@@ -173,104 +175,16 @@ async def sync_old_photos(x_user_role: Optional[str] = Header(None)):
         raise HTTPException(status_code=403, detail="Access Denied")
 
     logging.info(f"Starting Sync Photos. Fetching data from: {HR_API_URL}")
-    
-    # --- BẮT ĐẦU LOGIC GỌI HR (GIỐNG FILE EMPLOYEES.PY) ---
-    payload = {"arg_UserId": "", "arg_Pass": ""}
-    headers = {"Content-Type": "application/json; charset=utf-8"}
-    employees = []
-
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # 🔥 SỬA: Dùng POST thay vì GET
-            response = await client.post(HR_API_URL, json=payload, headers=headers)
-            
-            if response.status_code != 200:
-                logging.error(f"HR Error Body: {response.text}")
-                raise HTTPException(status_code=502, detail=f"HR Server Error: {response.status_code}")
-
-            raw_text = response.text
-            
-            # 🔥 SỬA: Logic parse JSON đặc thù của .asmx (Xử lý chữ "d")
-            decoder = json.JSONDecoder()
-            json_response, idx = decoder.raw_decode(raw_text)
-
-            if "d" in json_response:
-                data_obj = (
-                    json.loads(json_response["d"])
-                    if isinstance(json_response["d"], str)
-                    else json_response["d"]
-                )
-            else:
-                data_obj = json_response
-
-            # Kiểm tra success và lấy data
-            if (
-                isinstance(data_obj, dict)
-                and data_obj.get("success") == True
-                and "data" in data_obj
-            ):
-                employees = data_obj["data"]
-            else:
-                logging.warning("HR Response format valid but success=False or no data found.")
-                
-    except Exception as e:
-        logging.error(f"Failed to fetch employee list for sync: {e}")
-        raise HTTPException(status_code=502, detail=f"Cannot fetch HR Data: {str(e)}")
-    
-    # --- KẾT THÚC LOGIC GỌI HR ---
-
-    if not employees:
-        return {"message": "No employees found or HR Error.", "synced_count": 0}
-
-    # 3. Xử lý đồng bộ ảnh (Logic này giữ nguyên vì đã đúng)
-    synced_count = 0
-    logs = []
-    source_extensions = [".png", ".jpg", ".jpeg", ".webp"]
-
-    for emp in employees:
-        # Lưu ý: WebService trả về key thường là chữ thường, kiểm tra kỹ
-        new_id = str(emp.get("employee_id", "")).strip()
-        old_id = str(emp.get("employee_old_id", "")).strip()
-
-        if not old_id or not new_id or new_id == old_id:
-            continue
-
-        target_path = os.path.join(EMPLOYEE_IMAGES_DIR, f"{new_id}.png")
-
-        # Nếu ảnh mới đã có -> Bỏ qua
-        if os.path.exists(target_path):
-            continue
-
-        # Tìm ảnh cũ
-        source_path = None
-        for ext in source_extensions:
-            temp_path = os.path.join(EMPLOYEE_IMAGES_DIR, f"{old_id}{ext}")
-            if os.path.exists(temp_path):
-                source_path = temp_path
-                break
-        
-        # Copy và Convert
-        if source_path:
-            try:
-                with Image.open(source_path) as img:
-                    img = ImageOps.exif_transpose(img)
-                    if img.mode != "RGB":
-                        img = img.convert("RGB")
-                    img.save(target_path, "PNG", optimize=True)
-
-                log_msg = f"Auto-copied image for Old ID: {old_id} -> New ID: {new_id}"
-                logging.info(log_msg)
-                print(log_msg)
-                logs.append(log_msg)
-                synced_count += 1
-            except Exception as e:
-                logging.error(f"Error syncing {old_id} -> {new_id}: {e}")
-
-    result_msg = f"Sync process completed. Total synced: {synced_count}"
-    
-    return {
-        "success": True,
-        "message": result_msg,
-        "synced_count": synced_count,
-        "details": logs
-    }
\ No newline at end of file
+        return await photo_sync.start()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/api/sync-old-photos/{job_id}")
+async def get_sync_old_photos_job(job_id: str):
+    """Tiến độ / kết quả của 1 job đồng bộ ảnh."""
+    job = await photo_sync.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Sync job {job_id} not found")
+    return job
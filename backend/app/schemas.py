@@ -112,6 +112,22 @@ class PrintRequest(BaseModel):
     printed_by: str = "Admin"
 
 
+class CardRenderItem(BaseModel):
+    employee_id: str
+    reason: Optional[str] = None
+
+
+class CardRenderRequest(BaseModel):
+    employees: List[CardRenderItem]
+    reason: str = "New Issue"
+    printed_by: str = "Admin"
+    format: str = "pdf"  # pdf | png
+    layout: str = "card"  # card: mỗi trang 1 thẻ (máy in thẻ) | a4: xếp nhiều thẻ trên khổ A4
+    show_stamp: bool = False
+    bg_option: int = 1  # Nền thẻ ngang: 1 = card-bg-horizontal.png, 2 = card-bg-horizontal-2.png
+    log: bool = True  # False: chỉ xem trước, không ghi lịch sử in
+
+
 class ToolPrintCreate(BaseModel):
     card_type: str
     serial_number: str
@@ -227,12 +243,37 @@ class TicketStats(BaseModel):
 
 class TicketPaginationResponse(BaseModel):
     items: List[TicketResponse]  # Danh sách ticket của trang hiện tại
-    total: int  # Tổng số lượng ticket trong DB
+    total: Optional[int] = None  # Tổng số ticket theo bộ lọc (null khi include_total=false)
     page: int  # Trang hiện tại
     size: int  # Kích thước trang (10, 20...)
+    next_cursor: Optional[str] = None  # Gửi lại qua ?cursor= để lấy trang sau (null = trang cuối)
+    prev_cursor: Optional[str] = None  # Gửi lại qua ?cursor= để lấy trang trước (null = trang đầu)
+
+    model_config = ConfigDict(from_attributes=True)
+
 
+class TicketSearchHit(BaseModel):
+    # Ticket tìm thấy (không kèm bình luận) + điểm khớp (lớn = khớp hơn)
+    id: int
+    title: str
+    status: str
+    priority: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    requester: Optional[UserShortInfo] = None
+    assignee: Optional[UserShortInfo] = None
+    ticket_category: Optional[TicketCategoryResponse] = None
+    rank: float = 0.0
     model_config = ConfigDict(from_attributes=True)
 
 
+class TicketSearchResponse(BaseModel):
+    items: List[TicketSearchHit]
+    limit: int
+    offset: int
+    took_ms: float  # Thời gian truy vấn phía server
+
+
 # Xử lý tham chiếu vòng
 TicketResponse.model_rebuild()
@@ -0,0 +1,492 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Iterator
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from app.config import CARD_ASSETS_DIR, CARD_FONT_DIR, CARD_RENDER_DPI
+from app.services.photo_service import photo_processor
+from app.services.photo_index_service import PhotoIndex
+
+logger = logging.getLogger(__name__)
+
+# --- QUY TẮC CHỌN MẪU THẺ (giống frontend/src/components/print/IdCard.jsx) ---
+MATERNITY_TYPES = ("Pregnancy (>7 months)", "Has Baby", "Pregnancy Register")
+PORTRAIT_ROLES = ("Worker", "Training")
+PACKING_DEPTS = ("PACKING 1", "KHO")
+
+# Thẻ CR80 (mm)
+CARD_LONG_MM = 87
+CARD_SHORT_MM = 55
+
+# Khổ A4 khi xếp nhiều thẻ / trang: lề và khoảng cách giữa các thẻ (mm)
+A4_MM = (210, 297)
+A4_MARGIN_MM = 8
+A4_GAP_MM = 4
+
+# Số trang mỗi lượt gửi sang process con (ít lượt hơn -> ít chi phí chuyển dữ liệu giữa process)
+PAGES_PER_TASK = 25
+
+# Font theo độ đậm: thử lần lượt (Roboto đặt trong CARD_FONT_DIR, rồi font hệ thống có dấu tiếng Việt)
+FONT_CANDIDATES = {
+    "regular": ("Roboto-Regular.ttf", "arial.ttf", "DejaVuSans.ttf"),
+    "medium": ("Roboto-Medium.ttf", "Roboto-Regular.ttf", "arial.ttf", "DejaVuSans.ttf"),
+    "bold": ("Roboto-Bold.ttf", "arialbd.ttf", "DejaVuSans-Bold.ttf"),
+}
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value or value == "00/00/0000":
+        return None
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d"):
+        try:
+            return datetime.strptime(str(value)[:10], fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _fmt_date(value: Optional[date]) -> Optional[str]:
+    return value.strftime("%d/%m/%Y") if value else None
+
+
+def card_design(emp: Dict[str, Any], bg_option: int = 1) -> Dict[str, Any]:
+    """Hướng thẻ, file nền, dòng thông tin thai sản của 1 nhân viên."""
+    maternity_type = emp.get("maternity_type") or ""
+    is_maternity = maternity_type in MATERNITY_TYPES
+    portrait = emp.get("employee_type") in PORTRAIT_ROLES and not is_maternity
+    department = (emp.get("employee_department") or "").upper().strip()
+
+    maternity = None
+    if maternity_type == "Has Baby":
+        background = "baby-ngang.png"
+    elif is_maternity:
+        background = "bau-ngang.png"
+    elif portrait:
+        background = "card-bg-vertical_2.png" if department in PACKING_DEPTS else "card-bg-vertical.png"
+    else:
+        background = "card-bg-horizontal.png" if bg_option == 1 else "card-bg-horizontal-2.png"
+
+    if is_maternity:
+        begin = _fmt_date(_parse_date(emp.get("maternity_begin")))
+        end = _parse_date(emp.get("maternity_end"))
+        if maternity_type == "Has Baby":
+            end = _fmt_date(end)
+            maternity = (
+                f"Từ ngày: {begin}" if begin else "Từ ngày: ---",
+                f"Đến ngày: {end}" if end else "Đến ngày: ---",
+            )
+        else:
+            week7 = _fmt_date(end + timedelta(days=1)) if end else None
+            maternity = (
+                f"Ngày thông báo mang thai: {begin}" if begin else "Ngày TB bầu: ---",
+                f"Ngày thai từ 7 tháng: {week7}" if week7 else "Bầu 7 tháng từ: ---",
+            )
+    return {"portrait": portrait, "background": background, "maternity": maternity}
+
+
+# --- CHẠY TRONG PROCESS CON: NỀN / CON DẤU / FONT GIẢI MÃ 1 LẦN, GIỮ TRONG RAM ---
+def _mm(value: float, dpi: int) -> int:
+    return round(value * dpi / 25.4)
+
+
+def _css(px: float, dpi: int) -> float:
+    """Kích thước CSS (96 px / inch) -> pixel ở dpi in."""
+    return px * dpi / 96
+
+
+@lru_cache(maxsize=16)
+def _template(name: str, size: Tuple[int, int]) -> Image.Image:
+    path = os.path.join(CARD_ASSETS_DIR, name)
+    try:
+        with Image.open(path) as img:
+            # background-size: cover
+            return ImageOps.fit(img.convert("RGB"), size, Image.LANCZOS)
+    except OSError as e:
+        logger.warning(f"Card template {path} unavailable ({e}), using blank background")
+        return Image.new("RGB", size, "white")
+
+
+@lru_cache(maxsize=8)
+def _stamp(width: int, angle: float) -> Optional[Image.Image]:
+    """Con dấu đã thu nhỏ, mờ 80% (opacity: 0.8) và xoay sẵn."""
+    try:
+        with Image.open(os.path.join(CARD_ASSETS_DIR, "stamp.png")) as img:
+            stamp = img.convert("RGBA")
+    except OSError:
+        return None
+    height = max(1, round(stamp.height * width / stamp.width))
+    stamp = stamp.resize((width, height), Image.LANCZOS)
+    stamp.putalpha(stamp.getchannel("A").point(lambda a: round(a * 0.8)))
+    return stamp.rotate(angle, resample=Image.BICUBIC, expand=True)
+
+
+@lru_cache(maxsize=64)
+def _font(weight: str, size: int) -> ImageFont.FreeTypeFont:
+    for name in FONT_CANDIDATES[weight]:
+        for path in (os.path.join(CARD_FONT_DIR, name), name):
+            try:
+                # Chỉ tên file -> Pillow tự tìm trong thư mục font của hệ thống
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+
+def _fit_font(draw: ImageDraw.ImageDraw, text: str, weight: str, size: float, max_width: float, dpi: int):
+    """Font cỡ size (px CSS), thu nhỏ dần nếu chữ không vừa 1 dòng (họ tên dài)."""
+    px = max(1, round(_css(size, dpi)))
+    font = _font(weight, px)
+    while px > 8 and draw.textlength(text, font=font) > max_width:
+        px -= 1
+        font = _font(weight, px)
+    return font
+
+
+def _wrap(draw: ImageDraw.ImageDraw, text: str, font, max_width: float) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and draw.textlength(candidate, font=font) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines or [""]
+
+
+def _photo_tile(photo: Optional[str], size: Tuple[int, int], placeholder: Tuple, dpi: int) -> Image.Image:
+    """Ảnh nhân viên lấp đầy khung (object-fit: cover). Không có / hỏng -> ô 'NO PHOTO'."""
+    if photo:
+        try:
+            with Image.open(photo) as img:
+                if img.format == "JPEG":
+                    img.draft("RGB", size)
+                return ImageOps.fit(img.convert("RGB"), size, Image.LANCZOS)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Card photo {photo} unreadable: {e}")
+    background, color = placeholder
+    tile = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(tile)
+    draw.text(
+        (size[0] / 2, size[1] / 2), "NO PHOTO", fill=color,
+        font=_font("bold", round(_css(10, dpi))), anchor="mm",
+    )
+    return tile
+
+
+def _paste_rounded(canvas: Image.Image, tile: Image.Image, xy: Tuple[int, int], radius: int):
+    mask = Image.new("L", tile.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, tile.width - 1, tile.height - 1), radius, fill=255)
+    canvas.paste(tile, xy, mask)
+
+
+def _draw_lines(draw, lines, font, cx: float, y: float, line_height: float, fill) -> float:
+    for line in lines:
+        draw.text((cx, y), line, font=font, fill=fill, anchor="ma")
+        y += line_height
+    return y
+
+
+def render_card(card: Dict[str, Any], dpi: int = CARD_RENDER_DPI) -> Image.Image:
+    """1 thẻ hoàn chỉnh (RGB) theo bố cục của HorizontalCard.jsx / VerticalCard.jsx."""
+    design = card_design(card, card.get("bg_option", 1))
+    if design["portrait"]:
+        return _render_vertical(card, design, dpi)
+    return _render_horizontal(card, design, dpi)
+
+
+def _render_horizontal(card: Dict[str, Any], design: Dict[str, Any], dpi: int) -> Image.Image:
+    size = (_mm(CARD_LONG_MM, dpi), _mm(CARD_SHORT_MM, dpi))
+    canvas = _template(design["background"], size).copy()
+    maternity = design["maternity"]
+    text_color = (0, 0, 0) if maternity else (255, 255, 255)
+
+    # Khung ảnh 26 x 36 mm, cách trái 4 mm, cách trên 13 mm, bo góc 8px
+    frame = (_mm(4, dpi), _mm(13, dpi), _mm(26, dpi), _mm(36, dpi))
+    placeholder = ((240, 240, 240), (160, 160, 160))
+    tile = _photo_tile(card.get("photo"), frame[2:], placeholder, dpi)
+    if card.get("show_stamp"):
+        # Con dấu 12 mm, lệch ra ngoài góc phải dưới khung 2 mm (phần thừa bị khung cắt như trên web)
+        stamp = _stamp(_mm(12, dpi), 15)
+        if stamp is not None:
+            unrotated_h = _mm(12 * 113 / 216, dpi)
+            cx = frame[2] + _mm(2, dpi) - _mm(12, dpi) / 2
+            cy = frame[3] + _mm(2, dpi) - unrotated_h / 2
+            tile.paste(stamp, (round(cx - stamp.width / 2), round(cy - stamp.height / 2)), stamp)
+    radius = round(_css(8, dpi))
+    _paste_rounded(canvas, tile, frame[:2], radius)
+
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+    odraw = ImageDraw.Draw(overlay)
+    border = (0, 0, 0, 255) if maternity else (255, 255, 255, 153)
+    odraw.rounded_rectangle(
+        (frame[0], frame[1], frame[0] + frame[2] - 1, frame[1] + frame[3] - 1),
+        radius, outline=border, width=max(1, round(_css(1, dpi))),
+    )
+
+    # Thông tin thai sản: góc phải trên, nền trắng 80%, chữ đỏ 9px căn phải
+    if maternity:
+        font = _font("regular", round(_css(9, dpi)))
+        line_h = _css(9 * 1.4, dpi)
+        pad_x, pad_y = _mm(2, dpi), _mm(1, dpi)
+        box_w = max(odraw.textlength(line, font=font) for line in maternity) + 2 * pad_x
+        box_h = line_h * len(maternity) + 2 * pad_y
+        right, top = size[0] - _mm(3, dpi), _mm(3, dpi)
+        odraw.rounded_rectangle(
+            (right - box_w, top, right, top + box_h), round(_css(4, dpi)), fill=(255, 255, 255, 204)
+        )
+    canvas = Image.alpha_composite(canvas.convert("RGBA"), overlay).convert("RGB")
+    draw = ImageDraw.Draw(canvas)
+    if maternity:
+        for i, line in enumerate(maternity):
+            draw.text(
+                (right - pad_x, top + pad_y + i * line_h), line, font=font, fill=(255, 0, 0), anchor="ra"
+            )
+
+    # Cột thông tin: từ 30 mm đến mép phải - 4 mm, các dòng căn giữa, cả khối căn giữa theo chiều dọc
+    left, right_edge = _mm(30, dpi), size[0] - _mm(4, dpi)
+    cx, col_w = (left + right_edge) / 2, right_edge - left
+    position_font = _font("bold", round(_css(9, dpi)))
+    position_lines = _wrap(draw, (card.get("employee_position") or "").upper(), position_font, col_w * 0.85)
+    name = card.get("employee_name") or ""
+    name_font = _fit_font(draw, name, "bold", 15, col_w, dpi)
+    id_font = _font("bold", round(_css(13, dpi)))
+    dept_font = _font("bold", round(_css(9.5, dpi)))
+
+    blocks = [
+        (position_lines, position_font, _css(9 * 1.2, dpi), _mm(2, dpi), _mm(2, dpi)),
+        ([name], name_font, _css(15 * 1.2, dpi), _mm(1, dpi), _mm(1, dpi)),
+        ([card.get("employee_id") or ""], id_font, _css(13 * 1.2, dpi), _mm(1, dpi), 0),
+        ([(card.get("employee_department") or "").upper()], dept_font, _css(9.5 * 1.2, dpi), _mm(2, dpi), 0),
+    ]
+    total_h = sum(len(lines) * lh + mt + mb for lines, _, lh, mt, mb in blocks)
+    y = (size[1] - total_h) / 2
+    for lines, font, line_h, margin_top, margin_bottom in blocks:
+        y = _draw_lines(draw, lines, font, cx, y + margin_top, line_h, text_color) + margin_bottom
+    return canvas
+
+
+def _render_vertical(card: Dict[str, Any], design: Dict[str, Any], dpi: int) -> Image.Image:
+    size = (_mm(CARD_SHORT_MM, dpi), _mm(CARD_LONG_MM, dpi))
+    canvas = _template(design["background"], size).copy()
+
+    # Khung ảnh 32 x 40 mm, căn giữa, cách trên 12.5 mm, nền trắng
+    frame_w, frame_h = _mm(32, dpi), _mm(40, dpi)
+    frame = ((size[0] - frame_w) // 2, _mm(12.5, dpi), frame_w, frame_h)
+    tile = _photo_tile(card.get("photo"), frame[2:], ((245, 245, 245), (187, 187, 187)), dpi)
+    if card.get("show_stamp"):
+        # scale(0.85) rotate(-5deg) của khung con dấu + rotate(-15deg) của con dấu
+        stamp_w = _mm(12 * 0.85, dpi)
+        stamp = _stamp(stamp_w, 20)
+        if stamp is not None:
+            cx = frame[2] + _mm(2, dpi) - stamp_w / 2
+            cy = frame[3] + _mm(1, dpi) - stamp_w * 113 / 216 / 2
+            tile.paste(stamp, (round(cx - stamp.width / 2), round(cy - stamp.height / 2)), stamp)
+    radius = round(_css(8, dpi))
+    _paste_rounded(canvas, tile, frame[:2], radius)
+
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+    ImageDraw.Draw(overlay).rounded_rectangle(
+        (frame[0], frame[1], frame[0] + frame[2] - 1, frame[1] + frame[3] - 1),
+        radius, outline=(0, 0, 0, 51), width=max(1, round(_css(0.5, dpi))),
+    )
+    canvas = Image.alpha_composite(canvas.convert("RGBA"), overlay).convert("RGB")
+    draw = ImageDraw.Draw(canvas)
+
+    cx = size[0] / 2
+    y = frame[1] + frame[3] + _mm(2, dpi)
+    # 1. Chức vụ: ô cao tối thiểu 22px, chữ căn giữa theo chiều dọc
+    position_font = _font("regular", round(_css(11, dpi)))
+    position_lines = _wrap(draw, (card.get("employee_position") or "").upper(), position_font, size[0] - _mm(8, dpi))
+    line_h = _css(11 * 1.2, dpi)
+    box_h = max(_css(22, dpi), line_h * len(position_lines))
+    _draw_lines(draw, position_lines, position_font, cx, y + (box_h - line_h * len(position_lines)) / 2, line_h, (0, 0, 0))
+    y += box_h + _mm(1, dpi)
+    # 2. Họ tên: xuống dòng trong 48 mm
+    name_font = _font("bold", round(_css(13, dpi)))
+    name_lines = _wrap(draw, card.get("employee_name") or "", name_font, _mm(48, dpi))
+    y = _draw_lines(draw, name_lines, name_font, cx, y, _css(13 * 1.2, dpi), (0, 0, 0)) + _mm(1, dpi)
+    # 3. Mã nhân viên
+    id_font = _font("bold", round(_css(11.5, dpi)))
+    y = _draw_lines(draw, [card.get("employee_id") or ""], id_font, cx, y, _css(11.5 * 1.2, dpi), (0, 0, 0))
+    # 4. Bộ phận
+    dept_font = _font("medium", round(_css(10, dpi)))
+    _draw_lines(
+        draw, [(card.get("employee_department") or "").upper()], dept_font, cx, y + _mm(2, dpi),
+        _css(10 * 1.2, dpi), (38, 38, 38),
+    )
+    return canvas
+
+
+def _a4_grid(portrait: bool, dpi: int) -> Tuple[int, int, int, int]:
+    """Số cột, số hàng, rộng, cao (px) của 1 thẻ khi xếp trên A4 dọc."""
+    card_w, card_h = (CARD_SHORT_MM, CARD_LONG_MM) if portrait else (CARD_LONG_MM, CARD_SHORT_MM)
+    usable_w, usable_h = A4_MM[0] - 2 * A4_MARGIN_MM, A4_MM[1] - 2 * A4_MARGIN_MM
+    cols = int((usable_w + A4_GAP_MM) // (card_w + A4_GAP_MM))
+    rows = int((usable_h + A4_GAP_MM) // (card_h + A4_GAP_MM))
+    return cols, rows, _mm(card_w, dpi), _mm(card_h, dpi)
+
+
+def _render_page(page: Dict[str, Any], dpi: int) -> Image.Image:
+    cards = page["cards"]
+    if page["layout"] == "card":
+        return render_card(cards[0], dpi)
+
+    cols, rows, card_w, card_h = _a4_grid(page["portrait"], dpi)
+    sheet = Image.new("RGB", (_mm(A4_MM[0], dpi), _mm(A4_MM[1], dpi)), "white")
+    draw = ImageDraw.Draw(sheet)
+    gap, margin = _mm(A4_GAP_MM, dpi), _mm(A4_MARGIN_MM, dpi)
+    # Căn giữa lưới thẻ trên trang
+    left = (sheet.width - cols * card_w - (cols - 1) * gap) // 2
+    top = max(margin, (sheet.height - rows * card_h - (rows - 1) * gap) // 2)
+    for i, card in enumerate(cards):
+        x = left + (i % cols) * (card_w + gap)
+        y = top + (i // cols) * (card_h + gap)
+        sheet.paste(render_card(card, dpi), (x, y))
+        # Đường cắt mảnh
+        draw.rectangle((x - 1, y - 1, x + card_w, y + card_h), outline=(200, 200, 200))
+    return sheet
+
+
+def render_pages(pages: List[Dict[str, Any]], out_dir: str, fmt: str, dpi: int) -> List[Dict[str, Any]]:
+    """
+    Render 1 nhóm trang, ghi thẳng ra out_dir (process con chỉ trả đường dẫn, không trả bytes ảnh).
+    fmt = png: PNG nén nhanh (không mất dữ liệu) | pdf: JPEG chất lượng cao để nhúng vào PDF.
+    """
+    written = []
+    for page in pages:
+        img = _render_page(page, dpi)
+        path = os.path.join(out_dir, f"page_{page['number']:05d}.{'png' if fmt == 'png' else 'jpg'}")
+        if fmt == "png":
+            img.save(path, "PNG", compress_level=1, dpi=(dpi, dpi))
+        else:
+            img.save(path, "JPEG", quality=95, subsampling=0, dpi=(dpi, dpi))
+        written.append({"path": path, "width": img.width, "height": img.height})
+    return written
+
+
+# --- PDF: GHÉP CÁC TRANG JPEG (không giải mã lại, ghi theo luồng) ---
+def iter_pdf_from_jpegs(pages: List[Dict[str, Any]], dpi: int) -> Iterator[bytes]:
+    """
+    PDF tối giản: mỗi trang 1 ảnh JPEG (DCTDecode) phủ kín trang, kích thước trang theo dpi.
+    Đọc từng file JPEG và gửi đi ngay, RAM không phụ thuộc số trang.
+    """
+    offsets: List[int] = []
+    written = 0
+
+    def emit(data: bytes) -> bytes:
+        nonlocal written
+        written += len(data)
+        return data
+
+    def start_obj() -> bytes:
+        offsets.append(written)
+        return emit(f"{len(offsets)} 0 obj\n".encode())
+
+    yield emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    n = len(pages)
+    # Đánh số: 1 catalog, 2 pages, rồi mỗi trang 3 object (page, image, content)
+    kids = " ".join(f"{3 + i * 3} 0 R" for i in range(n))
+    yield start_obj() + emit(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+    yield start_obj() + emit(f"<< /Type /Pages /Count {n} /Kids [{kids}] >>\nendobj\n".encode())
+    for i, page in enumerate(pages):
+        image_obj, content_obj = 4 + i * 3, 5 + i * 3  # Object trang là 3 + i * 3 (xem kids)
+        w_pt = page["width"] * 72 / dpi
+        h_pt = page["height"] * 72 / dpi
+        yield start_obj() + emit(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_obj} 0 R >> >> /Contents {content_obj} 0 R >>\n"
+            f"endobj\n".encode()
+        )
+        size = os.path.getsize(page["path"])
+        yield start_obj() + emit(
+            f"<< /Type /XObject /Subtype /Image /Width {page['width']} /Height {page['height']} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {size} >>\nstream\n".encode()
+        )
+        with open(page["path"], "rb") as f:
+            while True:
+                chunk = f.read(256 * 1024)
+                if not chunk:
+                    break
+                yield emit(chunk)
+        yield emit(b"\nendstream\nendobj\n")
+        content = f"q {w_pt:.2f} 0 0 {h_pt:.2f} 0 0 cm /Im0 Do Q".encode()
+        yield start_obj() + emit(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream\nendobj\n")
+
+    xref_at = written
+    xref = [f"xref\n0 {len(offsets) + 1}\n", "0000000000 65535 f \n"]
+    xref += [f"{offset:010d} 00000 n \n" for offset in offsets]
+    xref.append(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+    yield emit("".join(xref).encode())
+
+
+# --- PROCESS CHÍNH: CHUẨN BỊ DỮ LIỆU + CHIA VIỆC CHO POOL ---
+def _photo_source(emp_id: str, index: PhotoIndex) -> Optional[str]:
+    """Ảnh gốc của nhân viên: thẻ để in, không dùng ảnh thu nhỏ WebP (nén mất dữ liệu)."""
+    entry = index.get(emp_id)
+    return entry.path if entry else None
+
+
+def plan_pages(cards: List[Dict[str, Any]], layout: str, dpi: int) -> List[Dict[str, Any]]:
+    """Chia thẻ thành trang. A4: thẻ ngang và thẻ dọc xếp trên các trang riêng."""
+    if layout == "card":
+        return [{"layout": "card", "cards": [card], "portrait": None} for card in cards]
+    pages = []
+    for portrait in (False, True):
+        group = [card for card in cards if card_design(card, card.get("bg_option", 1))["portrait"] == portrait]
+        cols, rows, _, _ = _a4_grid(portrait, dpi)
+        per_page = cols * rows
+        for start in range(0, len(group), per_page):
+            pages.append({"layout": "a4", "cards": group[start:start + per_page], "portrait": portrait})
+    return pages
+
+
+async def render_cards(
+    employees: Iterable[Dict[str, Any]],
+    index: PhotoIndex,
+    out_dir: str,
+    fmt: str = "pdf",
+    layout: str = "card",
+    show_stamp: bool = False,
+    bg_option: int = 1,
+    dpi: int = CARD_RENDER_DPI,
+) -> Dict[str, Any]:
+    """Render thẻ cho danh sách nhân viên (dict như trong roster) ra out_dir, song song trong photo_processor."""
+    started = time.perf_counter()
+    cards = [
+        {
+            **emp,
+            "photo": _photo_source(emp.get("employee_id", ""), index),
+            "show_stamp": show_stamp,
+            "bg_option": bg_option,
+        }
+        for emp in employees
+    ]
+    pages = plan_pages(cards, layout, dpi)
+    for number, page in enumerate(pages, start=1):
+        page["number"] = number
+
+    chunk = max(1, min(PAGES_PER_TASK, math.ceil(len(pages) / photo_processor.workers)))
+    tasks = [
+        photo_processor.run(render_pages, pages[start:start + chunk], out_dir, fmt, dpi)
+        for start in range(0, len(pages), chunk)
+    ]
+    written = [page for group in await asyncio.gather(*tasks) for page in group]
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Rendered {len(cards)} cards -> {len(written)} {fmt} pages ({layout}) in {elapsed:.2f} s"
+    )
+    return {
+        "pages": written,
+        "cards": len(cards),
+        "missing_photos": sum(1 for card in cards if not card["photo"]),
+        "seconds": round(elapsed, 2),
+    }
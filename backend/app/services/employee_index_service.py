@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from array import array
+from datetime import date
+from typing import List, Optional, Dict, Iterable
+
+from app.services.employee_search_service import fold_text
+from app.services.roster_service import EmployeeRoster, iso_to_ordinal
+
+logger = logging.getLogger(__name__)
+
+# Các trường lọc dạng "bằng giá trị" -> hash map: giá trị -> tập vị trí
+FILTER_FIELDS = (
+    "employee_department",
+    "employee_status",
+    "employee_type",
+    "maternity_type",
+)
+
+# Các trường ngày lọc theo khoảng -> mảng ordinal đã sắp xếp
+DATE_FIELDS = (
+    "employee_join_date",
+    "contract_begin",
+    "contract_end",
+)
+
+# Các trường cho phép sắp xếp
+SORT_FIELDS = (
+    "employee_id",
+    "employee_name",
+    "employee_department",
+    "employee_position",
+    "employee_status",
+    "employee_type",
+    "employee_join_date",
+    "contract_end",
+)
+
+# Tập ứng viên nhỏ hơn n / SORT_RATIO thì sort trực tiếp,
+# lớn hơn thì duyệt mảng thứ tự đã dựng sẵn
+SORT_RATIO = 8
+
+
+def _parse_date(value: Optional[str]) -> Optional[int]:
+    """Ngày lọc YYYY-MM-DD -> ordinal (None nếu bỏ trống). Sai định dạng -> ValueError."""
+    if not value:
+        return None
+    ordinal = iso_to_ordinal(value)
+    if ordinal is None:
+        raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+    return ordinal
+
+
+def _compact(positions: List[int]) -> array:
+    return array("I", positions)
+
+
+class EmployeeIndex:
+    """
+    Chỉ mục in-memory cho 1 snapshot HR (dựng 1 lần, chỉ đọc sau đó).
+    - hash_index: trường lọc -> giá trị -> frozenset vị trí
+    - date_index: trường ngày -> (mảng ordinal đã sort, mảng vị trí tương ứng)
+    - order / rank: thứ tự sắp xếp dựng sẵn cho từng trường sort (mảng số nguyên)
+    """
+
+    def __init__(self, roster: EmployeeRoster, version: int):
+        started = time.perf_counter()
+        self.roster = roster
+        self.version = version
+        n = len(roster)
+
+        # 1. Hash map cho trường lọc (gom theo mã của cột phân loại)
+        self.hash_index: Dict[str, Dict[str, frozenset]] = {}
+        for field in FILTER_FIELDS:
+            column = roster.categorical[field]
+            by_code = defaultdict(list)
+            for pos, code in enumerate(column.codes):
+                by_code[code].append(pos)
+            buckets = defaultdict(list)
+            for code, positions in by_code.items():
+                buckets[column.values[code] or ""].extend(positions)
+            self.hash_index[field] = {k: frozenset(v) for k, v in buckets.items()}
+
+        # 2. Mảng ordinal đã sắp xếp cho trường ngày (bỏ qua ngày không hợp lệ)
+        self.date_index: Dict[str, tuple] = {}
+        for field in DATE_FIELDS:
+            ordinals = roster.dates[field].ordinals
+            positions = sorted(
+                (pos for pos in range(n) if ordinals[pos] > 0),
+                key=ordinals.__getitem__,
+            )
+            self.date_index[field] = (
+                array("i", (ordinals[pos] for pos in positions)),
+                _compact(positions),
+            )
+
+        # 3. Thứ tự sắp xếp (tăng & giảm), giá trị rỗng luôn nằm cuối
+        # order: danh sách vị trí theo thứ tự; rank: vị trí -> thứ hạng
+        self.order: Dict[tuple, array] = {}
+        self.rank: Dict[tuple, array] = {}
+        for field in SORT_FIELDS:
+            values = roster.column(field)
+            filled = sorted(
+                (pos for pos in range(n) if values[pos]),
+                key=lambda pos: str(values[pos]).lower(),
+            )
+            empties = [pos for pos in range(n) if not values[pos]]
+            for descending, order in (
+                (False, filled + empties),
+                (True, filled[::-1] + empties),
+            ):
+                rank = array("I", bytes(4 * n))
+                for r, pos in enumerate(order):
+                    rank[pos] = r
+                self.order[(field, descending)] = _compact(order)
+                self.rank[(field, descending)] = rank
+
+        # 4. Chuỗi tìm kiếm (mã NV, mã cũ, tên) đã bỏ dấu, viết thường
+        self.haystack = [
+            " ".join(fold_text(v) for v in key)
+            for key in zip(
+                roster.column("employee_id"),
+                roster.column("employee_old_id"),
+                roster.column("employee_name"),
+            )
+        ]
+
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Employee index v{version} built: {n} rows in {self.build_ms} ms")
+
+    def __len__(self):
+        return len(self.roster)
+
+    # --- LỌC ---
+    def filter(
+        self,
+        filters: Dict[str, Iterable[str]],
+        date_ranges: Dict[str, tuple],
+        q: Optional[str] = None,
+    ) -> Optional[set]:
+        """Trả về tập vị trí thỏa mãn, hoặc None nếu không có điều kiện nào (= tất cả)."""
+        # Mỗi điều kiện: (số dòng ước tính, loại, dữ liệu)
+        constraints = []
+
+        for field, values in filters.items():
+            values = [v for v in (values or []) if v is not None]
+            if not values:
+                continue
+            buckets = self.hash_index[field]
+            if len(values) == 1:
+                matched = buckets.get(values[0], frozenset())
+            else:
+                matched = set()
+                for v in values:
+                    matched |= buckets.get(v, frozenset())
+            constraints.append((len(matched), "set", matched))
+
+        for field, (date_from, date_to) in date_ranges.items():
+            if not (date_from or date_to):
+                continue
+            low = _parse_date(date_from)
+            high = _parse_date(date_to)
+            dates, _ = self.date_index[field]
+            lo = bisect_left(dates, low) if low is not None else 0
+            hi = bisect_right(dates, high) if high is not None else len(dates)
+            constraints.append((max(hi - lo, 0), "date", (field, low, high, lo, hi)))
+
+        # Giao các tập (phép toán set chạy ở tầng C) từ tập nhỏ nhất,
+        # sau đó mới lọc khoảng ngày trên tập đã thu hẹp
+        constraints.sort(key=lambda c: (c[1] != "set", c[0]))
+        candidates = None
+        for _, kind, data in constraints:
+            if kind == "set":
+                candidates = set(data) if candidates is None else candidates & data
+            else:
+                field, low, high, lo, hi = data
+                if candidates is None:
+                    candidates = set(self.date_index[field][1][lo:hi])
+                else:
+                    # Ordinal <= 0: không có ngày / ngày không hợp lệ
+                    ordinals = self.roster.dates[field].ordinals
+                    low = low if low is not None else 1
+                    high = high if high is not None else date.max.toordinal()
+                    candidates = {
+                        pos for pos in candidates if low <= ordinals[pos] <= high
+                    }
+            if not candidates:
+                break
+
+        if q:
+            needle = fold_text(q)
+            if needle:
+                haystack = self.haystack
+                source = candidates if candidates is not None else range(len(haystack))
+                candidates = {pos for pos in source if needle in haystack[pos]}
+
+        return candidates
+
+    # --- SẮP XẾP & PHÂN TRANG ---
+    def page(
+        self,
+        candidates: Optional[set],
+        sort: str,
+        descending: bool,
+        offset: int,
+        limit: int,
+    ) -> List[int]:
+        order = self.order[(sort, descending)]
+
+        if candidates is None:
+            return order[offset:offset + limit].tolist()
+
+        if len(candidates) * SORT_RATIO < len(self.roster):
+            rank = self.rank[(sort, descending)]
+            return sorted(candidates, key=rank.__getitem__)[offset:offset + limit]
+
+        result = []
+        needed = offset + limit
+        for pos in order:
+            if pos in candidates:
+                result.append(pos)
+                if len(result) >= needed:
+                    break
+        return result[offset:]
+
+
+class EmployeeIndexHolder:
+    """Giữ chỉ mục của snapshot hiện tại; dựng lại (1 lần, trong thread) khi snapshot đổi."""
+
+    def __init__(self):
+        self.index: Optional[EmployeeIndex] = None
+        self._lock = asyncio.Lock()
+
+    def _matches(self, roster, version) -> bool:
+        if self.index is None:
+            return False
+        # Request cầm snapshot cũ hơn chỉ mục hiện tại -> dùng luôn bản mới hơn
+        return version < self.index.version or (
+            self.index.version == version and self.index.roster is roster
+        )
+
+    async def get(self, roster: EmployeeRoster, version: int) -> EmployeeIndex:
+        if self._matches(roster, version):
+            return self.index
+        async with self._lock:
+            if not self._matches(roster, version):
+                self.index = await asyncio.to_thread(EmployeeIndex, roster, version)
+            return self.index
+
+
+employee_index = EmployeeIndexHolder()
@@ -0,0 +1,232 @@
+import re
+import heapq
+import asyncio
+import logging
+import time
+import unicodedata
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, Tuple
+
+from app.services.roster_service import EmployeeRoster
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Số posting tối đa dùng để gom ứng viên (bỏ qua trigram quá phổ biến như " ng")
+CANDIDATE_POSTING_BUDGET = 20000
+# Số ứng viên tối đa được chấm điểm đầy đủ cho mỗi kết quả trả về
+CANDIDATES_PER_RESULT = 20
+# Tỉ lệ trigram khớp tối thiểu để được trả về
+MIN_SIMILARITY = 0.3
+
+
+def fold_text(text) -> str:
+    """
+    Bỏ dấu tiếng Việt + viết thường + gộp ký tự đặc biệt thành 1 khoảng trắng.
+    "Nguyễn Văn Đức" -> "nguyen van duc"
+    """
+    if not text:
+        return ""
+    s = str(text).replace("đ", "d").replace("Đ", "D")
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(c for c in s if unicodedata.category(c) != "Mn")
+    return _NON_ALNUM.sub(" ", s.lower()).strip()
+
+
+def trigrams(folded: str) -> set:
+    """Trigram của từng từ, có đệm khoảng trắng 2 đầu để khớp được từ ngắn / đầu từ."""
+    grams = set()
+    for word in folded.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class EmployeeSearchIndex:
+    """
+    Chỉ mục trigram (inverted index) cho tên, mã NV và mã cũ.
+    Khi snapshot HR đổi, chỉ các nhân viên thêm / xóa / đổi tên-mã mới bị cập nhật.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.doc_ids: Dict[str, int] = {}          # employee_id -> doc id
+        self.raw_keys: List[Optional[tuple]] = []  # doc id -> (mã, mã cũ, tên) gốc, None = đã xóa
+        self.texts: List[str] = []                 # doc id -> chuỗi đã bỏ dấu (có đệm)
+        self.folded_ids: List[Tuple[str, str]] = []
+        self.positions: List[int] = []             # doc id -> vị trí trong roster hiện tại
+        self.roster: Optional[EmployeeRoster] = None
+        self.postings: Dict[str, set] = defaultdict(set)
+        self.free_ids: List[int] = []
+        self.last_sync_ms = None
+        self.last_sync_changes = 0
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    # --- CẬP NHẬT ---
+    def _add(self, emp_id: str, raw_key: tuple, pos: int) -> int:
+        folded_id, folded_old, folded_name = (fold_text(v) for v in raw_key)
+        text = f" {folded_id} {folded_old} {folded_name} "
+
+        if self.free_ids:
+            doc = self.free_ids.pop()
+            self.raw_keys[doc] = raw_key
+            self.texts[doc] = text
+            self.folded_ids[doc] = (folded_id, folded_old)
+            self.positions[doc] = pos
+        else:
+            doc = len(self.raw_keys)
+            self.raw_keys.append(raw_key)
+            self.texts.append(text)
+            self.folded_ids.append((folded_id, folded_old))
+            self.positions.append(pos)
+
+        for gram in trigrams(text):
+            self.postings[gram].add(doc)
+        self.doc_ids[emp_id] = doc
+        return doc
+
+    def _remove(self, emp_id: str):
+        doc = self.doc_ids.pop(emp_id)
+        for gram in trigrams(self.texts[doc]):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(doc)
+                if not posting:
+                    del self.postings[gram]
+        self.raw_keys[doc] = None
+        self.texts[doc] = ""
+        self.folded_ids[doc] = ("", "")
+        self.positions[doc] = -1
+        self.free_ids.append(doc)
+
+    def sync(self, roster: EmployeeRoster, version: int):
+        """Đồng bộ với snapshot mới: chỉ đụng tới các nhân viên có thay đổi."""
+        started = time.perf_counter()
+        changes = 0
+        seen = set()
+
+        for pos, (emp_id, old_id, name) in enumerate(zip(
+            roster.column("employee_id"),
+            roster.column("employee_old_id"),
+            roster.column("employee_name"),
+        )):
+            emp_id = str(emp_id or "")
+            if not emp_id or emp_id in seen:
+                continue
+            seen.add(emp_id)
+            raw_key = (emp_id, old_id or "", name or "")
+            doc = self.doc_ids.get(emp_id)
+            if doc is None:
+                self._add(emp_id, raw_key, pos)
+                changes += 1
+            elif self.raw_keys[doc] != raw_key:
+                self._remove(emp_id)
+                self._add(emp_id, raw_key, pos)
+                changes += 1
+            else:
+                # Không đổi tên / mã: chỉ trỏ sang vị trí trong snapshot mới
+                self.positions[doc] = pos
+
+        for emp_id in [k for k in self.doc_ids if k not in seen]:
+            self._remove(emp_id)
+            changes += 1
+
+        self.roster = roster
+        self.version = version
+        self.last_sync_changes = changes
+        self.last_sync_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"Employee search index v{version} synced: {changes} changes in {self.last_sync_ms} ms"
+        )
+
+    # --- TÌM KIẾM ---
+    def search(self, query: str, limit: int = 20) -> List[Tuple[float, Dict[str, Any]]]:
+        """Trả về [(điểm, dict nhân viên)], dict dựng mới từ roster."""
+        folded = fold_text(query)
+        if not folded:
+            return []
+        grams = trigrams(folded)
+        if not grams:
+            return []
+
+        # 1. Gom ứng viên từ các trigram hiếm trước
+        ordered = sorted(grams, key=lambda g: len(self.postings.get(g, ())))
+        counts = defaultdict(int)
+        used = 0
+        for gram in ordered:
+            posting = self.postings.get(gram)
+            if not posting:
+                continue
+            if used and used + len(posting) > CANDIDATE_POSTING_BUDGET:
+                break
+            used += len(posting)
+            for doc in posting:
+                counts[doc] += 1
+        if not counts:
+            return []
+
+        candidates = heapq.nlargest(
+            limit * CANDIDATES_PER_RESULT, counts, key=counts.__getitem__
+        )
+
+        # 2. Chấm điểm đầy đủ trên tập ứng viên nhỏ
+        total = len(grams)
+        phrase = f" {folded}"
+        results = []
+        for doc in candidates:
+            text = self.texts[doc]
+            matched = sum(1 for g in grams if g in text)
+            score = matched / total
+            if score < MIN_SIMILARITY:
+                continue
+
+            folded_id, folded_old = self.folded_ids[doc]
+            if folded in (folded_id, folded_old):
+                score += 10   # Trùng khớp mã NV / mã cũ
+            elif folded_id.startswith(folded) or (folded_old and folded_old.startswith(folded)):
+                score += 3    # Đầu mã
+            if phrase in text:
+                score += 1    # Khớp nguyên cụm từ đầu từ
+            elif folded in text:
+                score += 0.5  # Khớp nguyên cụm giữa từ
+            results.append((score, doc))
+
+        top = heapq.nlargest(limit, results)
+        return [(round(score, 3), self.roster.row(self.positions[doc])) for score, doc in top]
+
+
+class EmployeeSearchHolder:
+    """Đồng bộ chỉ mục tìm kiếm với snapshot HR hiện tại (trong thread, 1 lượt mỗi lần)."""
+
+    def __init__(self):
+        self.index = EmployeeSearchIndex()
+        self._lock = asyncio.Lock()
+        self._syncing = False
+
+    def _matches(self, roster, version) -> bool:
+        if self._syncing or self.index.version is None:
+            return False
+        # Request cầm snapshot cũ hơn chỉ mục hiện tại -> dùng luôn bản mới hơn
+        return version < self.index.version or (
+            self.index.version == version and self.index.roster is roster
+        )
+
+    async def get(self, roster: EmployeeRoster, version: int) -> EmployeeSearchIndex:
+        if self._matches(roster, version):
+            return self.index
+        async with self._lock:
+            if not self._matches(roster, version):
+                # Cờ _syncing chặn các request khác tìm kiếm trong lúc thread đang sửa chỉ mục
+                self._syncing = True
+                try:
+                    await asyncio.to_thread(self.index.sync, roster, version)
+                finally:
+                    self._syncing = False
+            return self.index
+
+
+employee_search = EmployeeSearchHolder()
@@ -0,0 +1,668 @@
+import re
+import json
+import calendar
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Iterable, Iterator, AsyncIterator
+
+import httpx
+
+from app.config import (
+    HR_API_URL,
+    HR_TIMEOUT_BUDGET,
+    HR_CONNECT_TIMEOUT,
+    HR_MAX_RETRIES,
+    HR_CIRCUIT_FAILURE_THRESHOLD,
+    HR_CIRCUIT_RESET_SECONDS,
+)
+from app.services.roster_service import EmployeeRoster
+
+logger = logging.getLogger(__name__)
+
+# Body / header cố định của webservice .asmx
+HR_REQUEST_PAYLOAD = {"arg_UserId": "", "arg_Pass": ""}
+HR_REQUEST_HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+
+
+class HRServiceError(Exception):
+    """Lỗi khi lấy dữ liệu từ HR Server (mất kết nối, timeout, sai format...)."""
+
+
+class HRCircuitOpenError(HRServiceError):
+    """Circuit breaker đang mở: HR vừa lỗi liên tục, từ chối gọi ngay để không giữ worker."""
+
+
+class _RetryableError(HRServiceError):
+    pass
+
+
+# --- CHUẨN HÓA BẢN GHI ---
+def normalize_date(date_str):
+    """
+    Chuyển đổi các định dạng ngày lộn xộn (DD/MM/YYYY, YYYY-MM-DD...)
+    về chuẩn duy nhất: YYYY-MM-DD để Frontend không bị hiểu nhầm.
+    """
+    if not date_str or str(date_str).strip() == "":
+        return None
+    
+    s = str(date_str).strip()
+    
+    # Cắt bỏ phần giờ nếu có (ví dụ: 2026-01-09T00:00:00)
+    if "T" in s:
+        s = s.split("T")[0]
+    elif " " in s:
+        s = s.split(" ")[0]
+
+    # Danh sách các format ưu tiên thử parse
+    # ƯU TIÊN SỐ 1: DD/MM/YYYY (Format Việt Nam) -> Để sửa lỗi 09/01 bị hiểu nhầm
+    formats = [
+        "%d/%m/%Y",  # 09/01/2026 -> 9 Jan
+        "%Y-%m-%d",  # 2026-01-09 -> 9 Jan
+        "%d-%m-%Y",  # 09-01-2026
+        "%m/%d/%Y",  # Format Mỹ (Thử cuối cùng)
+    ]
+
+    for fmt in formats:
+        try:
+            dt = datetime.strptime(s, fmt)
+            return dt.strftime("%Y-%m-%d") # Trả về chuẩn ISO
+        except ValueError:
+            continue
+            
+    return s # Nếu bó tay thì trả về nguyên gốc
+
+
+# Dạng ngày thường gặp -> parse bằng cắt chuỗi thay vì strptime
+_DATE_SHAPES = {
+    "slash": re.compile(r"([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})"),   # 09/01/2026
+    "iso": re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})"),     # 2026-01-09
+    "dash": re.compile(r"([0-9]{1,2})-([0-9]{1,2})-([0-9]{4})"),    # 09-01-2026
+}
+_NO_MATCH = object()
+
+
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _iso_or_none(year: int, month: int, day: int) -> Optional[str]:
+    # Kiểm tra ngày hợp lệ bằng bảng số ngày (nhanh hơn tạo đối tượng date)
+    if not (1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month - 1]):
+        return None
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def _parse_shape(shape: str, s: str):
+    """
+    Kết quả giống hệt normalize_date cho các dạng trong _DATE_SHAPES
+    (giữ thứ tự ưu tiên DD/MM trước MM/DD). Không khớp dạng -> _NO_MATCH.
+    """
+    match = _DATE_SHAPES[shape].fullmatch(s)
+    if not match:
+        return _NO_MATCH
+    a, b, c = map(int, match.groups())
+    if shape == "slash":
+        if c < 1000:
+            return _NO_MATCH  # strftime không đệm số 0 cho năm < 1000 -> để strptime xử lý
+        return _iso_or_none(c, b, a) or _iso_or_none(c, a, b) or s
+    if shape == "iso":
+        if a < 1000:
+            return _NO_MATCH
+        return _iso_or_none(a, b, c) or s
+    if c < 1000:
+        return _NO_MATCH
+    return _iso_or_none(c, b, a) or s
+
+
+def _detect_shape(s: str) -> Optional[str]:
+    for shape in _DATE_SHAPES:
+        if _parse_shape(shape, s) is not _NO_MATCH:
+            return shape
+    return None
+
+
+class DateNormalizer:
+    """
+    Chuẩn hóa ngày cho 1 lượt đọc HR (kết quả giống hệt normalize_date):
+    - Nhớ kết quả theo chuỗi gốc: 7 cột x hàng chục nghìn dòng nhưng chỉ vài nghìn ngày khác nhau
+    - Mỗi cột nhận dạng định dạng 1 lần (giá trị đầu tiên), sau đó parse bằng cắt chuỗi;
+      giá trị khác định dạng của cột thì thử các dạng còn lại, cuối cùng mới tới strptime
+    """
+
+    def __init__(self):
+        self.cache: Dict[str, Optional[str]] = {}
+        self.shapes: Dict[str, Optional[str]] = {}  # cột -> dạng ngày đã nhận ra
+
+    def normalize(self, field: str, value):
+        result = self.cache.get(value, _NO_MATCH)
+        if result is not _NO_MATCH:
+            return result
+        if not isinstance(value, str):
+            return normalize_date(value)
+        result = self.cache[value] = self._normalize(field, value)
+        return result
+
+    def _normalize(self, field: str, value: str):
+        s = value.strip()
+        if not s:
+            return None
+        if "T" in s:
+            s = s.split("T")[0]
+        elif " " in s:
+            s = s.split(" ")[0]
+
+        shape = self.shapes.get(field)
+        if shape is None:
+            shape = self.shapes[field] = _detect_shape(s)
+        if shape is not None:
+            result = _parse_shape(shape, s)
+            if result is not _NO_MATCH:
+                return result
+        for other in _DATE_SHAPES:
+            if other != shape:
+                result = _parse_shape(other, s)
+                if result is not _NO_MATCH:
+                    return result
+        return normalize_date(value)
+
+    def column(self, field: str, values: Iterable[Any]) -> List[Optional[str]]:
+        """Chuẩn hóa cả 1 cột."""
+        normalize = self.normalize
+        return [normalize(field, value) for value in values]
+
+
+def normalize_employee(raw: Dict[str, Any], dates: Optional[DateNormalizer] = None) -> Dict[str, Any]:
+    """
+    Bản ghi HR gốc -> bản ghi nhân viên trả cho Frontend.
+    Khi chuẩn hóa nhiều bản ghi, truyền chung 1 DateNormalizer để dùng lại kết quả.
+    """
+    if dates is None:
+        dates = DateNormalizer()
+    nd = dates.normalize
+    return {
+        "employee_id": raw.get("employee_id", "N/A"),
+        "employee_name": raw.get("employee_name", "N/A"),
+        "employee_department": raw.get("employee_department", ""),
+        "employee_position": raw.get("employee_position", ""),
+        "employee_status": raw.get("employee_status", "Active"),
+        "employee_type": raw.get("employee_type", "Worker"),
+        "id": raw.get("id", ""),
+        "employee_gender": raw.get("employee_gender", ""),
+        "employee_old_id": raw.get("employee_old_id", ""),
+
+        # 🔥 CHUẨN HÓA DATE TẠI ĐÂY (SỬA LỖI)
+        "employee_birth_date": nd("employee_birth_date", raw.get("employee_birth_date")),
+        "employee_join_date": nd("employee_join_date", raw.get("employee_join_date")),
+        "employee_left_date": nd("employee_left_date", raw.get("employee_left_date")),
+        "contract_begin": nd("contract_begin", raw.get("contract_begin")),
+        "contract_end": nd("contract_end", raw.get("contract_end")),
+        "maternity_begin": nd("maternity_begin", raw.get("maternity_begin")),
+        "maternity_end": nd("maternity_end", raw.get("maternity_end")),
+        # -----------------------------------
+
+        "contract_type": raw.get("contract_type", ""),
+        "contract_id": raw.get("contract_id", ""),
+        "maternity_type": raw.get("maternity_type", ""),
+
+        "employee_image": f"/images/{raw.get('employee_id', '')}.png",
+        "last_printed_at": None,
+    }
+
+
+# --- PARSE RESPONSE THEO LUỒNG (.asmx bọc dữ liệu trong "d") ---
+# Response dạng {"d": "<chuỗi JSON>"} hoặc {"d": {...}} hoặc {...}, bên trong là
+# {"success": true, "data": [...]}.
+_ENVELOPE = re.compile(r'\s*\{\s*"d"\s*:\s*(["{])')
+_WS = re.compile(r"[ \t\r\n]*")
+# Decoder không strict: chấp nhận ký tự điều khiển chưa escape trong chuỗi
+_DECODER = json.JSONDecoder(strict=False)
+
+
+def _safe_cut(raw: str, end: int) -> int:
+    """Vị trí cắt <= end không rơi vào giữa 1 escape (\\n, \\", \\uXXXX...)."""
+    if end <= 0:
+        return 0
+    j = raw.rfind("\\", max(0, end - 6), end)
+    if j < 0:
+        return end
+    # Lùi về đầu dãy '\\' liên tiếp: ký tự đứng trước không phải '\\' nên đây luôn là ranh giới
+    while j > 0 and raw[j - 1] == "\\":
+        j -= 1
+    return j
+
+
+def _is_high_surrogate(ch: str) -> bool:
+    return "\ud800" <= ch <= "\udbff"
+
+
+def _is_low_surrogate(ch: str) -> bool:
+    return "\udc00" <= ch <= "\udfff"
+
+
+class _DataParser:
+    """
+    Parse JSON bên trong ({"success":..., "data": [...]}) theo từng đoạn văn bản.
+    Mỗi phần tử của "data" được decode ngay khi đủ 1 object rồi trả ra luôn.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.state = "start"  # start -> key -> value -> key ... / data -> key -> done
+        self.key = None
+        self.meta: Dict[str, Any] = {}
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        out = []
+        if self.state == "done":
+            return out
+        buf = self.buf + text if self.buf else text
+        n = len(buf)
+        pos = 0
+
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos >= n:
+                break
+            c = buf[pos]
+
+            if self.state == "start":
+                if c != "{":
+                    raise HRServiceError("Invalid JSON from HR Server: expected an object")
+                pos += 1
+                self.state = "key"
+
+            elif self.state == "key":
+                if c == ",":
+                    pos += 1
+                    continue
+                if c == "}":
+                    self.state = "done"
+                    break
+                try:
+                    key, end = _DECODER.raw_decode(buf, pos)
+                except ValueError:
+                    break  # Chưa đủ dữ liệu
+                colon = _WS.match(buf, end).end()
+                if colon >= n:
+                    break
+                if buf[colon] != ":" or not isinstance(key, str):
+                    raise HRServiceError("Invalid JSON from HR Server: bad object key")
+                self.key = key
+                pos = colon + 1
+                self.state = "value"
+
+            elif self.state == "value":
+                if self.key == "data" and c == "[":
+                    self.meta["data"] = []
+                    pos += 1
+                    self.state = "data"
+                    continue
+                try:
+                    value, end = _DECODER.raw_decode(buf, pos)
+                except ValueError:
+                    break
+                # Số nằm sát cuối buffer có thể còn chữ số ở chunk sau
+                if end >= n and not final:
+                    break
+                self.meta[self.key] = value
+                pos = end
+                self.state = "key"
+
+            elif self.state == "data":
+                if c == ",":
+                    pos += 1
+                    continue
+                if c == "]":
+                    pos += 1
+                    self.state = "key"
+                    continue
+                try:
+                    item, end = _DECODER.raw_decode(buf, pos)
+                except ValueError:
+                    break
+                if end >= n and not final and not isinstance(item, (dict, list)):
+                    break
+                out.append(item)
+                pos = end
+
+        self.buf = buf[pos:] if self.state != "done" else ""
+        return out
+
+    def finish(self):
+        if self.state != "done":
+            raise HRServiceError("Invalid JSON from HR Server: response truncated")
+        if self.meta.get("success") != True or "data" not in self.meta:
+            raise HRServiceError("HR response has success=False or no data")
+
+
+class HRStreamParser:
+    """
+    Parse response .asmx trong 1 lượt duy nhất, theo từng chunk:
+    - Chuỗi "d" được bỏ escape dần (cắt ở ranh giới escape), không giữ văn bản gốc
+      lẫn chuỗi JSON bên trong trong RAM
+    - Phần tử "data" được trả ra ngay khi decode xong (xem _DataParser)
+    Kiểm tra success/format chỉ chắc chắn sau close(): nơi gọi không được dùng
+    các bản ghi đã nhận nếu close() raise.
+    """
+
+    # Giữ lại vài ký tự cuối mỗi chunk vì có thể là dấu đóng chuỗi '"}'
+    HOLD_BACK = 16
+
+    def __init__(self):
+        self.mode = "envelope"  # envelope -> string ("d" là chuỗi) | inner (JSON trực tiếp)
+        self._raw = ""
+        self._carry = ""        # high surrogate chờ ghép với đoạn sau
+        self._data = _DataParser()
+
+    def feed(self, text: str) -> List[Any]:
+        return self._feed(text, final=False)
+
+    def close(self) -> List[Any]:
+        out = self._feed("", final=True)
+        self._data.finish()
+        return out
+
+    def _feed(self, text: str, final: bool) -> List[Any]:
+        if self.mode == "string":
+            return self._feed_string(text, final)
+        if self.mode == "inner":
+            return self._data.feed(text, final)
+
+        raw = self._raw + text
+        match = _ENVELOPE.match(raw)
+        if match:
+            if match.group(1) == '"':
+                self.mode = "string"
+                self._raw = raw[match.end():]
+                return self._feed_string("", final)
+            self.mode = "inner"
+            self._raw = ""
+            return self._data.feed(raw[match.end() - 1:], final)
+        if not final and len(raw.lstrip()) < self.HOLD_BACK:
+            self._raw = raw  # Chưa đủ để nhận dạng envelope
+            return []
+        # Không có envelope "d": bản thân response là object dữ liệu
+        self.mode = "inner"
+        self._raw = ""
+        return self._data.feed(raw, final)
+
+    def _feed_string(self, text: str, final: bool) -> List[Any]:
+        raw = self._raw + text if self._raw else text
+        if final:
+            body = raw.rstrip()
+            if not body.endswith("}"):
+                raise HRServiceError("Invalid JSON from HR Server: response truncated")
+            body = body[:-1].rstrip()
+            if not body.endswith('"'):
+                raise HRServiceError("Invalid JSON from HR Server: unterminated 'd' string")
+            segment, self._raw = body[:-1], ""
+        else:
+            cut = _safe_cut(raw, len(raw.rstrip()) - self.HOLD_BACK)
+            segment, self._raw = raw[:cut], raw[cut:]
+            if not segment:
+                return []
+
+        try:
+            piece = _DECODER.decode(f'"{segment}"')
+        except ValueError as e:
+            raise HRServiceError(f"Invalid JSON from HR Server: {e}")
+
+        # Cặp surrogate (\\ud83d\\ude00) bị cắt đôi giữa 2 đoạn -> ghép lại
+        if self._carry:
+            if piece and _is_low_surrogate(piece[0]):
+                pair = (self._carry + piece[0]).encode("utf-16-le", "surrogatepass")
+                piece = pair.decode("utf-16-le") + piece[1:]
+            else:
+                piece = self._carry + piece
+            self._carry = ""
+        if not final and piece and _is_high_surrogate(piece[-1]):
+            self._carry = piece[-1]
+            piece = piece[:-1]
+
+        return self._data.feed(piece, final)
+
+
+def iter_hr_records(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Bản ghi HR gốc từ các chunk văn bản của response (sync, dùng cho script / benchmark)."""
+    parser = HRStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def iter_employees(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Như iter_hr_records nhưng trả bản ghi đã chuẩn hóa."""
+    dates = DateNormalizer()
+    for raw in iter_hr_records(chunks):
+        yield normalize_employee(raw, dates)
+
+
+def parse_hr_payload(raw_text: str) -> List[Dict[str, Any]]:
+    """Trả về danh sách bản ghi HR gốc từ toàn bộ văn bản response."""
+    return list(iter_hr_records([raw_text]))
+
+
+# --- CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """
+    closed    : gọi bình thường
+    open      : lỗi liên tiếp >= failure_threshold -> từ chối ngay trong reset_seconds
+    half_open : hết reset_seconds -> cho 1 lượt thử; thành công thì đóng, lỗi thì mở lại
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                self.rejected += 1
+                raise HRCircuitOpenError(
+                    f"HR circuit open ({self.failures} consecutive failures)"
+                )
+            self.state = "half_open"
+        elif self.state == "half_open":
+            # Đã có 1 lượt thử đang chạy
+            self.rejected += 1
+            raise HRCircuitOpenError("HR circuit half-open, trial call in progress")
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"HR circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+# --- CLIENT DÙNG CHUNG ---
+class HRClient:
+    """
+    Client HR dùng chung cho cả app (tạo trong lifespan):
+    - Giữ kết nối keep-alive (connection pool) thay vì tạo AsyncClient mỗi lần gọi
+    - Retry lỗi mạng / HTTP 5xx với backoff có jitter, trong 1 ngân sách thời gian tổng
+    - Circuit breaker: HR chết thì lỗi ngay trong vài ms
+    """
+
+    def __init__(
+        self,
+        url: str = HR_API_URL,
+        timeout_budget: float = HR_TIMEOUT_BUDGET,
+        connect_timeout: float = HR_CONNECT_TIMEOUT,
+        max_retries: int = HR_MAX_RETRIES,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.url = url
+        self.timeout_budget = timeout_budget
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker(
+            HR_CIRCUIT_FAILURE_THRESHOLD, HR_CIRCUIT_RESET_SECONDS
+        )
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout_budget, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=10, max_keepalive_connections=5, keepalive_expiry=60
+            ),
+        )
+
+        self.calls = 0
+        self.attempts = 0
+        self.failures = 0
+        self.last_duration_ms: Optional[float] = None
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _stream_records(self, remaining: float) -> AsyncIterator[Dict[str, Any]]:
+        """1 lượt POST: parse body theo từng chunk và trả ra bản ghi HR gốc ngay khi đọc xong."""
+        timeout = httpx.Timeout(remaining, connect=min(self.connect_timeout, remaining))
+        parser = HRStreamParser()
+        try:
+            async with self._client.stream(
+                "POST", self.url, json=HR_REQUEST_PAYLOAD, headers=HR_REQUEST_HEADERS, timeout=timeout
+            ) as response:
+                if response.status_code >= 500:
+                    raise _RetryableError(f"HR Server returned HTTP {response.status_code}")
+                if response.status_code != 200:
+                    raise HRServiceError(f"HR Server returned HTTP {response.status_code}")
+                async for chunk in response.aiter_text():
+                    for record in parser.feed(chunk):
+                        yield record
+        except httpx.TransportError as e:
+            # Lỗi mạng / timeout (kể cả đứt giữa chừng) -> thử lại được
+            raise _RetryableError(f"{e.__class__.__name__}: {e}")
+
+        for record in parser.close():
+            yield record
+
+    async def _with_retries(self, call, timeout_budget: Optional[float] = None):
+        """Chạy call(remaining) với retry + breaker trong ngân sách thời gian."""
+        self.breaker.before_call()
+        self.calls += 1
+        started = time.monotonic()
+        deadline = started + (timeout_budget or self.timeout_budget)
+        last_error: Optional[Exception] = None
+        attempts_made = 0
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.attempts += 1
+                attempts_made += 1
+                try:
+                    # httpx.Timeout chỉ giới hạn từng lần connect / read / write: HR trả từng byte
+                    # nhỏ giọt vẫn kéo dài được mãi -> giới hạn cả lượt gọi bằng thời gian còn lại
+                    result = await asyncio.wait_for(call(remaining), remaining)
+                    self.breaker.record_success()
+                    return result
+                except _RetryableError as e:
+                    last_error = e
+                    logger.warning(f"HR attempt {attempt + 1} failed: {e}")
+                except asyncio.TimeoutError:
+                    last_error = _RetryableError(f"No complete response within {remaining:.1f}s")
+                    logger.warning(f"HR attempt {attempt + 1} failed: {last_error}")
+
+                if attempt == self.max_retries:
+                    break
+                # Backoff lũy thừa + jitter, không vượt quá ngân sách còn lại
+                delay = min(4.0, 0.5 * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                if time.monotonic() + delay >= deadline:
+                    break
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Lỗi không thử lại được (4xx, sai format...) hoặc request bị hủy giữa chừng
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.last_duration_ms = round((time.monotonic() - started) * 1000, 1)
+
+        self.failures += 1
+        self.breaker.record_failure()
+        raise HRServiceError(
+            f"HR Server unavailable after {attempts_made} attempts: {last_error or 'timeout budget exhausted'}"
+        )
+
+    async def fetch_employees(self, timeout_budget: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Danh sách nhân viên đã chuẩn hóa (bản ghi gốc bị bỏ ngay sau khi chuẩn hóa)."""
+
+        async def call(remaining: float):
+            dates = DateNormalizer()
+            return [normalize_employee(raw, dates) async for raw in self._stream_records(remaining)]
+
+        return await self._with_retries(call, timeout_budget)
+
+    async def fetch_roster(self, timeout_budget: Optional[float] = None) -> EmployeeRoster:
+        """Như fetch_employees nhưng ghi thẳng vào roster dạng cột (không giữ list dict)."""
+
+        async def call(remaining: float):
+            roster = EmployeeRoster()
+            dates = DateNormalizer()
+            async for raw in self._stream_records(remaining):
+                roster.append(normalize_employee(raw, dates))
+            return roster.freeze()
+
+        return await self._with_retries(call, timeout_budget)
+
+    async def fetch_employees_raw(self, timeout_budget: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Danh sách bản ghi HR gốc (chưa chuẩn hóa)."""
+
+        async def call(remaining: float):
+            return [raw async for raw in self._stream_records(remaining)]
+
+        return await self._with_retries(call, timeout_budget)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "circuit_rejected": self.breaker.rejected,
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "last_duration_ms": self.last_duration_ms,
+            "timeout_budget_seconds": self.timeout_budget,
+            "max_retries": self.max_retries,
+        }
+
+
+_hr_client: Optional[HRClient] = None
+
+
+async def startup():
+    """Gọi trong lifespan: tạo client dùng chung."""
+    global _hr_client
+    if _hr_client is None:
+        _hr_client = HRClient()
+
+
+async def shutdown():
+    global _hr_client
+    if _hr_client is not None:
+        await _hr_client.aclose()
+        _hr_client = None
+
+
+def get_hr_client() -> HRClient:
+    # Tạo muộn nếu chạy ngoài lifespan (script, test tay...)
+    global _hr_client
+    if _hr_client is None:
+        _hr_client = HRClient()
+    return _hr_client
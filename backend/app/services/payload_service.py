@@ -0,0 +1,194 @@
+import gzip
+import json
+import time
+import zlib
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, date
+from typing import Optional, Dict, Any, Tuple
+
+from app.services.roster_service import EmployeeRoster
+
+# Encoder JSON nhanh (tùy chọn): không cài thì dùng json chuẩn
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Nén brotli (tùy chọn): không cài thì chỉ trả gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Số body giữ trong RAM (bản hiện tại + bản trước trong lúc chuyển version)
+PAYLOAD_CACHE_SIZE = 2
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _json_default(value):
+    # last_printed_at (datetime) -> ISO giống cách FastAPI encode
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default)
+    return json.dumps(obj, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+class EncodedPayload:
+    """Body JSON đã nén sẵn. Bản không nén chỉ dựng lại (giải nén) khi client không nhận gzip."""
+
+    __slots__ = ("gzip", "br", "size", "build_ms")
+
+    def __init__(self, gzip_body: bytes, br_body: Optional[bytes], size: int, build_ms: float):
+        self.gzip = gzip_body
+        self.br = br_body
+        self.size = size
+        self.build_ms = build_ms
+
+    def identity(self) -> bytes:
+        return gzip.decompress(self.gzip)
+
+    def choose(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Chọn bản nén theo Accept-Encoding: br > gzip > không nén."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        if self.br is not None and accepted.get("br", 0) > 0:
+            return self.br, "br"
+        if accepted.get("gzip", accepted.get("*", 0)) > 0:
+            return self.gzip, "gzip"
+        return self.identity(), None
+
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def encode_employee_list(
+    roster: EmployeeRoster,
+    last_printed: Dict[str, Any],
+    header: Dict[str, Any],
+) -> EncodedPayload:
+    """
+    Encode {"...header", "data": [...]} theo từng lô và nén luôn từng đoạn
+    (gzip + brotli), không giữ body JSON đầy đủ trong RAM.
+    """
+    started = time.perf_counter()
+    gzip_stream = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = định dạng gzip
+    br_stream = brotli.Compressor(quality=BROTLI_QUALITY) if brotli is not None else None
+    gzip_parts, br_parts = [], []
+    size = 0
+
+    def write(chunk: bytes):
+        nonlocal size
+        size += len(chunk)
+        gzip_parts.append(gzip_stream.compress(chunk))
+        if br_stream is not None:
+            br_parts.append(br_stream.process(chunk))
+
+    write(dumps(header)[:-1] + b',"data":[')
+    first = True
+    for batch in roster.iter_row_batches(last_printed):
+        encoded = dumps(batch)[1:-1]
+        if not encoded:
+            continue
+        write(encoded if first else b"," + encoded)
+        first = False
+    write(b"]}")
+
+    gzip_parts.append(gzip_stream.flush())
+    if br_stream is not None:
+        br_parts.append(br_stream.finish())
+
+    return EncodedPayload(
+        gzip_body=b"".join(gzip_parts),
+        br_body=b"".join(br_parts) if br_stream is not None else None,
+        size=size,
+        build_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+class PayloadCache:
+    """
+    Body /api/employees đã encode + nén sẵn cho mỗi (version snapshot, ETag).
+    ETag đã gồm hash snapshot + phiên bản bảng last_print + source, nên body chỉ dựng lại
+    khi 1 trong các thứ đó đổi. Mỗi key chỉ dựng 1 lần (các request cùng lúc chờ chung).
+    """
+
+    def __init__(self, max_entries: int = PAYLOAD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, EncodedPayload]" = OrderedDict()
+        self._building: Dict[tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, key: tuple) -> Optional[EncodedPayload]:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return payload
+
+    async def get(self, key: tuple, build) -> EncodedPayload:
+        """build: hàm đồng bộ trả về EncodedPayload (chạy trong thread)."""
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+        task = self._building.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(asyncio.to_thread(build))
+            self._building[key] = task
+            task.add_done_callback(lambda _: self._building.pop(key, None))
+        # shield: request bị hủy không làm hủy lượt dựng chung
+        payload = await asyncio.shield(task)
+
+        if key not in self._entries:
+            self._entries[key] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logger.info(
+                f"Employee payload cached: {payload.size} bytes JSON, "
+                f"gzip {len(payload.gzip)}, br {len(payload.br) if payload.br else '-'}, "
+                f"{payload.build_ms} ms"
+            )
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "json_encoder": "orjson" if orjson is not None else "json",
+            "brotli": brotli is not None,
+            "cached_bytes": sum(
+                len(p.gzip) + (len(p.br) if p.br else 0) for p in self._entries.values()
+            ),
+        }
+
+
+employee_payload_cache = PayloadCache()
@@ -0,0 +1,137 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+from app.config import PHOTO_DERIVATIVES_DIR, PHOTO_DERIVATIVE_WIDTHS, PHOTO_DERIVATIVE_BUDGET_MB
+from app.services.photo_service import photo_processor, render_derivatives, derivative_name, PhotoError
+from app.services.photo_index_service import photo_index
+
+logger = logging.getLogger(__name__)
+
+
+def pick_width(requested: int) -> Optional[int]:
+    """Mốc nhỏ nhất >= chiều rộng yêu cầu. Lớn hơn mọi mốc -> None (dùng ảnh gốc)."""
+    for width in PHOTO_DERIVATIVE_WIDTHS:
+        if width >= requested:
+            return width
+    return None
+
+
+def pick_format(accept: Optional[str]) -> str:
+    """Trình duyệt nhận WebP (Accept: image/webp) -> webp, còn lại -> png."""
+    return "webp" if accept and "image/webp" in accept else "png"
+
+
+class DerivativeCache:
+    """
+    Thư mục ảnh thu nhỏ (PHOTO_DERIVATIVES_DIR) với giới hạn dung lượng kiểu LRU.
+    - Tạo sẵn khi upload / đồng bộ ảnh; thiếu (bị dọn, ảnh gốc chép tay vào) thì tạo lúc có request
+    - Thứ tự LRU giữ trong RAM (nạp theo mtime lúc khởi động), không dựa vào atime của ổ đĩa
+    - Ảnh gốc mới hơn ảnh thu nhỏ (bị thay từ bên ngoài) -> tạo lại
+    """
+
+    def __init__(self, directory: str = PHOTO_DERIVATIVES_DIR, budget_mb: int = PHOTO_DERIVATIVE_BUDGET_MB):
+        self.directory = directory
+        self.budget_bytes = budget_mb * 1024 * 1024
+        # tên file -> dung lượng, cũ nhất ở đầu
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._building: Dict[str, asyncio.Task] = {}
+        self.generated = 0
+        self.evicted = 0
+
+    def load(self):
+        """Nạp danh sách ảnh thu nhỏ có sẵn trên đĩa (1 lần scandir lúc khởi động)."""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and ".tmp" not in entry.name:
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name, st.st_size))
+        found.sort()
+        with self._lock:
+            self._entries = OrderedDict((name, size) for _, name, size in found)
+            self.total_bytes = sum(self._entries.values())
+        self._evict()
+
+    # --- GHI NHẬN / DỌN ---
+    def record(self, written: Iterable[Tuple[str, int]]):
+        """Ghi nhận các file vừa tạo (kết quả của convert_photo / render_derivatives)."""
+        with self._lock:
+            for path, size in written:
+                name = os.path.basename(path)
+                self.total_bytes += size - self._entries.pop(name, 0)
+                self._entries[name] = size
+                self.generated += 1
+        self._evict()
+
+    def touch(self, name: str):
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+
+    def _evict(self):
+        victims = []
+        with self._lock:
+            while self.total_bytes > self.budget_bytes and len(self._entries) > 1:
+                name, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                victims.append(name)
+        for name in victims:
+            try:
+                os.remove(os.path.join(self.directory, name))
+                self.evicted += 1
+            except FileNotFoundError:
+                pass
+
+    # --- TẠO ---
+    async def generate(self, source_path: str, stem: str) -> List[Tuple[str, int]]:
+        """Tạo (lại) mọi ảnh thu nhỏ của 1 ảnh gốc. Các request cùng lúc cho cùng mã chờ chung 1 lượt."""
+        task = self._building.get(stem)
+        if task is None:
+            task = asyncio.ensure_future(photo_processor.run(render_derivatives, source_path, stem))
+            self._building[stem] = task
+            task.add_done_callback(lambda _: self._building.pop(stem, None))
+        written = await asyncio.shield(task)
+        self.record(written)
+        return written
+
+    async def get(self, emp_id: str, width: int, fmt: str) -> Optional[str]:
+        """Đường dẫn ảnh thu nhỏ (tạo nếu thiếu / cũ hơn ảnh gốc). Không có ảnh gốc -> None."""
+        index = await asyncio.to_thread(photo_index.ensure_fresh)
+        source = index.get(emp_id)
+        if source is None:
+            return None
+        name = derivative_name(emp_id, width, fmt)
+        path = os.path.join(self.directory, name)
+        try:
+            # stat lại ảnh gốc (không dùng mtime trong chỉ mục): file bị ghi đè tại chỗ
+            # không làm đổi mtime thư mục nên chỉ mục không biết
+            if os.stat(path).st_mtime >= os.stat(source.path).st_mtime:
+                self.touch(name)
+                return path
+        except FileNotFoundError:
+            pass
+        try:
+            await self.generate(source.path, emp_id)
+        except PhotoError as e:
+            logger.warning(f"Cannot build derivatives for {emp_id}: {e}")
+            return None
+        return path if os.path.exists(path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._entries),
+            "bytes": self.total_bytes,
+            "budget_bytes": self.budget_bytes,
+            "generated": self.generated,
+            "evicted": self.evicted,
+        }
+
+
+derivative_cache = DerivativeCache()
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import zipfile
+import asyncio
+import logging
+import tempfile
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+
+from app.config import PHOTO_MAX_UPLOAD_BYTES, PHOTO_ZIP_MAX_BYTES
+from app.services.photo_service import photo_processor, clean_photo_name, photo_target_path, PhotoError
+from app.services.photo_index_service import photo_index
+from app.services.photo_derivative_service import derivative_cache
+
+logger = logging.getLogger(__name__)
+
+# Đuôi file được nhận trong ZIP; file khác (Thumbs.db, ghi chú .txt...) báo lỗi, không xử lý
+IMPORT_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+
+# Gom các đoạn body nhỏ của request thành khối ~1 MB rồi mới ghi đĩa (ít lần chuyển sang thread)
+_WRITE_CHUNK = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """File gửi lên không phải ZIP hợp lệ."""
+
+
+class ArchiveTooLarge(ArchiveError):
+    """File ZIP vượt PHOTO_ZIP_MAX_BYTES."""
+
+
+async def spool_archive(chunks: AsyncIterator[bytes], limit: int = PHOTO_ZIP_MAX_BYTES) -> str:
+    """
+    Ghi body request (file ZIP) ra 1 file tạm, không giữ trong RAM.
+    ZIP để mục lục (central directory) ở cuối file nên phải nhận hết rồi mới đọc được.
+    """
+    fd, path = tempfile.mkstemp(prefix="photo_import_", suffix=".zip")
+    total = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            pending: List[bytes] = []
+            buffered = 0
+            async for chunk in chunks:
+                total += len(chunk)
+                if total > limit:
+                    raise ArchiveTooLarge(f"Archive too large (max {limit // (1024 * 1024)} MB)")
+                pending.append(chunk)
+                buffered += len(chunk)
+                if buffered >= _WRITE_CHUNK:
+                    await asyncio.to_thread(out.write, b"".join(pending))
+                    pending, buffered = [], 0
+            if pending:
+                await asyncio.to_thread(out.write, b"".join(pending))
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _result(filename: str, saved: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    # Cùng dạng với từng phần tử "results" của POST /api/upload
+    return {"filename": filename, "saved": saved, "error": error}
+
+
+def plan_entries(archive: zipfile.ZipFile) -> Tuple[List[Tuple[zipfile.ZipInfo, str]], List[Dict[str, Any]]]:
+    """
+    Chia các file trong ZIP thành: (ảnh cần xử lý, mã NV) và kết quả lỗi có ngay (không cần đọc ảnh).
+    Thư mục và file rác của macOS (__MACOSX/, ._abc.jpg, .DS_Store) bỏ qua, không báo.
+    """
+    jobs, rejected = [], []
+    seen: Dict[str, str] = {}
+    for info in archive.infolist():
+        name = info.filename
+        base = os.path.basename(name.rstrip("/"))
+        if info.is_dir() or name.startswith("__MACOSX/") or base.startswith("."):
+            continue
+        stem = clean_photo_name(base)
+        if os.path.splitext(base)[1].lower() not in IMPORT_EXTENSIONS:
+            rejected.append(_result(name, error="Not an image file"))
+        elif not stem:
+            rejected.append(_result(name, error="Invalid file name"))
+        elif info.flag_bits & 0x1:
+            rejected.append(_result(name, error="Encrypted entry"))
+        elif info.file_size > PHOTO_MAX_UPLOAD_BYTES:
+            rejected.append(_result(name, error="File too large"))
+        elif stem in seen:
+            # 2 file cùng mã (VD: a/123.jpg và b/123.png): giữ file gặp trước
+            rejected.append(_result(name, error=f"Duplicate employee id (already in {seen[stem]})"))
+        else:
+            seen[stem] = name
+            jobs.append((info, stem))
+    return jobs, rejected
+
+
+class ZipPhotoImport:
+    """
+    Nhập ảnh nhân viên từ 1 file ZIP (đã ghi ra file tạm bằng spool_archive).
+    - Không giải nén cả ZIP ra đĩa: process con nhận (đường dẫn ZIP, tên file) rồi tự đọc ảnh đó
+      vào RAM, process chính chỉ đọc mục lục ZIP
+    - Xử lý song song qua photo_processor (cùng đường xoay EXIF / RGB / profile như upload lẻ,
+      số ảnh đang xử lý cùng lúc = số process)
+    - Kết quả trả dần từng dòng JSON (NDJSON) theo thứ tự xử lý xong, dòng cuối là tổng kết
+    """
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self.archive: Optional[zipfile.ZipFile] = None
+
+    async def open(self):
+        try:
+            self.archive = await asyncio.to_thread(zipfile.ZipFile, self.zip_path)
+        except (zipfile.BadZipFile, OSError) as e:
+            self.close()
+            raise ArchiveError(f"Not a valid ZIP archive: {e}")
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        try:
+            os.remove(self.zip_path)
+        except FileNotFoundError:
+            pass
+
+    async def _import_one(self, info: zipfile.ZipInfo, stem: str) -> Dict[str, Any]:
+        path = photo_target_path(stem)
+        stamp = photo_index.stamp()
+        try:
+            converted = await photo_processor.convert_zip_entry(
+                self.zip_path, info.filename, path, derivative_stem=stem
+            )
+        except PhotoError as e:
+            return _result(info.filename, error=str(e))
+        photo_index.record(path, stamp)
+        await asyncio.to_thread(photo_index.remove_other_variants, path)
+        derivative_cache.record(converted["derivatives"])
+        return _result(info.filename, saved=os.path.basename(path))
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        tasks: List[asyncio.Task] = []
+        try:
+            jobs, rejected = plan_entries(self.archive)
+            for result in rejected:
+                yield _line(result)
+
+            tasks = [asyncio.ensure_future(self._import_one(info, stem)) for info, stem in jobs]
+            saved = 0
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                saved += result["saved"] is not None
+                yield _line(result)
+
+            seconds = time.perf_counter() - started
+            summary = {
+                "done": True,
+                "total": len(jobs) + len(rejected),
+                "saved": saved,
+                "failed": len(jobs) + len(rejected) - saved,
+                "seconds": round(seconds, 2),
+                "photos_per_sec": round(len(jobs) / seconds, 1) if seconds > 0 else None,
+            }
+            logger.info(f"ZIP photo import: {summary}")
+            yield _line(summary)
+        finally:
+            # Client ngắt kết nối giữa chừng -> bỏ các ảnh chưa xử lý
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.close()
+
+
+def _line(data: Dict[str, Any]) -> bytes:
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
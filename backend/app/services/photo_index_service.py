@@ -0,0 +1,177 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any, NamedTuple, Iterable
+
+from app.config import EMPLOYEE_IMAGES_DIR
+
+logger = logging.getLogger(__name__)
+
+# Các đuôi ảnh nhân viên, theo thứ tự ưu tiên khi 1 mã có nhiều file (png -> jpg -> jpeg -> webp)
+PHOTO_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+_PRIORITY = {ext: i for i, ext in enumerate(PHOTO_EXTENSIONS)}
+
+
+class PhotoEntry(NamedTuple):
+    path: str
+    ext: str
+    size: int
+    mtime: float
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+
+class PhotoIndex:
+    """
+    Chỉ mục ảnh nhân viên trong EMPLOYEE_IMAGES_DIR: employee_id -> file ảnh (path, ext, size, mtime).
+    - Dựng bằng 1 lần os.scandir thay vì os.path.exists từng đuôi cho từng mã
+    - Code ghi ảnh (upload, đồng bộ mã cũ) báo lại qua record() / discard()
+    - File thêm / xóa / đổi tên từ bên ngoài (copy tay vào thư mục, worker uvicorn khác)
+      -> mtime thư mục đổi -> ensure_fresh() quét lại (chỉ tốn 1 lần stat khi không có gì đổi)
+    """
+
+    def __init__(self, directory: str = EMPLOYEE_IMAGES_DIR):
+        self.directory = directory
+        # employee_id -> {ext: PhotoEntry}
+        self._files: Dict[str, Dict[str, PhotoEntry]] = {}
+        self._dir_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.last_scan_ms = 0.0
+
+    # --- DỰNG / LÀM MỚI ---
+    def _dir_stamp(self) -> Optional[int]:
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def rebuild(self):
+        started = time.perf_counter()
+        # Lấy mtime thư mục TRƯỚC khi quét: file thêm trong lúc quét sẽ làm lần kiểm tra sau quét lại
+        stamp = self._dir_stamp()
+        files: Dict[str, Dict[str, PhotoEntry]] = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    emp_id, ext = os.path.splitext(entry.name)
+                    if ext not in _PRIORITY or not emp_id or not entry.is_file():
+                        continue
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.setdefault(emp_id, {})[ext] = PhotoEntry(entry.path, ext, st.st_size, st.st_mtime)
+        except FileNotFoundError:
+            pass
+        self._files = files
+        self._dir_mtime = stamp
+        self.scans += 1
+        self.last_scan_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Photo index built: {len(files)} employees in {self.last_scan_ms} ms")
+
+    def stamp(self) -> Optional[int]:
+        """mtime thư mục, đọc ngay TRƯỚC khi ghi file ảnh rồi truyền cho record()."""
+        return self._dir_stamp()
+
+    def _advance_stamp(self, before: Optional[int]):
+        # Chỉ coi thay đổi mới của thư mục là của chính app khi trước lúc ghi chỉ mục đang khớp thư mục.
+        # Khác -> đã có thay đổi từ bên ngoài chưa quét: giữ mtime cũ để ensure_fresh() quét lại
+        if before is not None and before == self._dir_mtime:
+            self._dir_mtime = self._dir_stamp()
+
+    def ensure_fresh(self) -> "PhotoIndex":
+        """Quét lại nếu chưa dựng hoặc thư mục đã đổi (so mtime thư mục)."""
+        if self._dir_mtime is None or self._dir_stamp() != self._dir_mtime:
+            with self._lock:
+                if self._dir_mtime is None or self._dir_stamp() != self._dir_mtime:
+                    self.rebuild()
+        return self
+
+    # --- CẬP NHẬT TỪ CODE GHI ẢNH ---
+    def record(self, path: str, stamp: Optional[int] = None) -> Optional[PhotoEntry]:
+        """
+        Ghi nhận 1 file ảnh vừa ghi (hoặc ghi đè) trong thư mục ảnh.
+        stamp: giá trị stamp() đọc trước khi ghi file (None -> để lần ensure_fresh() sau quét lại).
+        """
+        emp_id, ext = os.path.splitext(os.path.basename(path))
+        if ext not in _PRIORITY or not emp_id:
+            return None
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.discard(emp_id, ext)
+            return None
+        entry = PhotoEntry(path, ext, st.st_size, st.st_mtime)
+        with self._lock:
+            # Thay dict con (không sửa tại chỗ) để thread đang đọc không thấy dict đổi giữa chừng
+            self._files[emp_id] = {**self._files.get(emp_id, {}), ext: entry}
+            # Thay đổi do chính app ghi: không cần quét lại cả thư mục
+            self._advance_stamp(stamp)
+        return entry
+
+    def discard(self, emp_id: str, ext: str):
+        with self._lock:
+            by_ext = {k: v for k, v in self._files.get(emp_id, {}).items() if k != ext}
+            if by_ext:
+                self._files[emp_id] = by_ext
+            else:
+                self._files.pop(emp_id, None)
+
+    def remove_other_variants(self, path: str) -> int:
+        """
+        Xóa các file ảnh khác đuôi của cùng mã (VD: vừa lưu NV01.jpg thì xóa NV01.png cũ).
+        Không xóa thì file cũ sẽ được ưu tiên (png trước jpg) và người dùng vẫn thấy ảnh cũ.
+        """
+        emp_id, keep_ext = os.path.splitext(os.path.basename(path))
+        before = self._dir_stamp()
+        removed = 0
+        for ext, entry in list(self._files.get(emp_id, {}).items()):
+            if ext == keep_ext:
+                continue
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            self.discard(emp_id, ext)
+        if removed:
+            with self._lock:
+                self._advance_stamp(before)
+        return removed
+
+    # --- TRA CỨU ---
+    def get(self, emp_id: str) -> Optional[PhotoEntry]:
+        """Ảnh của 1 mã theo thứ tự ưu tiên đuôi file (None nếu chưa có ảnh)."""
+        by_ext = self._files.get(emp_id)
+        if not by_ext:
+            return None
+        return min(by_ext.values(), key=lambda e: _PRIORITY[e.ext])
+
+    def get_ext(self, emp_id: str, ext: str) -> Optional[PhotoEntry]:
+        by_ext = self._files.get(emp_id)
+        return by_ext.get(ext) if by_ext else None
+
+    def lookup(self, emp_ids: Iterable[str]) -> Dict[str, PhotoEntry]:
+        result = {}
+        for emp_id in emp_ids:
+            entry = self.get(emp_id)
+            if entry is not None:
+                result[emp_id] = entry
+        return result
+
+    def __len__(self):
+        return len(self._files)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "employees": len(self._files),
+            "scans": self.scans,
+            "last_scan_ms": self.last_scan_ms,
+        }
+
+
+photo_index = PhotoIndex()
@@ -0,0 +1,297 @@
+import io
+import os
+import zlib
+import shutil
+import asyncio
+import logging
+import tempfile
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, BinaryIO, List, Tuple, NamedTuple, Union
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.config import (
+    PHOTO_WORKERS,
+    PHOTO_MAX_UPLOAD_BYTES,
+    PHOTO_MAX_PIXELS,
+    PHOTO_MAX_SIDE,
+    PHOTO_ENCODING_PROFILE,
+    EMPLOYEE_IMAGES_DIR,
+    PHOTO_DERIVATIVES_DIR,
+    PHOTO_DERIVATIVE_WIDTHS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pillow tự chặn ảnh quá lớn (DecompressionBombError) theo ngưỡng này
+Image.MAX_IMAGE_PIXELS = PHOTO_MAX_PIXELS
+
+# Kích thước đọc mỗi lần khi chép file upload ra đĩa
+_COPY_CHUNK = 1024 * 1024
+
+# Ảnh thu nhỏ: đuôi file -> (định dạng Pillow, tham số encode)
+# PNG chỉ là bản dự phòng cho trình duyệt không nhận WebP: zlib mức 6 nhanh hơn optimize=True ~10 lần,
+# file lớn hơn ~8% (optimize=True chiếm phần lớn thời gian xử lý 1 ảnh khi nhập hàng loạt)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "png": ("PNG", {"compress_level": 6}),
+}
+
+
+
+class EncodingProfile(NamedTuple):
+    format: str  # định dạng Pillow
+    ext: str  # đuôi file ảnh gốc lưu ra
+    params: Dict[str, Any]
+
+
+# Cách lưu ảnh gốc nhân viên (chọn bằng PHOTO_ENCODING_PROFILE, đo bằng benchmarks/bench_photo_profiles.py)
+# - png_fast: PNG nén zlib mức 1, encode nhanh hơn nhiều, file lớn hơn chút
+# - png_optimized: PNG optimize=True (cách lưu cũ), file nhỏ nhất trong các bản PNG nhưng encode chậm nhất
+# - webp_lossless: không mất dữ liệu như PNG, file nhỏ hơn rõ, encode chậm hơn png_fast
+# - jpeg_hq: JPEG q92 không giảm mẫu màu (4:4:4), file nhỏ nhất, mất dữ liệu rất ít (không thấy khi in thẻ)
+ENCODING_PROFILES = {
+    "png_fast": EncodingProfile("PNG", ".png", {"compress_level": 1}),
+    "png_optimized": EncodingProfile("PNG", ".png", {"optimize": True}),
+    "webp_lossless": EncodingProfile("WEBP", ".webp", {"lossless": True, "quality": 80, "method": 4}),
+    "jpeg_hq": EncodingProfile("JPEG", ".jpg", {"quality": 92, "subsampling": 0, "optimize": True}),
+}
+DEFAULT_ENCODING_PROFILE = "png_fast"
+
+
+def get_encoding_profile(name: Optional[str] = None) -> EncodingProfile:
+    name = name or PHOTO_ENCODING_PROFILE
+    profile = ENCODING_PROFILES.get(name)
+    if profile is None:
+        logger.error(f"Unknown PHOTO_ENCODING_PROFILE '{name}', using '{DEFAULT_ENCODING_PROFILE}'")
+        profile = ENCODING_PROFILES[DEFAULT_ENCODING_PROFILE]
+    return profile
+
+
+# Profile đang dùng (cùng giá trị ở process chính và process con vì cùng đọc biến môi trường)
+PHOTO_PROFILE = get_encoding_profile()
+
+
+def photo_target_path(emp_id: str) -> str:
+    """Đường dẫn lưu ảnh gốc của 1 mã theo profile đang dùng: static/images/NV01.png"""
+    return os.path.join(EMPLOYEE_IMAGES_DIR, f"{emp_id}{PHOTO_PROFILE.ext}")
+
+
+class PhotoError(Exception):
+    """Ảnh không xử lý được (không phải ảnh, quá lớn, hỏng...)."""
+
+
+def clean_photo_name(filename: str) -> str:
+    """Tên file gốc (thường là Mã NV) -> tên an toàn: chỉ giữ chữ/số, '-' và '_'."""
+    name = os.path.splitext(os.path.basename(filename or ""))[0]
+    return "".join([c for c in name if c.isalnum() or c in ("-", "_")]).strip()
+
+
+# --- CHẠY TRONG PROCESS CON ---
+def derivative_name(stem: str, width: int, fmt: str) -> str:
+    """Tên file ảnh thu nhỏ: NV01_w160.webp"""
+    return f"{stem}_w{width}.{fmt}"
+
+
+def _save_atomic(img: Image.Image, path: str, fmt: str, **params) -> int:
+    # Ghi ra file tạm rồi os.replace: người đang xem ảnh cũ không bao giờ đọc phải file ghi dở
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        img.save(tmp_path, fmt, **params)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(path)
+
+
+def _load_rgb(source_path: Union[str, BinaryIO], max_side: int) -> Image.Image:
+    """Đọc ảnh -> xoay đúng chiều (EXIF) -> RGB -> thu nhỏ nếu cạnh dài quá max_side."""
+    try:
+        with Image.open(source_path) as img:
+            # JPEG: giải mã thẳng ở tỉ lệ 1/2, 1/4, 1/8 (vẫn >= max_side) -> nhanh, ít RAM
+            if img.format == "JPEG":
+                img.draft("RGB", (max_side, max_side))
+            width, height = img.size
+            if width * height > PHOTO_MAX_PIXELS:
+                raise PhotoError(f"Image too large: {width}x{height} pixels")
+
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            if max(img.size) > max_side:
+                img.thumbnail((max_side, max_side), Image.LANCZOS)
+            img.load()
+            return img
+    except PhotoError:
+        raise
+    except Image.DecompressionBombError as e:
+        raise PhotoError(f"Image too large: {e}")
+    except UnidentifiedImageError:
+        raise PhotoError("Unsupported or invalid image file")
+    except (OSError, SyntaxError, ValueError) as e:
+        # Ảnh hỏng / cắt cụt giữa chừng
+        raise PhotoError(f"Cannot process image: {e}")
+
+
+def _write_derivatives(img: Image.Image, stem: str) -> List[Tuple[str, int]]:
+    """Ảnh thu nhỏ theo từng mốc chiều rộng (mỗi mốc 1 bản WebP + 1 bản PNG). Không phóng to."""
+    os.makedirs(PHOTO_DERIVATIVES_DIR, exist_ok=True)
+    written = []
+    current = img
+    # Thu nhỏ dần từ mốc lớn xuống mốc nhỏ (mỗi lần resize từ ảnh nhỏ hơn -> nhanh hơn)
+    for width in sorted(PHOTO_DERIVATIVE_WIDTHS, reverse=True):
+        if current.width > width:
+            height = max(1, round(current.height * width / current.width))
+            current = current.resize((width, height), Image.LANCZOS)
+        for fmt, (pil_format, params) in DERIVATIVE_FORMATS.items():
+            path = os.path.join(PHOTO_DERIVATIVES_DIR, derivative_name(stem, width, fmt))
+            written.append((path, _save_atomic(current, path, pil_format, **params)))
+    return written
+
+
+def convert_photo(
+    source_path: Union[str, BinaryIO],
+    target_path: str,
+    derivative_stem: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Đọc ảnh -> xoay đúng chiều (EXIF) -> RGB -> thu nhỏ nếu quá PHOTO_MAX_SIDE -> lưu theo profile.
+    target_path phải có đuôi khớp profile (dùng photo_target_path).
+    derivative_stem: tạo luôn ảnh thu nhỏ từ ảnh đã giải mã (không phải đọc lại file).
+    """
+    encoding = get_encoding_profile(profile)
+    img = _load_rgb(source_path, PHOTO_MAX_SIDE)
+    size = _save_atomic(img, target_path, encoding.format, **encoding.params)
+    derivatives = _write_derivatives(img, derivative_stem) if derivative_stem else []
+    return {"width": img.width, "height": img.height, "bytes": size, "derivatives": derivatives}
+
+
+def convert_zip_entry(
+    zip_path: str,
+    entry_name: str,
+    target_path: str,
+    derivative_stem: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Như convert_photo nhưng ảnh là 1 file trong ZIP: process con tự mở ZIP và giải nén file đó
+    vào RAM (không giải nén ra đĩa, không chuyển bytes ảnh từ process chính sang).
+    Kích thước khai báo trong ZIP có thể sai -> đọc có giới hạn PHOTO_MAX_UPLOAD_BYTES.
+    """
+    try:
+        with zipfile.ZipFile(zip_path) as archive, archive.open(entry_name) as src:
+            data = src.read(PHOTO_MAX_UPLOAD_BYTES + 1)
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError, OSError, KeyError) as e:
+        # CRC sai, file cắt cụt, kiểu nén lạ...
+        raise PhotoError(f"Cannot read archive entry: {e}")
+    if len(data) > PHOTO_MAX_UPLOAD_BYTES:
+        raise PhotoError("File too large")
+    return convert_photo(io.BytesIO(data), target_path, derivative_stem)
+
+
+def render_derivatives(source_path: str, stem: str) -> List[Tuple[str, int]]:
+    """Tạo ảnh thu nhỏ cho 1 ảnh đã có sẵn (ảnh được hardlink / copy, hoặc ảnh thu nhỏ bị dọn)."""
+    return _write_derivatives(_load_rgb(source_path, max(PHOTO_DERIVATIVE_WIDTHS)), stem)
+
+
+# --- PROCESS POOL (DÙNG CHUNG) ---
+class PhotoProcessor:
+    """
+    Pool process xử lý ảnh: decode/encode Pillow chiếm CPU và giữ GIL, chạy ngay trong
+    event loop sẽ làm đứng mọi request khác của worker.
+    - Giới hạn số ảnh đang xử lý cùng lúc = số process (ảnh còn lại chờ ở semaphore,
+      không xếp hàng hàng trăm file trong pool)
+    - Process con chỉ nhận đường dẫn file / tên file trong ZIP (không chuyển bytes ảnh qua lại giữa các process)
+    """
+
+    def __init__(self, workers: int = PHOTO_WORKERS):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.processed = 0
+        self.failed = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: không fork process đang chạy event loop + thread
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._slots
+
+    async def run(self, func, *args):
+        """Chạy func(*args) trong pool. Pool bị hỏng (process con chết) -> dựng lại 1 lần."""
+        async with self._get_slots():
+            loop = asyncio.get_running_loop()
+            for attempt in (1, 2):
+                try:
+                    return await loop.run_in_executor(self._get_pool(), func, *args)
+                except BrokenProcessPool:
+                    logger.error("Photo process pool broken, restarting")
+                    self._reset()
+                    if attempt == 2:
+                        raise PhotoError("Photo worker crashed")
+
+    async def _convert_with(self, func, *args) -> Dict[str, Any]:
+        try:
+            result = await self.run(func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        self.processed += 1
+        return result
+
+    async def convert(
+        self, source_path: str, target_path: str, derivative_stem: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return await self._convert_with(convert_photo, source_path, target_path, derivative_stem)
+
+    async def convert_zip_entry(
+        self, zip_path: str, entry_name: str, target_path: str, derivative_stem: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return await self._convert_with(convert_zip_entry, zip_path, entry_name, target_path, derivative_stem)
+
+    async def convert_upload(
+        self, stream: BinaryIO, target_path: str, derivative_stem: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Chép file upload (SpooledTemporaryFile) ra file tạm trên đĩa rồi xử lý trong pool."""
+        fd, spool_path = tempfile.mkstemp(prefix="photo_", suffix=".upload")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                await asyncio.to_thread(shutil.copyfileobj, stream, out, _COPY_CHUNK)
+            return await self.convert(spool_path, target_path, derivative_stem)
+        finally:
+            os.remove(spool_path)
+
+    def _reset(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._slots = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self._pool is not None,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+photo_processor = PhotoProcessor()
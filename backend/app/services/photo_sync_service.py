@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List
+
+from app.config import PHOTO_SYNC_DIR, PHOTO_SYNC_CONCURRENCY
+from app.services.hr_service import get_hr_client, HRServiceError
+from app.services.photo_service import photo_processor, photo_target_path, PHOTO_PROFILE, PhotoError
+from app.services.photo_index_service import photo_index
+from app.services.photo_derivative_service import derivative_cache
+from app.services.snapshot_service import snapshot_store
+
+logger = logging.getLogger(__name__)
+
+# Lease dùng chung với SnapshotStore: tại 1 thời điểm chỉ 1 worker chạy job đồng bộ ảnh
+PHOTO_SYNC_LEASE = "photo_sync"
+LEASE_SECONDS = 60
+# Ghi checkpoint sau mỗi bấy nhiêu ảnh hoặc bấy nhiêu giây (lấy điều kiện đến trước)
+CHECKPOINT_EVERY = 50
+CHECKPOINT_SECONDS = 2.0
+
+# Trạng thái job
+QUEUED, RUNNING, COMPLETED, FAILED, INTERRUPTED = "queued", "running", "completed", "failed", "interrupted"
+FINISHED = (COMPLETED, FAILED)
+
+
+def _checkpoint_path(job_id: str) -> str:
+    return os.path.join(PHOTO_SYNC_DIR, f"{job_id}.json")
+
+
+def _write_checkpoint(state: Dict[str, Any]):
+    # Ghi file tạm rồi os.replace: process chết giữa chừng vẫn còn checkpoint cũ nguyên vẹn
+    os.makedirs(PHOTO_SYNC_DIR, exist_ok=True)
+    path = _checkpoint_path(state["job_id"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_checkpoint(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_checkpoint_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _prune_checkpoints(keep: str):
+    """
+    Xóa checkpoint của mọi job khác `keep` (gọi khi job `keep` kết thúc, lúc còn giữ lease):
+    job cũ đã xong không còn ai hỏi, job dở dang cũ hơn không bao giờ được chạy tiếp
+    (chỉ checkpoint mới nhất được resume) -> thư mục chỉ còn vài file, _latest_checkpoint đọc nhanh.
+    """
+    try:
+        names = [n for n in os.listdir(PHOTO_SYNC_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name != f"{keep}.json":
+            try:
+                os.remove(os.path.join(PHOTO_SYNC_DIR, name))
+            except OSError:
+                pass
+
+
+def _latest_checkpoint() -> Optional[Dict[str, Any]]:
+    try:
+        names = [n for n in os.listdir(PHOTO_SYNC_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return None
+    states = [s for s in (_read_checkpoint(n[:-5]) for n in names) if s]
+    return max(states, key=lambda s: s["created_at"]) if states else None
+
+
+def public_view(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Trạng thái job trả cho client (bỏ danh sách kế hoạch nội bộ)."""
+    results = list(state["results"].values())
+    counts = {"linked": 0, "copied": 0, "converted": 0, "skipped": 0, "failed": 0}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    synced = counts["linked"] + counts["copied"] + counts["converted"]
+    finished = state["status"] in FINISHED
+    return {
+        "job_id": state["job_id"],
+        "status": state["status"],
+        "phase": state["phase"],
+        "total": state["total"],
+        "processed": len(results),
+        "synced_count": synced,
+        **counts,
+        "resumed": state["resumed"],
+        "created_at": state["created_at"],
+        "finished_at": state["finished_at"],
+        "error": state["error"],
+        "message": (
+            f"Sync process completed. Total synced: {synced}"
+            if state["status"] == COMPLETED
+            else state["error"] or f"Sync {state['status']}: {len(results)}/{state['total']}"
+        ),
+        "results": results if finished else results[-20:],
+    }
+
+
+def _new_state() -> Dict[str, Any]:
+    return {
+        "job_id": uuid.uuid4().hex[:12],
+        "status": QUEUED,
+        "phase": "fetching",
+        "created_at": time.time(),
+        "finished_at": None,
+        "total": 0,
+        # Kế hoạch: danh sách [mã cũ, mã mới] cần copy ảnh (lập 1 lần từ danh sách HR)
+        "plan": None,
+        # Kết quả theo mã mới: checkpoint = những mã đã có kết quả, chạy lại sẽ bỏ qua
+        "results": {},
+        "resumed": 0,
+        "error": None,
+    }
+
+
+def _link_or_copy(source_path: str, target_path: str) -> str:
+    """Cùng định dạng PNG -> không cần decode: hardlink (hoặc copy nếu không link được)."""
+    try:
+        os.link(source_path, target_path)
+        return "linked"
+    except FileExistsError:
+        raise
+    except OSError:
+        # Khác ổ đĩa / hệ thống file không hỗ trợ hardlink
+        tmp_path = f"{target_path}.tmp{os.getpid()}"
+        shutil.copyfile(source_path, tmp_path)
+        if os.path.exists(target_path):
+            os.remove(tmp_path)
+            raise FileExistsError(target_path)
+        os.replace(tmp_path, target_path)
+        return "copied"
+
+
+class PhotoSyncJob:
+    """
+    1 lượt đồng bộ ảnh Mã Cũ -> Mã Mới, chạy nền:
+    1. Lấy danh sách HR, lập kế hoạch (cặp mã cũ/mới có ảnh cũ mà chưa có ảnh mới)
+    2. Copy song song (tối đa PHOTO_SYNC_CONCURRENCY ảnh cùng lúc):
+       ảnh cũ đã là PNG -> hardlink/copy, định dạng khác -> convert trong process pool
+    3. Ghi checkpoint định kỳ vào PHOTO_SYNC_DIR: job bị ngắt (restart server...) sẽ chạy tiếp
+       từ những mã chưa có kết quả ở lần POST sau. Job kết thúc thì xóa checkpoint của các job khác
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        self.task: Optional[asyncio.Task] = None
+        self._dirty = 0
+        self._last_flush = 0.0
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def job_id(self) -> str:
+        return self.state["job_id"]
+
+    async def _flush(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._dirty < CHECKPOINT_EVERY and now - self._last_flush < CHECKPOINT_SECONDS:
+            return
+        self._dirty = 0
+        self._last_flush = now
+        async with self._flush_lock:
+            # Bản sao nông: task khác có thể thêm kết quả trong lúc đang ghi file
+            snapshot = {**self.state, "results": dict(self.state["results"])}
+            await asyncio.to_thread(_write_checkpoint, snapshot)
+            # Gia hạn lease: còn ghi checkpoint nghĩa là job còn sống
+            await asyncio.to_thread(snapshot_store.try_acquire_lease, PHOTO_SYNC_LEASE, LEASE_SECONDS)
+
+    async def _plan(self) -> List[List[str]]:
+        employees = await get_hr_client().fetch_employees_raw(timeout_budget=30)
+        index = await asyncio.to_thread(photo_index.ensure_fresh)
+        plan = []
+        for emp in employees or []:
+            # Lưu ý: WebService trả về key thường là chữ thường, kiểm tra kỹ
+            new_id = str(emp.get("employee_id", "")).strip()
+            old_id = str(emp.get("employee_old_id", "")).strip()
+            if not old_id or not new_id or new_id == old_id:
+                continue
+            # Đã có ảnh mới -> bỏ qua; không có ảnh cũ -> không có gì để copy
+            if index.get(new_id) or not index.get(old_id):
+                continue
+            plan.append([old_id, new_id])
+        return plan
+
+    async def _sync_one(self, old_id: str, new_id: str) -> Dict[str, Any]:
+        result = {"old_id": old_id, "new_id": new_id, "status": "failed", "error": None}
+        index = photo_index
+        source = index.get(old_id)
+        target_path = photo_target_path(new_id)
+        if index.get(new_id) or source is None:
+            # Ảnh mới đã được upload trong lúc job chạy / ảnh cũ đã bị xóa
+            result["status"] = "skipped"
+            return result
+        stamp = index.stamp()
+        try:
+            # Ảnh cũ đã đúng định dạng đang lưu -> không cần decode / encode lại
+            if source.ext == PHOTO_PROFILE.ext:
+                result["status"] = await asyncio.to_thread(_link_or_copy, source.path, target_path)
+                index.record(target_path, stamp)
+                # Ảnh thu nhỏ cho mã mới (ảnh gốc không cần decode, ảnh thu nhỏ thì phải tạo)
+                try:
+                    await derivative_cache.generate(target_path, new_id)
+                except PhotoError as e:
+                    logger.warning(f"Cannot build derivatives for {new_id}: {e}")
+            else:
+                converted = await photo_processor.convert(source.path, target_path, derivative_stem=new_id)
+                result["status"] = "converted"
+                index.record(target_path, stamp)
+                derivative_cache.record(converted["derivatives"])
+            logger.info(f"Auto-copied image for Old ID: {old_id} -> New ID: {new_id} ({result['status']})")
+        except FileExistsError:
+            result["status"] = "skipped"
+        except (PhotoError, OSError) as e:
+            result["error"] = str(e)
+            logger.error(f"Error syncing {old_id} -> {new_id}: {e}")
+        return result
+
+    async def run(self):
+        state = self.state
+        state["status"] = RUNNING
+        try:
+            if state["plan"] is None:
+                state["phase"] = "fetching"
+                await self._flush(force=True)
+                state["plan"] = await self._plan()
+                state["total"] = len(state["plan"])
+            state["phase"] = "copying"
+            await self._flush(force=True)
+
+            pending = [pair for pair in state["plan"] if pair[1] not in state["results"]]
+            slots = asyncio.Semaphore(PHOTO_SYNC_CONCURRENCY)
+
+            async def worker(old_id: str, new_id: str):
+                async with slots:
+                    state["results"][new_id] = await self._sync_one(old_id, new_id)
+                    self._dirty += 1
+                    await self._flush()
+
+            await asyncio.gather(*(worker(old_id, new_id) for old_id, new_id in pending))
+            state["status"] = COMPLETED
+            state["phase"] = "done"
+        except asyncio.CancelledError:
+            # Server tắt: giữ checkpoint để lần sau chạy tiếp
+            state["status"] = INTERRUPTED
+            raise
+        except HRServiceError as e:
+            state["status"] = FAILED
+            state["error"] = f"Cannot fetch HR Data: {e}"
+            logger.error(f"Photo sync {self.job_id}: {state['error']}")
+        except Exception as e:
+            state["status"] = FAILED
+            state["error"] = str(e)
+            logger.exception(f"Photo sync {self.job_id} failed")
+        finally:
+            if state["status"] != INTERRUPTED:
+                state["finished_at"] = time.time()
+            await asyncio.shield(self._finish())
+
+    async def _finish(self):
+        finished = self.state["status"] in FINISHED
+        if finished:
+            # Job xong không chạy tiếp nữa: bỏ kế hoạch, chỉ giữ kết quả cho API trạng thái
+            self.state["plan"] = None
+        await self._flush(force=True)
+        if finished:
+            await asyncio.to_thread(_prune_checkpoints, self.job_id)
+        await asyncio.to_thread(snapshot_store.release_lease, PHOTO_SYNC_LEASE)
+        view = public_view(self.state)
+        logger.info(
+            f"Photo sync {self.job_id} {view['status']}: "
+            f"{view['synced_count']} synced, {view['failed']} failed, {view['skipped']} skipped"
+        )
+
+
+class PhotoSyncManager:
+    """Giữ job đang chạy trong worker này; trạng thái job của worker khác đọc từ checkpoint."""
+
+    def __init__(self):
+        self.current: Optional[PhotoSyncJob] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> Dict[str, Any]:
+        """Chạy job mới, hoặc chạy tiếp job dở dang, hoặc trả về job đang chạy."""
+        async with self._lock:
+            if self.current is not None and not self.current.task.done():
+                return public_view(self.current.state)
+
+            if not await asyncio.to_thread(
+                snapshot_store.try_acquire_lease, PHOTO_SYNC_LEASE, LEASE_SECONDS
+            ):
+                # Worker khác đang chạy job -> trả về job đó để client theo dõi
+                latest = await asyncio.to_thread(_latest_checkpoint)
+                if latest is not None:
+                    return public_view(latest)
+                raise RuntimeError("Photo sync is running in another worker")
+
+            latest = await asyncio.to_thread(_latest_checkpoint)
+            if latest is not None and latest["status"] not in FINISHED:
+                # Job trước bị ngắt (restart / process chết) -> chạy tiếp từ checkpoint
+                latest["resumed"] += 1
+                state = latest
+                logger.info(f"Resuming photo sync {state['job_id']} ({len(state['results'])} done)")
+            else:
+                state = _new_state()
+
+            job = PhotoSyncJob(state)
+            job.task = asyncio.create_task(job.run())
+            self.current = job
+            return public_view(state)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id.isalnum():
+            return None
+        if self.current is not None and self.current.job_id == job_id:
+            return public_view(self.current.state)
+        state = await asyncio.to_thread(_read_checkpoint, job_id)
+        return public_view(state) if state else None
+
+    async def shutdown(self):
+        job = self.current
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        self.current = None
+        self._lock = asyncio.Lock()
+
+
+photo_sync = PhotoSyncManager()
@@ -0,0 +1,105 @@
+import logging
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import func, delete, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+def record_last_prints(db: Session, printed: Dict[str, Tuple[datetime, int]]):
+    """
+    Cập nhật bảng last_print cho 1 lô in (employee_id -> (thời điểm in, số lần in)).
+    Không commit: hàm gọi (log_print) commit chung với các dòng PrintLog.
+    """
+    if not printed:
+        return
+
+    rows = [
+        {"employee_id": emp_id, "last_printed_at": printed_at, "print_count": count}
+        for emp_id, (printed_at, count) in printed.items()
+    ]
+
+    # Upsert 1 câu lệnh (Postgres & SQLite đều hỗ trợ ON CONFLICT)
+    engine_name = db.get_bind().dialect.name
+    if engine_name in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if engine_name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(models.LastPrint).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.LastPrint.employee_id],
+            set_={
+                "last_printed_at": stmt.excluded.last_printed_at,
+                "print_count": models.LastPrint.print_count + stmt.excluded.print_count,
+            },
+        )
+        db.execute(stmt)
+        return
+
+    # DB khác: đọc rồi ghi qua ORM
+    existing = {
+        row.employee_id: row
+        for row in db.query(models.LastPrint)
+        .filter(models.LastPrint.employee_id.in_(list(printed.keys())))
+        .all()
+    }
+    for emp_id, (printed_at, count) in printed.items():
+        row = existing.get(emp_id)
+        if row:
+            row.last_printed_at = printed_at
+            row.print_count = (row.print_count or 0) + count
+        else:
+            db.add(
+                models.LastPrint(
+                    employee_id=emp_id, last_printed_at=printed_at, print_count=count
+                )
+            )
+
+
+def backfill_last_print(db: Session) -> int:
+    """
+    Dựng lại toàn bộ bảng last_print từ print_logs (chạy 1 lần khi nâng cấp).
+    Trả về số nhân viên được ghi.
+    """
+    select_stmt = (
+        db.query(
+            models.PrintLog.employee_id,
+            func.max(models.PrintLog.printed_at),
+            func.count(models.PrintLog.id),
+        )
+        .filter(models.PrintLog.employee_id.isnot(None))
+        .group_by(models.PrintLog.employee_id)
+        .statement
+    )
+
+    try:
+        db.execute(delete(models.LastPrint))
+        db.execute(
+            insert(models.LastPrint).from_select(
+                ["employee_id", "last_printed_at", "print_count"], select_stmt
+            )
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    total = db.query(func.count(models.LastPrint.employee_id)).scalar()
+    logger.info(f"Backfilled last_print: {total} employees")
+    return total
+
+
+# Chạy tay: python -m app.services.print_service
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine, tables=[models.LastPrint.__table__])
+    session = SessionLocal()
+    try:
+        count = backfill_last_print(session)
+        print(f" [Backfill] last_print rebuilt for {count} employees.")
+    finally:
+        session.close()
@@ -0,0 +1,290 @@
+from array import array
+from datetime import date
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Iterable, Iterator
+
+# Các cột của 1 bản ghi nhân viên (xem normalize_employee trong hr_service)
+# Cột ít giá trị khác nhau -> mã hóa từ điển (mảng mã số + danh sách giá trị)
+CATEGORICAL_FIELDS = (
+    "employee_department",
+    "employee_position",
+    "employee_status",
+    "employee_type",
+    "employee_gender",
+    "contract_type",
+    "maternity_type",
+)
+
+# Cột ngày YYYY-MM-DD -> số ngày (date.toordinal), 0 = không có ngày
+DATE_FIELDS = (
+    "employee_birth_date",
+    "employee_join_date",
+    "employee_left_date",
+    "contract_begin",
+    "contract_end",
+    "maternity_begin",
+    "maternity_end",
+)
+
+# Cột gần như duy nhất theo từng nhân viên -> giữ nguyên danh sách giá trị
+TEXT_FIELDS = (
+    "employee_id",
+    "employee_name",
+    "id",
+    "employee_old_id",
+    "contract_id",
+)
+
+# Ngày không phải YYYY-MM-DD (normalize_date trả nguyên gốc) -> lưu riêng theo vị trí
+_OTHER_DATE = -1
+_NO_DATE = 0
+
+
+@lru_cache(maxsize=65536)
+def ordinal_to_iso(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+def iso_to_ordinal(value) -> Optional[int]:
+    """'2026-01-09' -> ordinal; không đúng định dạng YYYY-MM-DD -> None."""
+    if (
+        isinstance(value, str)
+        and len(value) == 10
+        and value[4] == "-"
+        and value[7] == "-"
+    ):
+        try:
+            return date.fromisoformat(value).toordinal()
+        except ValueError:
+            return None
+    return None
+
+
+def _image_path(emp_id) -> str:
+    return f"/images/{emp_id}.png"
+
+
+class _CategoricalColumn:
+    """Mã hóa từ điển: codes[pos] là chỉ số trong values. Mảng mã tự nới kiểu khi nhiều giá trị."""
+
+    __slots__ = ("values", "codes", "_lookup")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes = array("B")
+        self._lookup: Dict[Any, int] = {}
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code == 256:
+                self.codes = array("H", self.codes)
+            elif code == 65536:
+                self.codes = array("I", self.codes)
+            self._lookup[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+
+    def get(self, pos: int):
+        return self.values[self.codes[pos]]
+
+
+class _DateColumn:
+    __slots__ = ("ordinals", "others")
+
+    def __init__(self):
+        self.ordinals = array("i")
+        self.others: Dict[int, Any] = {}
+
+    def append(self, value):
+        if value is None:
+            self.ordinals.append(_NO_DATE)
+            return
+        ordinal = iso_to_ordinal(value)
+        if ordinal is None:
+            self.others[len(self.ordinals)] = value
+            self.ordinals.append(_OTHER_DATE)
+        else:
+            self.ordinals.append(ordinal)
+
+    def get(self, pos: int):
+        ordinal = self.ordinals[pos]
+        if ordinal > 0:
+            return ordinal_to_iso(ordinal)
+        if ordinal == _NO_DATE:
+            return None
+        return self.others[pos]
+
+
+class EmployeeRoster:
+    """
+    Danh sách nhân viên của 1 snapshot HR, lưu theo cột thay vì 1 dict 21 khóa / người:
+    - Cột phân loại (phòng ban, chức vụ, trạng thái...): mảng mã + danh sách giá trị
+    - Cột ngày: mảng số nguyên (ordinal)
+    - employee_image: suy ra từ employee_id khi xuất (chỉ lưu các trường hợp khác quy tắc)
+    - last_printed_at: không lưu, ghép từ DB lúc trả response
+    Chỉ đọc sau khi dựng xong. Dict chỉ được tạo khi cần trả ra (row / rows / iter_rows).
+    """
+
+    __slots__ = ("size", "text", "categorical", "dates", "image_overrides")
+
+    def __init__(self):
+        self.size = 0
+        self.text: Dict[str, list] = {f: [] for f in TEXT_FIELDS}
+        self.categorical: Dict[str, _CategoricalColumn] = {
+            f: _CategoricalColumn() for f in CATEGORICAL_FIELDS
+        }
+        self.dates: Dict[str, _DateColumn] = {f: _DateColumn() for f in DATE_FIELDS}
+        self.image_overrides: Dict[int, Any] = {}
+
+    def __len__(self):
+        return self.size
+
+    # --- DỰNG ---
+    def append(self, emp: Dict[str, Any]):
+        """Thêm 1 bản ghi đã chuẩn hóa (normalize_employee)."""
+        pos = self.size
+        for field, column in self.text.items():
+            column.append(emp.get(field))
+        for field, column in self.categorical.items():
+            column.append(emp.get(field))
+        for field, column in self.dates.items():
+            column.append(emp.get(field))
+        image = emp.get("employee_image")
+        if image != _image_path(emp.get("employee_id")):
+            self.image_overrides[pos] = image
+        self.size = pos + 1
+
+    def freeze(self) -> "EmployeeRoster":
+        # Bảng tra chỉ cần lúc dựng
+        for column in self.categorical.values():
+            column._lookup = {}
+        return self
+
+    @classmethod
+    def from_records(cls, employees: Iterable[Dict[str, Any]]) -> "EmployeeRoster":
+        roster = cls()
+        for emp in employees:
+            roster.append(emp)
+        return roster.freeze()
+
+    # --- ĐỌC ---
+    def value(self, pos: int, field: str):
+        if field in self.text:
+            return self.text[field][pos]
+        if field in self.categorical:
+            return self.categorical[field].get(pos)
+        if field in self.dates:
+            return self.dates[field].get(pos)
+        if field == "employee_image":
+            if pos in self.image_overrides:
+                return self.image_overrides[pos]
+            return _image_path(self.text["employee_id"][pos])
+        if field == "last_printed_at":
+            return None
+        raise KeyError(field)
+
+    def column(self, field: str) -> list:
+        """Toàn bộ giá trị của 1 cột (danh sách tạm, dùng khi dựng chỉ mục)."""
+        if field in self.text:
+            return self.text[field]
+        if field in self.categorical:
+            column = self.categorical[field]
+            values = column.values
+            return [values[code] for code in column.codes]
+        return [self.value(pos, field) for pos in range(self.size)]
+
+    def employee_ids(self) -> list:
+        return self.text["employee_id"]
+
+    def row(self, pos: int) -> Dict[str, Any]:
+        """Dựng dict của 1 nhân viên (bản mới mỗi lần gọi, sửa thoải mái)."""
+        text = self.text
+        cat = self.categorical
+        dates = self.dates
+        emp_id = text["employee_id"][pos]
+        overrides = self.image_overrides
+        return {
+            "employee_id": emp_id,
+            "employee_name": text["employee_name"][pos],
+            "employee_department": cat["employee_department"].get(pos),
+            "employee_position": cat["employee_position"].get(pos),
+            "employee_status": cat["employee_status"].get(pos),
+            "employee_type": cat["employee_type"].get(pos),
+            "id": text["id"][pos],
+            "employee_gender": cat["employee_gender"].get(pos),
+            "employee_old_id": text["employee_old_id"][pos],
+            "employee_birth_date": dates["employee_birth_date"].get(pos),
+            "employee_join_date": dates["employee_join_date"].get(pos),
+            "employee_left_date": dates["employee_left_date"].get(pos),
+            "contract_begin": dates["contract_begin"].get(pos),
+            "contract_end": dates["contract_end"].get(pos),
+            "maternity_begin": dates["maternity_begin"].get(pos),
+            "maternity_end": dates["maternity_end"].get(pos),
+            "contract_type": cat["contract_type"].get(pos),
+            "contract_id": text["contract_id"][pos],
+            "maternity_type": cat["maternity_type"].get(pos),
+            "employee_image": overrides[pos] if overrides and pos in overrides else _image_path(emp_id),
+            "last_printed_at": None,
+        }
+
+    def rows(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.row(pos) for pos in positions]
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for pos in range(self.size):
+            yield self.row(pos)
+
+    def iter_row_batches(
+        self,
+        last_printed: Dict[str, Any],
+        batch_size: int = 2000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Toàn bộ nhân viên (đã ghép last_printed_at) theo từng lô dict:
+        mỗi lần chỉ có batch_size dict tồn tại, nơi gọi encode xong lô này rồi bỏ.
+        """
+        for start in range(0, self.size, batch_size):
+            batch = self.rows(range(start, min(start + batch_size, self.size)))
+            for emp in batch:
+                printed = last_printed.get(emp["employee_id"])
+                if printed is not None:
+                    emp["last_printed_at"] = printed
+            yield batch
+
+    # --- LƯU / NẠP (SnapshotStore) ---
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "format": "columnar-1",
+            "size": self.size,
+            "text": self.text,
+            "categorical": {
+                f: {"values": c.values, "codes": c.codes.tolist()}
+                for f, c in self.categorical.items()
+            },
+            "dates": {
+                f: {"ordinals": c.ordinals.tolist(), "others": {str(k): v for k, v in c.others.items()}}
+                for f, c in self.dates.items()
+            },
+            "image_overrides": {str(k): v for k, v in self.image_overrides.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "EmployeeRoster":
+        roster = cls()
+        roster.size = state["size"]
+        roster.text = {f: state["text"][f] for f in TEXT_FIELDS}
+        for f in CATEGORICAL_FIELDS:
+            data = state["categorical"][f]
+            column = roster.categorical[f]
+            column.values = data["values"]
+            typecode = "B" if len(column.values) <= 256 else "H" if len(column.values) <= 65536 else "I"
+            column.codes = array(typecode, data["codes"])
+        for f in DATE_FIELDS:
+            data = state["dates"][f]
+            column = roster.dates[f]
+            column.ordinals = array("i", data["ordinals"])
+            column.others = {int(k): v for k, v in data["others"].items()}
+        roster.image_overrides = {int(k): v for k, v in state["image_overrides"].items()}
+        return roster
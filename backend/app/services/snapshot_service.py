@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import zlib
+import socket
+import sqlite3
+import hashlib
+import logging
+from typing import Optional, Dict, Any, NamedTuple, Tuple, Iterable
+
+from app.config import HR_SNAPSHOT_DB
+from app.services.roster_service import EmployeeRoster
+
+logger = logging.getLogger(__name__)
+
+# Tên lease dùng để bầu ra worker duy nhất được gọi HR
+HR_REFRESH_LEASE = "hr_refresh"
+# Số phiên bản snapshot giữ lại trong file (bản mới nhất + vài bản dự phòng)
+SNAPSHOTS_TO_KEEP = 3
+# Số phiên bản giữ lại hash từng bản ghi (phục vụ /api/employees/changes?since=)
+HASH_HISTORY_TO_KEEP = 50
+
+# Trường không thuộc dữ liệu HR (ghép từ DB nội bộ) -> không tính vào hash
+_HASH_EXCLUDED_FIELDS = ("last_printed_at",)
+
+
+class StoredSnapshot(NamedTuple):
+    version: int
+    fetched_at: float
+    content_hash: str
+    record_hashes: Dict[str, str]
+    roster: EmployeeRoster
+
+
+def compute_record_hashes(employees: Iterable[Dict[str, Any]]) -> Tuple[str, Dict[str, str]]:
+    """
+    Hash từng bản ghi (employee_id -> hash) và hash của cả snapshot.
+    Hash cả snapshot phụ thuộc cả thứ tự danh sách (dùng làm ETag).
+    Nhận iterable để băm lần lượt từng dict dựng từ roster (roster.iter_rows()).
+    """
+    record_hashes = {}
+    content = hashlib.blake2b(digest_size=16)
+    for emp in employees:
+        data = {k: v for k, v in emp.items() if k not in _HASH_EXCLUDED_FIELDS}
+        encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.blake2b(encoded.encode("utf-8"), digest_size=8).hexdigest()
+        emp_id = str(emp.get("employee_id", ""))
+        record_hashes[emp_id] = digest
+        content.update(f"{emp_id}:{digest}\n".encode("utf-8"))
+    return content.hexdigest(), record_hashes
+
+
+def _pack(obj) -> bytes:
+    return zlib.compress(json.dumps(obj, ensure_ascii=False).encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob))
+
+
+class SnapshotStore:
+    """
+    Kho snapshot HR trên ổ cứng (1 file SQLite trong DATA_DIR).
+    - Dùng chung cho mọi worker uvicorn: worker nào làm mới xong thì worker khác đọc lại.
+    - Mỗi lần ghi là 1 transaction -> các worker không bao giờ đọc phải dữ liệu ghi dở.
+    - Mỗi snapshot có số version tăng dần; dữ liệu không đổi thì giữ nguyên version.
+    - Bảng 'snapshot_history' giữ hash từng bản ghi của các version gần đây để tính delta.
+    - Bảng 'leases' đảm bảo tại 1 thời điểm chỉ 1 process gọi HR.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: tự quản lý BEGIN/COMMIT
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    version INTEGER PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    employee_count INTEGER NOT NULL,
+                    payload BLOB NOT NULL
+                )
+                """
+            )
+            # File tạo từ bản cũ chưa có cột content_hash
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(snapshots)")}
+            if "content_hash" not in columns:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN content_hash TEXT")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshot_history (
+                    version INTEGER PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    record_hashes BLOB NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+        finally:
+            conn.close()
+
+    # --- ĐỌC ---
+    def latest_version(self) -> Optional[tuple]:
+        """Trả về (version, fetched_at) của snapshot mới nhất, không đọc payload."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT version, fetched_at FROM snapshots ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def load_latest(self) -> Optional[StoredSnapshot]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT version, fetched_at, content_hash, payload FROM snapshots ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+            history = (
+                conn.execute(
+                    "SELECT record_hashes FROM snapshot_history WHERE version = ?", (row[0],)
+                ).fetchone()
+                if row
+                else None
+            )
+        finally:
+            conn.close()
+
+        if not row:
+            return None
+        version, fetched_at, content_hash, payload = row
+        data = _unpack(payload)
+        if isinstance(data, list):
+            # Snapshot ghi từ bản cũ: danh sách dict
+            roster = EmployeeRoster.from_records(data)
+            del data
+        else:
+            roster = EmployeeRoster.from_state(data)
+        if content_hash and history:
+            record_hashes = _unpack(history[0])
+        else:
+            # Snapshot ghi từ bản cũ (chưa có hash) -> tính lại
+            content_hash, record_hashes = compute_record_hashes(roster.iter_rows())
+        return StoredSnapshot(version, fetched_at, content_hash, record_hashes, roster)
+
+    def load_record_hashes(self, version: int) -> Optional[Dict[str, str]]:
+        """Hash từng bản ghi của 1 version cũ (None nếu đã bị dọn hoặc không tồn tại)."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT record_hashes FROM snapshot_history WHERE version = ?", (version,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return _unpack(row[0]) if row else None
+
+    # --- GHI ---
+    def save(
+        self,
+        roster: EmployeeRoster,
+        fetched_at: float,
+        content_hash: str,
+        record_hashes: Dict[str, str],
+    ) -> int:
+        """
+        Ghi snapshot mới (atomic) và trả về version.
+        Nếu nội dung trùng snapshot mới nhất thì chỉ cập nhật fetched_at, giữ version cũ.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            latest = conn.execute(
+                "SELECT version, content_hash FROM snapshots ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+            if latest and latest[1] == content_hash:
+                conn.execute(
+                    "UPDATE snapshots SET fetched_at = ? WHERE version = ?",
+                    (fetched_at, latest[0]),
+                )
+                conn.execute("COMMIT")
+                return latest[0]
+
+            version = (latest[0] if latest else 0) + 1
+            conn.execute(
+                "INSERT INTO snapshots (version, fetched_at, employee_count, content_hash, payload) VALUES (?, ?, ?, ?, ?)",
+                (version, fetched_at, len(roster), content_hash, _pack(roster.to_state())),
+            )
+            conn.execute(
+                "INSERT INTO snapshot_history (version, content_hash, record_hashes) VALUES (?, ?, ?)",
+                (version, content_hash, _pack(record_hashes)),
+            )
+            conn.execute(
+                "DELETE FROM snapshots WHERE version <= ?",
+                (version - SNAPSHOTS_TO_KEEP,),
+            )
+            conn.execute(
+                "DELETE FROM snapshot_history WHERE version <= ?",
+                (version - HASH_HISTORY_TO_KEEP,),
+            )
+            conn.execute("COMMIT")
+            return version
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # --- LEASE (CHỈ 1 PROCESS GỌI HR) ---
+    def try_acquire_lease(self, name: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT holder, expires_at FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if row and row[0] != self.holder and row[1] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                (name, self.holder, now + ttl),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def release_lease(self, name: str):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM leases WHERE name = ? AND holder = ?", (name, self.holder)
+            )
+        finally:
+            conn.close()
+
+
+snapshot_store = SnapshotStore(HR_SNAPSHOT_DB)
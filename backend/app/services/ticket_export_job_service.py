@@ -0,0 +1,313 @@
+import os
+import json
+import hashlib
+import time
+import uuid
+import logging
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from app import models
+from app.config import TICKET_EXPORT_DIR, TICKET_EXPORT_WORKERS, TICKET_EXPORT_CACHE_FILES
+from app.database import SessionLocal
+from app.services.ticket_export_service import iter_tickets_xlsx
+from app.services.ticket_stats_service import range_version
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(TICKET_EXPORT_DIR, "jobs")
+FILES_DIR = os.path.join(TICKET_EXPORT_DIR, "files")
+
+# Job đang chạy ghi lại trạng thái (tiến độ) ít nhất mỗi bấy nhiêu giây;
+# quá STALE_SECONDS không cập nhật -> worker chạy job đã chết (restart...)
+HEARTBEAT_SECONDS = 2.0
+STALE_SECONDS = 60
+# Trạng thái job cũ hơn chừng này bị xóa (file báo cáo giữ theo TICKET_EXPORT_CACHE_FILES)
+JOB_TTL_SECONDS = 24 * 3600
+
+# Trạng thái job
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+FINISHED = (COMPLETED, FAILED)
+
+
+class ExportNotReady(Exception):
+    """Job chưa xong / lỗi, hoặc file đã bị xóa khỏi cache."""
+
+
+def _filter_key(start_date: Optional[date], end_date: Optional[date]) -> str:
+    return f"{start_date.isoformat() if start_date else 'all'}_{end_date.isoformat() if end_date else 'all'}"
+
+
+def _names_version(db) -> str:
+    """
+    Báo cáo có cả tên người tạo / người xử lý / loại sự cố: đổi tên user / loại sự cố không làm tăng
+    `changes` của ticket -> thêm dấu vân tay của các tên này vào phiên bản file.
+    """
+    digest = hashlib.sha1()
+    for row in db.query(models.User.id, models.User.full_name).order_by(models.User.id):
+        digest.update(f"u{row[0]}:{row[1]}\n".encode())
+    for row in db.query(models.TicketCategory.id, models.TicketCategory.name).order_by(models.TicketCategory.id):
+        digest.update(f"c{row[0]}:{row[1]}\n".encode())
+    return digest.hexdigest()[:10]
+
+
+def _file_path(filter_key: str, version: str) -> str:
+    return os.path.join(FILES_DIR, f"tickets_{filter_key}_v{version}.xlsx")
+
+
+def _state_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _write_state(state: Dict[str, Any]):
+    # Ghi file tạm rồi os.replace: worker khác đọc trạng thái không bao giờ gặp file ghi dở
+    state["updated_at"] = time.time()
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = _state_path(state["job_id"])
+    tmp_path = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_state(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_state_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def public_view(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Trạng thái job trả cho client (bỏ đường dẫn file trên server)."""
+    return {
+        "job_id": state["job_id"],
+        "status": state["status"],
+        "start_date": state["start_date"],
+        "end_date": state["end_date"],
+        "rows": state["rows"],
+        "bytes": state["bytes"],
+        "cached": state["cached"],
+        "created_at": state["created_at"],
+        "finished_at": state["finished_at"],
+        "error": state["error"],
+        "download_url": (
+            f"/api/tickets/export-jobs/{state['job_id']}/download" if state["status"] == COMPLETED else None
+        ),
+    }
+
+
+def download_name(state: Dict[str, Any]) -> str:
+    # Cùng tên với GET /api/tickets/export
+    return f"Report_{state['start_date'] or 'All'}_to_{state['end_date'] or 'All'}.xlsx"
+
+
+def _new_state(start_date: Optional[date], end_date: Optional[date], path: str) -> Dict[str, Any]:
+    return {
+        "job_id": uuid.uuid4().hex[:12],
+        "status": QUEUED,
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "path": path,
+        "rows": 0,
+        "bytes": None,
+        "cached": False,
+        "created_at": time.time(),
+        "updated_at": time.time(),
+        "finished_at": None,
+        "error": None,
+    }
+
+
+class TicketExportJobs:
+    """
+    Xuất Excel báo cáo ticket chạy nền: gửi yêu cầu -> hỏi trạng thái -> tải file.
+    - Chạy trong pool tối đa TICKET_EXPORT_WORKERS luồng / worker (mỗi luồng giữ 1 kết nối DB),
+      không chiếm luồng xử lý request trong lúc tạo file
+    - File xong lưu ở FILES_DIR theo (bộ lọc ngày, phiên bản dữ liệu của khoảng ngày): phiên bản
+      đổi khi có ticket trong khoảng được tạo / sửa / xóa, hoặc user / loại sự cố đổi tên
+      -> yêu cầu lại khi dữ liệu chưa đổi trả file có sẵn ngay, dữ liệu đổi thì tạo file mới
+    - Trạng thái job ghi ra JOBS_DIR -> worker nào cũng trả lời được hỏi trạng thái / tải file.
+      2 worker cùng nhận 1 yêu cầu mới có thể cùng tạo 1 file (kết quả giống nhau, ghi đè an toàn)
+    """
+
+    def __init__(self, workers: int = TICKET_EXPORT_WORKERS, max_files: int = TICKET_EXPORT_CACHE_FILES):
+        self.workers = max(1, workers)
+        self.max_files = max(1, max_files)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Đường dẫn file -> job_id đang tạo file đó trong worker này (gộp các yêu cầu trùng)
+        self._building: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ticket-export")
+        return self._executor
+
+    # --- API ---
+    def submit(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            version = f"{range_version(db, start_date, end_date)}-{_names_version(db)}"
+        finally:
+            db.close()
+        path = _file_path(_filter_key(start_date, end_date), version)
+        self._prune_jobs()
+
+        with self._lock:
+            building = self._building.get(path)
+            if building is not None:
+                state = _read_state(building)
+                if state is not None:
+                    return public_view(state)
+
+            state = _new_state(start_date, end_date, path)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            if size is not None:
+                # Đã có file cho đúng phiên bản dữ liệu này -> xong ngay
+                os.utime(path)  # Đánh dấu vừa dùng (xóa theo thứ tự lâu không dùng)
+                state.update(status=COMPLETED, cached=True, bytes=size, rows=None, finished_at=time.time())
+                _write_state(state)
+                return public_view(state)
+
+            self._building[path] = state["job_id"]
+        _write_state(state)
+        self._pool().submit(self._run, state)
+        return public_view(state)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        state = self._load(job_id)
+        return public_view(state) if state else None
+
+    def download(self, job_id: str) -> Tuple[str, str]:
+        """(đường dẫn file, tên file tải về) của job đã xong."""
+        state = self._load(job_id)
+        if state is None:
+            raise LookupError(job_id)
+        if state["status"] != COMPLETED:
+            raise ExportNotReady(f"Export job is {state['status']}")
+        if not os.path.exists(state["path"]):
+            raise ExportNotReady("Export file has expired, please export again")
+        os.utime(state["path"])
+        return state["path"], download_name(state)
+
+    def shutdown(self):
+        # Job đang chạy dừng ở lô dòng kế tiếp (không giữ process lại tới khi xuất xong)
+        self._stopping.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._stopping = threading.Event()
+
+    # --- NỘI BỘ ---
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not job_id.isalnum():
+            return None
+        state = _read_state(job_id)
+        if state is None:
+            return None
+        if (
+            state["status"] not in FINISHED
+            and time.time() - state["updated_at"] > STALE_SECONDS
+            and job_id not in self._building.values()
+        ):
+            state.update(status=FAILED, error="Export was interrupted, please export again", finished_at=time.time())
+            _write_state(state)
+        return state
+
+    def _run(self, state: Dict[str, Any]):
+        path = state["path"]
+        tmp_path = f"{path}.{state['job_id']}.tmp"
+        stopping = self._stopping
+        last_beat = time.monotonic()
+
+        def on_rows(rows: int):
+            nonlocal last_beat
+            if stopping.is_set():
+                raise RuntimeError("Server is shutting down")
+            state["rows"] = rows
+            if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                last_beat = time.monotonic()
+                _write_state(state)
+
+        started = time.perf_counter()
+        state["status"] = RUNNING
+        _write_state(state)
+        try:
+            os.makedirs(FILES_DIR, exist_ok=True)
+            start_date = date.fromisoformat(state["start_date"]) if state["start_date"] else None
+            end_date = date.fromisoformat(state["end_date"]) if state["end_date"] else None
+            with open(tmp_path, "wb") as out:
+                for chunk in iter_tickets_xlsx(start_date, end_date, on_rows=on_rows):
+                    out.write(chunk)
+            os.replace(tmp_path, path)
+            state.update(status=COMPLETED, bytes=os.path.getsize(path))
+            logger.info(
+                f"Ticket export job {state['job_id']}: {state['rows']} rows, {state['bytes']} bytes "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        except Exception as e:
+            state.update(status=FAILED, error=str(e))
+            logger.exception(f"Ticket export job {state['job_id']} failed")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        finally:
+            state["finished_at"] = time.time()
+            with self._lock:
+                self._building.pop(path, None)
+            _write_state(state)
+        if state["status"] == COMPLETED:
+            self._prune_files(keep=path)
+
+    def _prune_files(self, keep: str):
+        """Xóa file phiên bản cũ của cùng bộ lọc, rồi giữ tối đa max_files file dùng gần nhất."""
+        prefix = os.path.basename(keep).rsplit("_v", 1)[0] + "_v"
+        try:
+            names = [n for n in os.listdir(FILES_DIR) if n.endswith(".xlsx")]
+        except FileNotFoundError:
+            return
+        files = []
+        for name in names:
+            path = os.path.join(FILES_DIR, name)
+            if path != keep and name.startswith(prefix):
+                _remove(path)
+                continue
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        files.sort(reverse=True)
+        for _, path in files[self.max_files:]:
+            _remove(path)
+
+    def _prune_jobs(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        try:
+            names = os.listdir(JOBS_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(JOBS_DIR, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+ticket_exports = TicketExportJobs()
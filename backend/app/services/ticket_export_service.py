@@ -0,0 +1,205 @@
+import re
+import time
+import zipfile
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import models
+from app.database import SessionLocal
+from app.services.ticket_stats_service import created_between
+from app.services.zip_stream_service import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+EXPORT_HEADERS = (
+    "Ticket ID", "Title", "Requester", "Assignee",
+    "Category", "Status", "Priority", "Created At (VN)",
+    "Resolved At (VN)", "Resolution Note",
+)
+
+# Số dòng lấy từ DB mỗi lô (server-side cursor trên Postgres) và ghi vào XLSX mỗi lần
+EXPORT_CHUNK_ROWS = 2000
+
+# Giờ hiển thị trong báo cáo: cộng 7 tiếng (GMT+7, như bản xuất cũ)
+_VN_OFFSET = timedelta(hours=7)
+
+# Excel: tối đa 32767 ký tự / ô; ký tự điều khiển (trừ tab, xuống dòng) không hợp lệ trong XML
+_CELL_MAX_CHARS = 32767
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_COLUMNS = [chr(ord("A") + i) for i in range(len(EXPORT_HEADERS))]
+
+
+# --- CÁC PHẦN CỐ ĐỊNH CỦA FILE XLSX (1 sheet, 1 style cho header) ---
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+
+_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        f'<Override PartName="/xl/workbook.xml" ContentType="{_CT}.sheet.main+xml"/>'
+        f'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="{_CT}.worksheet+xml"/>'
+        f'<Override PartName="/xl/styles.xml" ContentType="{_CT}.styles+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        f'<Relationships xmlns="{_NS_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+        '<sheets><sheet name="Ticket Report" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        f'<Relationships xmlns="{_NS_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+        f'<Relationship Id="rId2" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    # Style 1 = header: chữ đậm trắng, nền xanh 4F81BD, căn giữa (giống bản openpyxl cũ)
+    "xl/styles.xml": (
+        f'<styleSheet xmlns="{_NS_MAIN}">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font></fonts>'
+        '<fills count="3"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill>'
+        '<fill><patternFill patternType="solid"><fgColor rgb="FF4F81BD"/><bgColor rgb="FF4F81BD"/></patternFill></fill>'
+        "</fills>"
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">'
+        '<alignment horizontal="center"/></xf></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        "</styleSheet>"
+    ),
+}
+
+
+def _text(value) -> str:
+    text = str(value)
+    if len(text) > _CELL_MAX_CHARS:
+        text = text[:_CELL_MAX_CHARS]
+    return escape(_ILLEGAL_XML_CHARS.sub("", text))
+
+
+def _row_xml(row_num: int, values: Sequence, style: str = "") -> str:
+    # Chuỗi ghi inline (t="inlineStr") -> không cần bảng sharedStrings dựng sẵn trước khi ghi dòng đầu
+    cells = []
+    for col, value in zip(_COLUMNS, values):
+        if value is None or value == "":
+            continue
+        if isinstance(value, int):
+            cells.append(f'<c r="{col}{row_num}"{style}><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{col}{row_num}"{style} t="inlineStr"><is><t xml:space="preserve">{_text(value)}</t></is></c>')
+    return f'<row r="{row_num}">{"".join(cells)}</row>'
+
+
+def _vn_time(value: Optional[datetime]) -> str:
+    return (value + _VN_OFFSET).strftime("%d/%m/%Y %H:%M") if value else ""
+
+
+def _export_query(start_date: Optional[date], end_date: Optional[date]):
+    """
+    Các cột phẳng của báo cáo, JOIN sẵn người tạo / người xử lý / loại sự cố
+    (thay vì đọc t.requester, t.assignee, t.ticket_category -> 3 câu SELECT mỗi dòng).
+    """
+    Ticket = models.Ticket
+    Requester = aliased(models.User)
+    Assignee = aliased(models.User)
+    return (
+        select(
+            Ticket.id,
+            Ticket.title,
+            Requester.full_name,
+            Assignee.full_name,
+            models.TicketCategory.name,
+            Ticket.status,
+            Ticket.priority,
+            Ticket.created_at,
+            Ticket.resolved_at,
+            Ticket.resolution_note,
+        )
+        .outerjoin(Requester, Ticket.requester_id == Requester.id)
+        .outerjoin(Assignee, Ticket.assignee_id == Assignee.id)
+        .outerjoin(models.TicketCategory, Ticket.category_id == models.TicketCategory.id)
+        .where(*created_between(start_date, end_date))
+        .order_by(Ticket.created_at.desc())
+    )
+
+
+def iter_tickets_xlsx(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    on_rows: Optional[Callable[[int], None]] = None,
+) -> Iterator[bytes]:
+    """
+    Sinh file XLSX báo cáo ticket theo từng đoạn, gửi ngay khi có (không ghi file tạm):
+    - Đọc DB theo lô EXPORT_CHUNK_ROWS dòng (yield_per), mỗi lô ghi thẳng XML vào sheet trong ZIP
+    - RAM chỉ giữ 1 lô dòng + bộ nén, không phụ thuộc số ticket
+    - Generator đồng bộ: StreamingResponse chạy từng bước trong threadpool; tự mở session DB riêng
+      vì chạy sau khi hàm API đã trả về
+    - on_rows(số dòng đã ghi): gọi sau mỗi lô (job chạy nền dùng để báo tiến độ / dừng giữa chừng)
+    """
+    started = time.perf_counter()
+    sink = ChunkSink()
+    count = 0
+    db = SessionLocal()
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for name, xml in _STATIC_PARTS.items():
+                zf.writestr(name, _XML_HEAD + xml)
+
+            with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+                sheet.write(f'{_XML_HEAD}<worksheet xmlns="{_NS_MAIN}"><sheetData>'.encode())
+                sheet.write(_row_xml(1, EXPORT_HEADERS, style=' s="1"').encode())
+
+                result = db.execute(
+                    _export_query(start_date, end_date).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+                )
+                for rows in result.partitions():
+                    lines = []
+                    for (ticket_id, title, requester, assignee, category,
+                         status, priority, created_at, resolved_at, note) in rows:
+                        count += 1
+                        lines.append(_row_xml(count + 1, (
+                            ticket_id,
+                            title,
+                            requester or "Unknown",
+                            assignee or "Unassigned",
+                            category or "General",
+                            status,
+                            priority,
+                            _vn_time(created_at),
+                            _vn_time(resolved_at),
+                            note or "",
+                        )))
+                    sheet.write("".join(lines).encode())
+                    if on_rows is not None:
+                        on_rows(count)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+                sheet.write(b"</sheetData></worksheet>")
+        # Phần cuối sheet + central directory (ghi khi đóng ZipFile)
+        yield sink.drain()
+    finally:
+        db.close()
+    logger.info(
+        f"Ticket export streamed: {count} rows, {sink.tell()} bytes in {time.perf_counter() - started:.1f}s"
+    )
@@ -0,0 +1,121 @@
+import json
+import time
+import base64
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query, Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# Tổng số ticket theo bộ lọc được cache bấy nhiêu giây (mỗi worker 1 bản, tạo / sửa / xóa ticket thì xóa ngay)
+TICKET_COUNT_TTL = 30
+
+
+class CursorError(ValueError):
+    """Cursor phân trang sai định dạng (bị sửa tay / cắt cụt)."""
+
+
+# --- CURSOR (opaque: base64 của [created_at, id, hướng]) ---
+def encode_cursor(ticket: models.Ticket, direction: str) -> str:
+    raw = json.dumps([ticket.created_at.isoformat(), ticket.id, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, ticket_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(ticket_id), direction
+    except (ValueError, TypeError) as e:
+        raise CursorError(f"Invalid cursor: {e}")
+
+
+def keyset_page(query: Query, size: int, cursor: Optional[str] = None, page: int = 1) -> Dict[str, Any]:
+    """
+    1 trang ticket mới nhất trước, theo khóa (created_at, id) thay vì OFFSET.
+    - cursor: lấy từ next_cursor / prev_cursor của trang trước -> đi tiếp bằng index, trang sâu cũng nhanh
+    - Không có cursor: trang `page` bằng OFFSET (nhảy thẳng tới 1 trang bất kỳ, giữ tương thích client cũ)
+    Lấy dư 1 dòng để biết còn trang sau / trước hay không (không cần COUNT).
+    """
+    key = tuple_(models.Ticket.created_at, models.Ticket.id)
+    newest_first = (models.Ticket.created_at.desc(), models.Ticket.id.desc())
+
+    if cursor:
+        created_at, ticket_id, direction = decode_cursor(cursor)
+        if direction == "next":
+            rows = query.filter(key < (created_at, ticket_id)).order_by(*newest_first).limit(size + 1).all()
+            items, has_after, has_before = rows[:size], len(rows) > size, True
+        else:
+            rows = (
+                query.filter(key > (created_at, ticket_id))
+                .order_by(models.Ticket.created_at.asc(), models.Ticket.id.asc())
+                .limit(size + 1)
+                .all()
+            )
+            items, has_after, has_before = rows[:size][::-1], True, len(rows) > size
+    else:
+        rows = query.order_by(*newest_first).offset((page - 1) * size).limit(size + 1).all()
+        items, has_after, has_before = rows[:size], len(rows) > size, page > 1
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1], "next") if items and has_after else None,
+        "prev_cursor": encode_cursor(items[0], "prev") if items and has_before else None,
+    }
+
+
+# --- TỔNG SỐ (COUNT) CÓ CACHE ---
+class TicketCountCache:
+    """
+    COUNT(*) theo bộ lọc, chỉ trên bảng tickets (không JOIN như query lấy dữ liệu),
+    nhớ trong TICKET_COUNT_TTL giây. Dữ liệu ticket đổi trong worker này -> invalidate().
+    Worker khác có thể thấy tổng cũ tối đa TICKET_COUNT_TTL giây (chỉ dùng để hiển thị phân trang).
+    """
+
+    def __init__(self, ttl: float = TICKET_COUNT_TTL):
+        self.ttl = ttl
+        self._values: Dict[Tuple, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, db: Session, key: Tuple, conditions: List[Any]) -> int:
+        now = time.monotonic()
+        cached = self._values.get(key)
+        if cached and cached[1] > now:
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        total = db.query(func.count(models.Ticket.id)).filter(*conditions).scalar() or 0
+        with self._lock:
+            self._values[key] = (total, now + self.ttl)
+        return total
+
+    def invalidate(self):
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._values), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+ticket_counts = TicketCountCache()
+
+
+# --- INDEX CHO DB ĐÃ CÓ SẴN ---
+def ensure_ticket_indexes(engine):
+    """create_all không thêm index vào bảng đã tồn tại -> tạo các index còn thiếu của tickets / ticket_comments."""
+    for model in (models.Ticket, models.TicketComment):
+        for index in model.__table__.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                logger.error(f"Cannot create index {index.name}: {e}")
@@ -0,0 +1,306 @@
+import time
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session, joinedload
+
+from app import models
+from app.services.employee_search_service import fold_text
+from app.services.ticket_stats_service import created_between
+
+logger = logging.getLogger(__name__)
+
+# Số từ tối đa lấy từ chuỗi tìm kiếm (từ cuối được tìm theo tiền tố: "mạn" khớp "mạng")
+MAX_TERMS = 8
+# Số ticket mỗi lô khi dựng lại chỉ mục
+REBUILD_BATCH = 2000
+
+# Trọng số cột khi xếp hạng: tiêu đề > mô tả + cách khắc phục > bình luận
+SQLITE_WEIGHTS = (10.0, 4.0, 1.0)  # bm25() của FTS5, theo thứ tự cột title, body, comments
+# Chỉ xếp hạng trong bấy nhiêu ticket khớp mới nhất (giữ thời gian truy vấn ổn định với từ phổ biến)
+RANK_WINDOW = 10_000
+
+# --- CHỈ MỤC TÌM KIẾM ---
+# Nội dung đưa vào chỉ mục và từ tìm kiếm đều qua fold_text (giống tìm nhân viên):
+# bỏ dấu, đ -> d, viết thường ("mang" khớp "mạng", "duc" khớp "Đức") trên cả SQLite lẫn Postgres
+
+# SQLite: bảng FTS5 ticket_search (rowid = tickets.id)
+_SQLITE_CREATE = "CREATE VIRTUAL TABLE ticket_search USING fts5(title, body, comments)"
+_SQLITE_INSERT = "INSERT INTO ticket_search (rowid, title, body, comments) VALUES (:id, :title, :body, :comments)"
+
+# Postgres: cột tickets.search_vector (tsvector, index GIN), cấu hình 'simple' (không có từ điển tiếng Việt)
+_PG_SETUP = (
+    "ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_tickets_search_vector ON tickets USING GIN (search_vector)",
+)
+_PG_UPDATE = (
+    "UPDATE tickets SET search_vector = "
+    "setweight(to_tsvector('simple', :title), 'A') || "
+    "setweight(to_tsvector('simple', :body), 'B') || "
+    "setweight(to_tsvector('simple', :comments), 'C') "
+    "WHERE id = :id"
+)
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _document(ticket_id: int, title, description, resolution_note, comments: List[str]) -> Dict[str, Any]:
+    return {
+        "id": ticket_id,
+        "title": fold_text(title),
+        "body": fold_text(f"{description or ''} {resolution_note or ''}"),
+        "comments": fold_text(" ".join(c for c in comments if c)),
+    }
+
+
+def _write_documents(db: Session, docs: List[Dict[str, Any]], replace: bool = True):
+    if _dialect(db) == "sqlite":
+        if replace:
+            db.execute(text("DELETE FROM ticket_search WHERE rowid = :id"), docs)
+        db.execute(text(_SQLITE_INSERT), docs)
+    elif _dialect(db) == "postgresql":
+        db.execute(text(_PG_UPDATE), docs)
+
+
+def index_ticket(db: Session, ticket_id: int):
+    """
+    Cập nhật chỉ mục tìm kiếm của 1 ticket sau khi ticket / bình luận của nó thay đổi.
+    Gọi sau db.flush() (để đọc được dữ liệu mới), không commit: commit chung với thay đổi của ticket.
+    """
+    Ticket, Comment = models.Ticket, models.TicketComment
+    row = (
+        db.query(Ticket.title, Ticket.description, Ticket.resolution_note)
+        .filter(Ticket.id == ticket_id)
+        .first()
+    )
+    if row is None:
+        return
+    comments = [
+        content
+        for (content,) in db.query(Comment.content).filter(Comment.ticket_id == ticket_id).order_by(Comment.id)
+    ]
+    _write_documents(db, [_document(ticket_id, *row, comments)])
+
+
+def unindex_ticket(db: Session, ticket_id: int):
+    # Postgres: vector nằm trên dòng ticket, xóa ticket là xong
+    if _dialect(db) == "sqlite":
+        db.execute(text("DELETE FROM ticket_search WHERE rowid = :id"), {"id": ticket_id})
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Dựng lại toàn bộ chỉ mục từ tickets + ticket_comments. Trả về số ticket được đánh chỉ mục."""
+    if _dialect(db) not in ("sqlite", "postgresql"):
+        return 0
+    Ticket, Comment = models.Ticket, models.TicketComment
+    total = 0
+    try:
+        if _dialect(db) == "sqlite":
+            db.execute(text("DELETE FROM ticket_search"))
+        # Theo lô id tăng dần; bình luận của cả lô lấy 1 lần theo khoảng ticket_id (index ticket_id)
+        last_id = 0
+        while True:
+            rows = (
+                db.query(Ticket.id, Ticket.title, Ticket.description, Ticket.resolution_note)
+                .filter(Ticket.id > last_id)
+                .order_by(Ticket.id)
+                .limit(REBUILD_BATCH)
+                .all()
+            )
+            if not rows:
+                break
+            comments = defaultdict(list)
+            for ticket_id, content in (
+                db.query(Comment.ticket_id, Comment.content)
+                .filter(Comment.ticket_id.between(rows[0][0], rows[-1][0]))
+                .order_by(Comment.ticket_id, Comment.id)
+            ):
+                comments[ticket_id].append(content)
+            _write_documents(db, [_document(*row, comments[row[0]]) for row in rows], replace=False)
+            last_id = rows[-1][0]
+            total += len(rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"Rebuilt ticket search index: {total} tickets")
+    return total
+
+
+def ensure_search_index(engine):
+    """Tạo chỉ mục tìm kiếm nếu chưa có (create_all không tạo bảng FTS5 / cột tsvector)."""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ticket_search'")
+            ).first()
+            if exists:
+                return
+            conn.execute(text(_SQLITE_CREATE))
+        elif dialect == "postgresql":
+            exists = conn.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'tickets' AND column_name = 'search_vector'"
+            )).first()
+            if exists:
+                return
+            for statement in _PG_SETUP:
+                conn.execute(text(statement))
+        else:
+            return
+    logger.info("Created ticket search index")
+
+
+def search_index_empty(db: Session) -> bool:
+    """
+    Chỉ mục chưa có dữ liệu: SQLite bảng ticket_search trống, Postgres còn ticket chưa có search_vector.
+    Kiểm tra theo nội dung (không theo lần tạo bảng) -> lần dựng trước bị lỗi thì lần khởi động sau dựng lại.
+    """
+    dialect = _dialect(db)
+    if dialect == "sqlite":
+        return db.execute(text("SELECT 1 FROM ticket_search LIMIT 1")).first() is None
+    if dialect == "postgresql":
+        return db.execute(text("SELECT 1 FROM tickets WHERE search_vector IS NULL LIMIT 1")).first() is not None
+    return False
+
+
+# --- TÌM KIẾM ---
+def search_terms(q: str) -> List[str]:
+    return fold_text(q).split()[:MAX_TERMS]
+
+
+def _fts5_query(terms: List[str]) -> str:
+    # Mỗi từ để trong ngoặc kép (không bị hiểu là cú pháp FTS5: AND / OR / NEAR / cột...), từ cuối tìm theo tiền tố
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def _tsquery(terms: List[str]) -> str:
+    return " & ".join([*terms[:-1], f"{terms[-1]}:*"])
+
+
+def _ranked_ids(db: Session, terms: List[str], conditions: List, limit: int, offset: int) -> List[Tuple[int, float]]:
+    Ticket = models.Ticket
+    dialect = _dialect(db)
+    if dialect == "sqlite":
+        fts = table("ticket_search", column("rowid"))
+        match = literal_column("ticket_search").op("MATCH")(_fts5_query(terms))
+        # bm25: càng nhỏ càng khớp -> đổi dấu để điểm lớn = khớp hơn
+        score = -func.bm25(literal_column("ticket_search"), *SQLITE_WEIGHTS)
+        row_id = fts.c.rowid  # Lọc rowid trên chính bảng FTS5 (không qua JOIN) mới dùng được chỉ mục
+        source = fts.join(Ticket, Ticket.id == fts.c.rowid)
+    elif dialect == "postgresql":
+        vector = literal_column("tickets.search_vector")
+        query = func.to_tsquery("simple", _tsquery(terms))
+        match = vector.op("@@")(query)
+        score = func.ts_rank_cd(vector, query)
+        row_id = Ticket.id
+        source = Ticket.__table__
+    else:
+        # DB khác: không có full-text -> LIKE trên các cột của ticket, mới nhất trước
+        like = [getattr(Ticket, name).ilike(f"%{term}%") for term in terms
+                for name in ("title", "description", "resolution_note")]
+        score = literal_column("0.0")
+        stmt = select(Ticket.id, score.label("score")).where(or_(*like))
+        stmt = stmt.where(*conditions).order_by(Ticket.created_at.desc()).limit(limit).offset(offset)
+        return [(row[0], float(row[1])) for row in db.execute(stmt)]
+
+    def ranked(window: List, offset: int, limit: int) -> List[Tuple[int, float]]:
+        stmt = select(Ticket.id, score.label("score")).select_from(source).where(match, *conditions, *window)
+        stmt = stmt.order_by(score.desc(), Ticket.id.desc()).limit(limit).offset(offset)
+        return [(row[0], float(row[1])) for row in db.execute(stmt)]
+
+    # Từ phổ biến khớp cả trăm nghìn ticket: chấm điểm hết mất hàng trăm ms -> chỉ xếp hạng
+    # RANK_WINDOW ticket khớp mới nhất (lấy rowid ranh giới theo thứ tự id rất rẻ)
+    floor = db.execute(
+        select(row_id).select_from(source if dialect == "postgresql" else fts)
+        .where(match).order_by(row_id.desc()).offset(RANK_WINDOW).limit(1)
+    ).scalar()
+    if floor is None:
+        return ranked([], offset, limit)
+
+    # Thứ tự cố định cho mọi trang: ticket trong cửa sổ (theo điểm) trước, ticket khớp cũ hơn (theo điểm) sau
+    # -> phân trang bằng offset không bỏ sót / lặp ticket khi bộ lọc loại gần hết ticket trong cửa sổ
+    window = row_id > floor
+    rows = ranked([window], offset, limit)
+    if len(rows) < limit:
+        if rows:
+            in_window = offset + len(rows)
+        else:
+            in_window = db.execute(
+                select(func.count()).select_from(source).where(match, *conditions, window)
+            ).scalar()
+        rows += ranked([row_id <= floor], max(0, offset - in_window), limit - len(rows))
+    return rows
+
+
+def search_tickets(
+    db: Session,
+    q: str,
+    status: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    requester_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Tìm ticket theo tiêu đề, mô tả, cách khắc phục và nội dung bình luận, xếp theo mức độ khớp.
+    Mọi từ trong q đều phải có (từ cuối khớp theo tiền tố). Lọc thêm theo status / ngày tạo / người tạo.
+    """
+    started = time.perf_counter()
+    terms = search_terms(q)
+    if not terms:
+        return {"items": [], "limit": limit, "offset": offset, "took_ms": 0.0}
+
+    Ticket = models.Ticket
+    conditions = created_between(start_date, end_date)
+    if status and status != "All":
+        conditions.append(Ticket.status == status)
+    if requester_id is not None:
+        conditions.append(Ticket.requester_id == requester_id)
+
+    ranked = _ranked_ids(db, terms, conditions, limit, offset)
+    tickets = {}
+    if ranked:
+        tickets = {
+            t.id: t
+            for t in db.query(Ticket)
+            .options(
+                joinedload(Ticket.requester),
+                joinedload(Ticket.assignee),
+                joinedload(Ticket.ticket_category),
+            )
+            .filter(Ticket.id.in_([ticket_id for ticket_id, _ in ranked]))
+        }
+
+    items = []
+    for ticket_id, score in ranked:
+        ticket = tickets.get(ticket_id)
+        if ticket is not None:
+            items.append({"ticket": ticket, "rank": score})
+    return {
+        "items": items,
+        "limit": limit,
+        "offset": offset,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# Chạy tay (sau khi sửa thẳng bảng tickets / ticket_comments trong DB): python -m app.services.ticket_search_service
+if __name__ == "__main__":
+    from app.database import SessionLocal, engine
+
+    ensure_search_index(engine)
+    session = SessionLocal()
+    try:
+        count = rebuild_search_index(session)
+        print(f" [Rebuild] ticket search index rebuilt for {count} tickets.")
+    finally:
+        session.close()
@@ -0,0 +1,192 @@
+import os
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, case, delete, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# Khoảng ngày ngắn hơn số ngày này: đếm thẳng trên bảng tickets (dùng index created_at),
+# dài hơn / không giới hạn: cộng các dòng của bảng tổng hợp ticket_daily_stats (1 dòng / ngày)
+ROLLUP_MIN_DAYS = 31
+
+STATS_FIELDS = ("total", "open", "in_progress", "resolved", "critical")
+
+# (ngày tạo, status, priority) của 1 ticket - đủ để biết ticket được đếm vào ô nào
+TicketSnapshot = Tuple[date, str, str]
+
+
+def _buckets(status, priority) -> Dict[str, int]:
+    # Cùng quy tắc với dashboard: Critical = priority '4' và chưa Resolved
+    return {
+        "total": 1,
+        "open": int(status == "Open"),
+        "in_progress": int(status == "In Progress"),
+        "resolved": int(status == "Resolved"),
+        "critical": int(priority == "4" and status != "Resolved"),
+    }
+
+
+def created_between(start_date: Optional[date], end_date: Optional[date]) -> List:
+    """
+    Điều kiện lọc ngày tạo dạng khoảng [start 00:00, end+1 00:00) trên cột created_at,
+    thay cho func.date(created_at) (bọc hàm quanh cột thì DB không dùng được index).
+    """
+    conditions = []
+    if start_date:
+        conditions.append(models.Ticket.created_at >= datetime.combine(start_date, time.min))
+    if end_date:
+        conditions.append(models.Ticket.created_at < datetime.combine(end_date + timedelta(days=1), time.min))
+    return conditions
+
+
+def _stat_columns():
+    # Đếm có điều kiện, theo thứ tự STATS_FIELDS (cùng quy tắc với _buckets)
+    Ticket = models.Ticket
+    return (
+        func.count(Ticket.id),
+        func.sum(case((Ticket.status == "Open", 1), else_=0)),
+        func.sum(case((Ticket.status == "In Progress", 1), else_=0)),
+        func.sum(case((Ticket.status == "Resolved", 1), else_=0)),
+        func.sum(case(((Ticket.priority == "4") & (Ticket.status != "Resolved"), 1), else_=0)),
+    )
+
+
+# --- ĐỌC THỐNG KÊ ---
+def _stats_from_tickets(db: Session, start_date: Optional[date], end_date: Optional[date]) -> Dict[str, int]:
+    # 1 câu SELECT đếm có điều kiện thay cho 5 lần count()
+    row = db.query(*_stat_columns()).filter(*created_between(start_date, end_date)).one()
+    return {field: int(value or 0) for field, value in zip(STATS_FIELDS, row)}
+
+
+def _stats_from_rollup(db: Session, start_date: Optional[date], end_date: Optional[date]) -> Dict[str, int]:
+    Daily = models.TicketDailyStats
+    query = db.query(*(func.sum(getattr(Daily, field)) for field in STATS_FIELDS))
+    if start_date:
+        query = query.filter(Daily.day >= start_date)
+    if end_date:
+        query = query.filter(Daily.day <= end_date)
+    return {field: int(value or 0) for field, value in zip(STATS_FIELDS, query.one())}
+
+
+def ticket_stats(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, int]:
+    """Tổng số / Open / In Progress / Resolved / Critical của các ticket tạo trong khoảng ngày."""
+    if start_date and end_date and (end_date - start_date).days < ROLLUP_MIN_DAYS:
+        return _stats_from_tickets(db, start_date, end_date)
+    return _stats_from_rollup(db, start_date, end_date)
+
+
+def range_version(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """
+    Phiên bản dữ liệu của các ticket tạo trong khoảng ngày: tổng bộ đếm `changes` của các ngày.
+    Tạo / sửa / xóa bất kỳ ticket nào trong khoảng -> số này tăng (dùng làm khóa cache báo cáo).
+    """
+    Daily = models.TicketDailyStats
+    query = db.query(func.sum(Daily.changes))
+    if start_date:
+        query = query.filter(Daily.day >= start_date)
+    if end_date:
+        query = query.filter(Daily.day <= end_date)
+    return int(query.scalar() or 0)
+
+
+# --- CẬP NHẬT BẢNG TỔNG HỢP ---
+def ticket_snapshot(ticket: models.Ticket) -> Optional[TicketSnapshot]:
+    if ticket is None or ticket.created_at is None:
+        return None
+    return ticket.created_at.date(), ticket.status, ticket.priority
+
+
+def record_ticket_stats(db: Session, before: Optional[TicketSnapshot], after: Optional[TicketSnapshot]):
+    """
+    Cộng / trừ phần chênh lệch vào ticket_daily_stats khi 1 ticket được tạo (before=None),
+    sửa, hoặc xóa (after=None), và tăng bộ đếm `changes` của ngày đó (kể cả khi chỉ sửa
+    tiêu đề / người xử lý). Không commit: hàm gọi commit chung với thay đổi của ticket.
+    """
+    deltas: Dict[date, Dict[str, int]] = {}
+    for snapshot, sign in ((before, -1), (after, 1)):
+        if snapshot is None:
+            continue
+        day, status, priority = snapshot
+        delta = deltas.setdefault(day, {**dict.fromkeys(STATS_FIELDS, 0), "changes": 1})
+        for field, value in _buckets(status, priority).items():
+            delta[field] += sign * value
+
+    rows = [{"day": day, **delta} for day, delta in deltas.items()]
+    if not rows:
+        return
+
+    Daily = models.TicketDailyStats
+    # Upsert cộng dồn 1 câu lệnh (Postgres & SQLite đều hỗ trợ ON CONFLICT)
+    engine_name = db.get_bind().dialect.name
+    if engine_name in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if engine_name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(Daily).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Daily.day],
+            set_={
+                field: func.coalesce(getattr(Daily, field), 0) + getattr(stmt.excluded, field)
+                for field in (*STATS_FIELDS, "changes")
+            },
+        )
+        db.execute(stmt)
+        return
+
+    # DB khác: đọc rồi ghi qua ORM
+    for row in rows:
+        existing = db.get(Daily, row["day"])
+        if existing is None:
+            db.add(Daily(**row))
+        else:
+            for field in (*STATS_FIELDS, "changes"):
+                setattr(existing, field, (getattr(existing, field) or 0) + row[field])
+
+
+def rebuild_daily_stats(db: Session) -> int:
+    """
+    Dựng lại toàn bộ ticket_daily_stats từ bảng tickets (chạy 1 lần khi nâng cấp,
+    hoặc khi dữ liệu ticket bị sửa thẳng trong DB). Trả về số ngày được ghi.
+    """
+    Ticket = models.Ticket
+    day = func.date(Ticket.created_at)
+    # changes bắt đầu bằng số ticket của ngày (mỗi ticket ít nhất 1 lần tạo)
+    select_stmt = (
+        db.query(day, *_stat_columns(), func.count(Ticket.id))
+        .filter(Ticket.created_at.isnot(None))
+        .group_by(day)
+        .statement
+    )
+
+    try:
+        db.execute(delete(models.TicketDailyStats))
+        db.execute(insert(models.TicketDailyStats).from_select(["day", *STATS_FIELDS, "changes"], select_stmt))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    total = db.query(func.count(models.TicketDailyStats.day)).scalar()
+    logger.info(f"Rebuilt ticket_daily_stats: {total} days")
+    return total
+
+
+# Chạy tay (sau khi sửa thẳng bảng tickets trong DB): python -m app.services.ticket_stats_service
+if __name__ == "__main__":
+    import shutil
+    from app.config import TICKET_EXPORT_DIR
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.create_all(bind=engine, tables=[models.TicketDailyStats.__table__])
+    session = SessionLocal()
+    try:
+        count = rebuild_daily_stats(session)
+        print(f" [Rebuild] ticket_daily_stats rebuilt for {count} days.")
+    finally:
+        session.close()
+    # Bộ đếm changes đã đặt lại -> file báo cáo cache theo phiên bản cũ không còn đáng tin
+    shutil.rmtree(os.path.join(TICKET_EXPORT_DIR, "files"), ignore_errors=True)
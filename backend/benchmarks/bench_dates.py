@@ -0,0 +1,80 @@
+"""
+Chuẩn hóa 7 cột ngày của roster HR:
+- strptime  : normalize_date cho từng ô (cách cũ)
+- normalizer: DateNormalizer (nhớ kết quả + parse theo định dạng của cột)
+Sau đó đo cả bước làm mới (parse response + chuẩn hóa + dựng roster) với từng cách.
+
+    cd backend && python -m benchmarks.bench_dates 50000
+"""
+import sys
+import time
+
+from app.services import hr_service
+from app.services.hr_service import DateNormalizer, normalize_date
+from app.services.roster_service import EmployeeRoster
+from benchmarks.hr_fixture import make_payload, make_raw_employees
+
+DATE_FIELDS = (
+    "employee_birth_date",
+    "employee_join_date",
+    "employee_left_date",
+    "contract_begin",
+    "contract_end",
+    "maternity_begin",
+    "maternity_end",
+)
+
+
+class StrptimeDates(DateNormalizer):
+    """Cách cũ: gọi normalize_date cho từng ô."""
+
+    def normalize(self, field, value):
+        return normalize_date(value)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def refresh_seconds(payload: str, normalizer_cls) -> float:
+    original = hr_service.DateNormalizer
+    hr_service.DateNormalizer = normalizer_cls
+    try:
+        chunks = (payload[i:i + 65536] for i in range(0, len(payload), 65536))
+        _, elapsed = timed(lambda: EmployeeRoster.from_records(hr_service.iter_employees(chunks)))
+    finally:
+        hr_service.DateNormalizer = original
+    return elapsed
+
+
+def main(count: int):
+    records = list(make_raw_employees(count))
+    cells = count * len(DATE_FIELDS)
+    print(f"{count} employees, {cells} date cells")
+
+    old, old_s = timed(
+        lambda: [[normalize_date(r.get(f)) for f in DATE_FIELDS] for r in records]
+    )
+    dates = DateNormalizer()
+    new, new_s = timed(
+        lambda: [[dates.normalize(f, r.get(f)) for f in DATE_FIELDS] for r in records]
+    )
+    assert old == new, "Kết quả khác normalize_date"
+
+    print(f"  strptime  : {old_s * 1000:8.1f} ms ({old_s / cells * 1e6:.2f} us/cell)")
+    print(f"  normalizer: {new_s * 1000:8.1f} ms ({new_s / cells * 1e6:.2f} us/cell)"
+          f" | {len(dates.cache)} distinct values, shapes {dates.shapes}")
+    print(f"  speedup   : {old_s / new_s:.1f}x")
+
+    # Tỉ trọng phần ngày trong cả bước làm mới snapshot
+    payload = make_payload(count)
+    refresh_old = refresh_seconds(payload, StrptimeDates)
+    refresh_new = refresh_seconds(payload, DateNormalizer)
+    print(f"  refresh (parse + normalize + roster): {refresh_old * 1000:.0f} ms -> {refresh_new * 1000:.0f} ms")
+    print(f"  dates share of refresh: {old_s / refresh_old * 100:.0f}% -> {new_s / refresh_new * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
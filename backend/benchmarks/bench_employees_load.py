@@ -0,0 +1,236 @@
+"""
+Benchmark tải cho GET /api/employees (đường nóng của trang danh sách nhân viên).
+
+Với mỗi kích thước roster: bật HR giả (fake_hr_server) + 1 process app mới (uvicorn,
+thư mục dữ liệu tạm), gọi 1 lần cho nóng cache rồi bắn N request với C request song song.
+Ghi lại: p50 / p99 / max latency, throughput, kích thước body, RSS của process app.
+
+    cd backend && python -m benchmarks.bench_employees_load
+    cd backend && python -m benchmarks.bench_employees_load --sizes 1000,10000 -c 32 -n 500
+    cd backend && python -m benchmarks.bench_employees_load --etag      # client gửi If-None-Match (304)
+    cd backend && python -m benchmarks.bench_employees_load --encoding identity
+
+Chỉ đọc RSS được trên Linux (/proc).
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import List, Optional, Dict
+
+import httpx
+
+from benchmarks.fake_hr_server import HR_PATH
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_TIMEOUT = 60
+FIRST_CALL_TIMEOUT = 300
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> Dict[str, Optional[float]]:
+    """VmRSS (hiện tại) và VmHWM (đỉnh) của process, MB."""
+    result = {"rss": None, "peak": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    result["rss"] = int(line.split()[1]) / 1024
+                elif line.startswith("VmHWM:"):
+                    result["peak"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return result
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _spawn(args: List[str], env: Dict[str, str], cwd: str, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def _stop(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, log_path: str):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                with open(log_path, errors="replace") as f:
+                    raise RuntimeError(f"Process exited early:\n{f.read()[-2000:]}")
+            try:
+                await client.get(url, timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+async def _run_load(
+    url: str,
+    total: int,
+    concurrency: int,
+    headers: Dict[str, str],
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    body_bytes = 0
+    queue = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal body_bytes
+        for _ in queue:
+            started = time.perf_counter()
+            # aiter_raw: đo thời gian server trả bytes, không tính giải nén phía client
+            async with client.stream("GET", url, headers=headers) as response:
+                size = 0
+                async for chunk in response.aiter_raw():
+                    size += len(chunk)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            body_bytes = max(body_bytes, size)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=FIRST_CALL_TIMEOUT) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50": _percentile(latencies, 50),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+        "rps": total / elapsed if elapsed else 0.0,
+        "body_kb": body_bytes / 1024,
+        "statuses": statuses,
+    }
+
+
+async def bench_size(size: int, hr_base: str, args) -> Dict[str, object]:
+    async with httpx.AsyncClient(timeout=FIRST_CALL_TIMEOUT) as client:
+        response = await client.post(f"{hr_base}/__config", params={"employees": size})
+        response.raise_for_status()
+
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="bench_employees_") as workdir:
+        log_path = os.path.join(workdir, "app.log")
+        app = _spawn(
+            ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            env={
+                "HR_API_URL": f"{hr_base}{HR_PATH}",
+                "DATA_DIR": os.path.join(workdir, "data"),
+                "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'app.db')}",
+                "HR_TIMEOUT_BUDGET": "120",
+            },
+            cwd=workdir,
+            log_path=log_path,
+        )
+        try:
+            await _wait_ready(f"{base}/api/employees/cache-status", app, log_path)
+            idle = _rss_mb(app.pid)
+
+            # Lần gọi đầu: cache rỗng -> chờ HR + parse + dựng cache / chỉ mục / payload
+            async with httpx.AsyncClient(timeout=FIRST_CALL_TIMEOUT) as client:
+                started = time.perf_counter()
+                first = await client.get(f"{base}/api/employees")
+                cold_ms = (time.perf_counter() - started) * 1000
+            if first.status_code != 200:
+                raise RuntimeError(f"First call failed: HTTP {first.status_code} {first.text[:200]}")
+            etag = first.headers.get("etag")
+
+            headers = {"Accept-Encoding": args.encoding}
+            if args.etag and etag:
+                headers["If-None-Match"] = etag
+            load = await _run_load(f"{base}/api/employees", args.requests, args.concurrency, headers)
+            after = _rss_mb(app.pid)
+        finally:
+            _stop(app)
+
+    return {"size": size, "cold_ms": cold_ms, "idle": idle, "after": after, **load}
+
+
+def _fmt_mb(value: Optional[float]) -> str:
+    return f"{value:7.1f}" if value is not None else "      -"
+
+
+async def main(args):
+    hr_port = _free_port()
+    hr_base = f"http://127.0.0.1:{hr_port}"
+    with tempfile.TemporaryDirectory(prefix="fake_hr_") as workdir:
+        log_path = os.path.join(workdir, "fake_hr.log")
+        hr = _spawn(
+            ["-m", "benchmarks.fake_hr_server", "--port", str(hr_port), "--employees", "1",
+             "--latency-ms", str(args.hr_latency_ms)],
+            env={},
+            cwd=BACKEND_DIR,
+            log_path=log_path,
+        )
+        try:
+            await _wait_ready(f"{hr_base}/__config", hr, log_path)
+            print(
+                f"GET /api/employees  requests={args.requests}  concurrency={args.concurrency}  "
+                f"Accept-Encoding={args.encoding}  If-None-Match={'yes' if args.etag else 'no'}"
+            )
+            print(
+                f"{'employees':>9} {'cold ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+                f"{'req/s':>8} {'body KB':>8} {'idle MB':>7} {'RSS MB':>7} {'peak MB':>7}  statuses"
+            )
+            for size in args.sizes:
+                r = await bench_size(size, hr_base, args)
+                print(
+                    f"{r['size']:>9} {r['cold_ms']:8.0f} {r['p50']:8.1f} {r['p99']:8.1f} "
+                    f"{r['max']:8.1f} {r['rps']:8.1f} {r['body_kb']:8.0f} {_fmt_mb(r['idle']['rss'])} "
+                    f"{_fmt_mb(r['after']['rss'])} {_fmt_mb(r['after']['peak'])}  {r['statuses']}"
+                )
+        finally:
+            _stop(hr)
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load benchmark for GET /api/employees")
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",") if x],
+        default=[1_000, 10_000, 100_000],
+        help="Roster sizes, comma separated (default 1000,10000,100000)",
+    )
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--encoding", default="gzip, br", help="Accept-Encoding sent by the client")
+    parser.add_argument("--etag", action="store_true", help="Send If-None-Match (measure the 304 path)")
+    parser.add_argument("--hr-latency-ms", type=float, default=0.0, help="Latency injected by the fake HR")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
@@ -0,0 +1,85 @@
+"""
+So sánh bộ nhớ đỉnh / thời gian parse response HR:
+- old   : đọc cả response.text -> raw_decode envelope -> json.loads chuỗi "d" -> chuẩn hóa
+- stream: đọc từng chunk 64KB -> HRStreamParser -> chuẩn hóa từng bản ghi
+
+    cd backend && python -m benchmarks.bench_hr_parse 100000
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+
+from app.services.hr_service import iter_employees, normalize_employee
+from benchmarks.hr_fixture import write_payload
+
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_old(path: str):
+    with open(path, encoding="utf-8") as f:
+        raw_text = f.read()  # = response.text
+    json_response, _ = json.JSONDecoder().raw_decode(raw_text)
+    data_obj = json.loads(json_response["d"])
+    return [normalize_employee(raw) for raw in data_obj["data"]]
+
+
+def parse_stream(path: str):
+    def chunks():
+        with open(path, encoding="utf-8") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    return list(iter_employees(chunks()))
+
+
+def first_record_ms(path: str) -> float:
+    started = time.perf_counter()
+    with open(path, encoding="utf-8") as f:
+        next(iter_employees(iter(lambda: f.read(CHUNK_SIZE), "")))
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(fn, path: str):
+    # Thời gian đo riêng: tracemalloc làm chậm việc cấp phát nhiều lần
+    started = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    result = fn(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def main(count: int):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        size = write_payload(path, count)
+        print(f"Fixture: {count} employees, {size / 1024 / 1024:.1f} MB")
+
+        results = {}
+        for name, fn in (("old", parse_old), ("stream", parse_stream)):
+            employees, elapsed, current, peak = measure(fn, path)
+            results[name] = employees
+            print(
+                f"{name:>7}: {elapsed:6.2f} s | peak {peak / 1024 / 1024:7.1f} MB"
+                f" | retained {current / 1024 / 1024:7.1f} MB"
+            )
+            del employees
+
+        assert results["old"] == results["stream"], "Kết quả 2 cách parse khác nhau"
+        print(f"stream first record after {first_record_ms(path):.1f} ms (old: after full parse)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
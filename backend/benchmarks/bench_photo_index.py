@@ -0,0 +1,101 @@
+"""
+Chỉ mục ảnh nhân viên (PhotoIndex) trên thư mục tạm N ảnh:
+- probe : os.path.exists từng đuôi cho từng mã (cách cũ)
+- index : 1 lần os.scandir rồi tra trong RAM
+Sau đó kiểm tra 2 PhotoIndex dùng chung 1 thư mục (2 worker uvicorn): ảnh do worker này
+hoặc copy tay ghi vào phải hiện ở worker kia, kể cả khi worker kia vừa ghi ảnh của chính nó.
+
+    cd backend && python -m benchmarks.bench_photo_index 20000
+"""
+import os
+import sys
+import time
+import tempfile
+
+from app.services.photo_index_service import PhotoIndex, PHOTO_EXTENSIONS
+
+# Timestamp của file / thư mục trên Linux có độ phân giải theo tick (~4 ms):
+# chờ giữa các lần ghi để mỗi bước là 1 thay đổi thư mục riêng
+TICK = 0.02
+
+
+def _touch(directory: str, name: str) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG")
+    return path
+
+
+def _app_write(index: PhotoIndex, name: str) -> str:
+    """Ghi ảnh như code của app: đọc stamp() trước khi ghi, rồi record()."""
+    time.sleep(TICK)
+    stamp = index.stamp()
+    path = _touch(index.directory, name)
+    index.record(path, stamp)
+    return path
+
+
+def check_shared_directory():
+    with tempfile.TemporaryDirectory(prefix="bench_photo_index_") as directory:
+        a, b = PhotoIndex(directory), PhotoIndex(directory)
+        a.ensure_fresh()
+        b.ensure_fresh()
+
+        # Ảnh của chính mình: không cần quét lại
+        scans = a.scans
+        _app_write(a, "NV0001.png")
+        assert a.ensure_fresh().get("NV0001") is not None
+        assert a.scans == scans, "Ảnh do chính worker ghi không được làm quét lại"
+
+        # Worker B ghi trước, worker A ghi sau -> A vẫn phải thấy ảnh của B
+        _app_write(b, "NV0002.png")
+        _app_write(a, "NV0003.png")
+        assert a.ensure_fresh().get("NV0002") is not None, "Mất ảnh do worker khác ghi"
+        assert b.ensure_fresh().get("NV0003") is not None
+
+        # Copy tay vào thư mục rồi A ghi ảnh + xóa ảnh cũ khác đuôi
+        time.sleep(TICK)
+        _touch(directory, "NV0004.png")
+        _touch(directory, "NV0005.jpg")
+        a.ensure_fresh()
+        time.sleep(TICK)
+        _touch(directory, "NV0006.png")
+        path = _app_write(a, "NV0005.png")
+        a.remove_other_variants(path)
+        assert a.ensure_fresh().get("NV0006") is not None, "Mất ảnh copy tay"
+        assert a.get("NV0005").ext == ".png" and b.ensure_fresh().get_ext("NV0005", ".jpg") is None
+    print("shared directory check: OK")
+
+
+def main(count: int):
+    with tempfile.TemporaryDirectory(prefix="bench_photo_index_") as directory:
+        ids = [f"NV{i:06d}" for i in range(count)]
+        for i, emp_id in enumerate(ids):
+            if i % 4:  # 3/4 số mã có ảnh
+                _touch(directory, f"{emp_id}{PHOTO_EXTENSIONS[i % 2]}")
+
+        started = time.perf_counter()
+        probed = sum(
+            1 for emp_id in ids
+            if any(os.path.exists(os.path.join(directory, emp_id + ext)) for ext in PHOTO_EXTENSIONS)
+        )
+        probe = time.perf_counter() - started
+
+        index = PhotoIndex(directory)
+        started = time.perf_counter()
+        index.ensure_fresh()
+        build = time.perf_counter() - started
+        started = time.perf_counter()
+        found = len(index.lookup(ids))
+        lookup = time.perf_counter() - started
+        assert probed == found, "Kết quả 2 cách khác nhau"
+
+    print(f"photos={found} ids={count}")
+    print(f"  probe (exists x {len(PHOTO_EXTENSIONS)})     : {probe * 1000:8.1f} ms")
+    print(f"  index build            : {build * 1000:8.1f} ms")
+    print(f"  index lookup           : {lookup * 1000:8.1f} ms")
+    check_shared_directory()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,110 @@
+"""
+So sánh các profile lưu ảnh nhân viên (ENCODING_PROFILES trong app/services/photo_service.py):
+thời gian encode, thời gian decode lại (khi in thẻ / tạo ảnh thu nhỏ) và dung lượng file.
+
+Ảnh mẫu: thư mục ảnh thật (JPEG/PNG từ máy chụp) hoặc, nếu không truyền, ảnh chân dung giả lập
+(nền chuyển màu + nhiễu cảm biến, lưu JPEG như máy ảnh). Mỗi ảnh đi qua đúng bước
+decode -> xoay EXIF -> RGB -> thu nhỏ về PHOTO_MAX_SIDE như lúc upload, rồi mới encode theo profile.
+
+    cd backend && python -m benchmarks.bench_photo_profiles
+    cd backend && python -m benchmarks.bench_photo_profiles /path/to/photos --max-side 1200
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.config import PHOTO_MAX_SIDE, PHOTO_ENCODING_PROFILE
+from app.services.photo_service import ENCODING_PROFILES, _load_rgb
+from app.services.photo_index_service import PHOTO_EXTENSIONS
+
+
+def make_sample(path: str, seed: int, size=(3000, 4000)):
+    """Ảnh chân dung giả lập: nền chuyển màu, mảng màu mờ, nhiễu như ảnh máy chụp."""
+    width, height = size
+    base = Image.linear_gradient("L").resize(size)
+    img = Image.merge("RGB", (
+        base,
+        base.rotate(90 + seed * 7, expand=False),
+        Image.new("L", size, 90 + seed * 13 % 120),
+    ))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((width * 0.25, height * 0.15, width * 0.75, height * 0.6), fill=(214, 170, 140))
+    draw.rectangle((width * 0.1, height * 0.62, width * 0.9, height), fill=(30 + seed * 20 % 200, 50, 110))
+    img = img.filter(ImageFilter.GaussianBlur(12))
+    noise = Image.effect_noise(size, 18).convert("RGB")
+    img = Image.blend(img, noise, 0.08)
+    img.save(path, "JPEG", quality=90)
+
+
+def load_samples(directory: str):
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in PHOTO_EXTENSIONS
+    )
+
+
+def bench_profile(images, profile):
+    encode_ms, decode_ms, sizes = [], [], []
+    for img in images:
+        buf = io.BytesIO()
+        started = time.perf_counter()
+        img.save(buf, profile.format, **profile.params)
+        encode_ms.append((time.perf_counter() - started) * 1000)
+        sizes.append(buf.tell())
+
+        buf.seek(0)
+        started = time.perf_counter()
+        with Image.open(buf) as decoded:
+            decoded.load()
+        decode_ms.append((time.perf_counter() - started) * 1000)
+    return encode_ms, decode_ms, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Thư mục ảnh mẫu (bỏ trống -> ảnh giả lập)")
+    parser.add_argument("-n", "--count", type=int, default=8, help="Số ảnh giả lập")
+    parser.add_argument("--max-side", type=int, default=PHOTO_MAX_SIDE, help="Cạnh dài tối đa ảnh lưu")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="photo_bench_") as tmp:
+        if args.directory:
+            paths = load_samples(args.directory)
+        else:
+            paths = []
+            for i in range(args.count):
+                path = os.path.join(tmp, f"sample_{i}.jpg")
+                make_sample(path, i)
+                paths.append(path)
+        if not paths:
+            sys.exit("No sample photos found")
+
+        started = time.perf_counter()
+        images = [_load_rgb(path, args.max_side) for path in paths]
+        load_ms = (time.perf_counter() - started) * 1000 / len(images)
+
+    print(f"Samples: {len(images)} photos, max side {args.max_side} px "
+          f"(decode + EXIF + resize: {load_ms:.0f} ms/photo, same for every profile)")
+    print(f"PHOTO_ENCODING_PROFILE: {PHOTO_ENCODING_PROFILE}")
+    print(f"  {'profile':<14} {'encode ms':>10} {'p90':>7} {'decode ms':>10} {'KB/photo':>9} {'vs png_opt':>10}")
+
+    results = {name: bench_profile(images, profile) for name, profile in ENCODING_PROFILES.items()}
+    reference = statistics.mean(results["png_optimized"][2])
+    for name, (encode_ms, decode_ms, sizes) in results.items():
+        p90 = sorted(encode_ms)[int(len(encode_ms) * 0.9) - 1] if len(encode_ms) > 1 else encode_ms[0]
+        print(
+            f"  {name:<14} {statistics.mean(encode_ms):10.1f} {p90:7.1f} "
+            f"{statistics.mean(decode_ms):10.1f} {statistics.mean(sizes) / 1024:9.0f} "
+            f"{statistics.mean(sizes) / reference:9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Bộ nhớ giữ lại cho mỗi nhân viên trong cache HR:
+- dicts : list dict đã chuẩn hóa (cách lưu cũ)
+- roster: EmployeeRoster dạng cột
+
+Dữ liệu đi qua đúng đường parse thật (JSON -> HRStreamParser) để chuỗi không bị
+dùng chung giữa các bản ghi như khi sinh trực tiếp bằng Python.
+
+    cd backend && python -m benchmarks.bench_roster_memory 100000
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from app.services.hr_service import iter_employees
+from app.services.payload_service import encode_employee_list
+from app.services.roster_service import EmployeeRoster
+from benchmarks.hr_fixture import make_payload
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunks(payload: str):
+    for start in range(0, len(payload), CHUNK_SIZE):
+        yield payload[start:start + CHUNK_SIZE]
+
+
+def build_dicts(payload: str):
+    return list(iter_employees(_chunks(payload)))
+
+
+def build_roster(payload: str):
+    return EmployeeRoster.from_records(iter_employees(_chunks(payload)))
+
+
+def retained_bytes(build, payload: str):
+    gc.collect()
+    tracemalloc.start()
+    result = build(payload)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main(count: int):
+    payload = make_payload(count)
+    print(f"Fixture: {count} employees, {len(payload) / 1024 / 1024:.1f} MB")
+
+    employees, dict_bytes = retained_bytes(build_dicts, payload)
+    del employees
+    roster, roster_bytes = retained_bytes(build_roster, payload)
+
+    print(f"  dicts : {dict_bytes / count:8.0f} B/employee ({dict_bytes / 1024 / 1024:6.1f} MB)")
+    print(f"  roster: {roster_bytes / count:8.0f} B/employee ({roster_bytes / 1024 / 1024:6.1f} MB)")
+    print(f"  ratio : {dict_bytes / roster_bytes:.1f}x")
+
+    # Chi phí dựng dict lúc trả response
+    started = time.perf_counter()
+    rows = roster.rows(range(min(50, count)))
+    page_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    payload = encode_employee_list(roster, {}, {"source": "online", "version": 1})
+    full_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    body, _ = payload.choose("gzip")
+    hit_ms = (time.perf_counter() - started) * 1000
+    print(f"  materialize 1 page (50 rows): {page_ms:.2f} ms")
+    print(
+        f"  encode + compress full list ({payload.size / 1024 / 1024:.1f} MB JSON, "
+        f"gzip {len(payload.gzip) / 1024 / 1024:.1f} MB"
+        + (f", br {len(payload.br) / 1024 / 1024:.1f} MB" if payload.br else "")
+        + f"): {full_ms:.0f} ms"
+    )
+    print(f"  cached hit (gzip body): {hit_ms:.3f} ms")
+    del rows
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,169 @@
+"""
+Benchmark xuất Excel báo cáo ticket: GET /api/tickets/export với N ticket (mặc định 100k).
+
+Bật 1 process app mới (uvicorn, DB SQLite tạm), ghi thẳng N ticket / 200 user vào DB (sqlite3),
+rồi tải file XLSX dạng stream. Ghi lại: thời gian tới byte đầu tiên, tổng thời gian, số dòng/giây,
+kích thước file, RSS của process app trước / sau khi xuất (VmHWM = đỉnh).
+
+    cd backend && python -m benchmarks.bench_ticket_export
+    cd backend && python -m benchmarks.bench_ticket_export -n 20000 --verify     # mở lại file bằng openpyxl
+
+Chỉ đọc RSS được trên Linux (/proc).
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict
+
+import httpx
+from jose import jwt
+
+from benchmarks.bench_employees_load import _free_port, _spawn, _stop, _wait_ready, _rss_mb, _fmt_mb
+
+SECRET_KEY = "bench_ticket_export"
+USERS = 200
+STATUSES = ("Open", "In Progress", "Resolved", "Cancelled")
+
+
+def seed_tickets(db_path: str, count: int, seed: int = 0):
+    """Thêm user + ticket giả lập (bảng / loại sự cố do app tạo lúc khởi động)."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany(
+            "INSERT INTO users (username, full_name, hashed_password, role, is_active) VALUES (?, ?, '', ?, 1)",
+            [("bench_admin", "Bench Admin", "Admin")]
+            + [(f"user{i}", f"Nguyễn Văn Người Dùng {i}", "User") for i in range(1, USERS)],
+        )
+        category_ids = [row[0] for row in conn.execute("SELECT id FROM ticket_categories")] or [None]
+        start = datetime(2023, 1, 1)
+        batch = []
+        for i in range(count):
+            created = start + timedelta(minutes=5 * i + rng.randint(0, 4))
+            status = rng.choice(STATUSES)
+            resolved = created + timedelta(hours=rng.randint(1, 72)) if status == "Resolved" else None
+            batch.append((
+                f"Sự cố #{i}: máy tính phòng {rng.randint(100, 999)} không vào được mạng",
+                "Mô tả chi tiết sự cố " * 5,
+                rng.choice(category_ids),
+                str(rng.randint(1, 4)),
+                status,
+                "[]",
+                "Đã khởi động lại switch & cập nhật driver <LAN>" if resolved else None,
+                created.isoformat(sep=" "),
+                created.isoformat(sep=" "),
+                resolved.isoformat(sep=" ") if resolved else None,
+                rng.randint(1, USERS),
+                rng.randint(1, USERS) if status != "Open" else None,
+            ))
+            if len(batch) >= 10_000:
+                _insert(conn, batch)
+                batch = []
+        if batch:
+            _insert(conn, batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _insert(conn: sqlite3.Connection, rows):
+    conn.executemany(
+        "INSERT INTO tickets (title, description, category_id, priority, status, attachments, resolution_note,"
+        " created_at, updated_at, resolved_at, requester_id, assignee_id)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+
+
+async def run_export(base: str, token: str, out_path: str) -> Dict[str, float]:
+    async with httpx.AsyncClient(timeout=None) as client:
+        started = time.perf_counter()
+        first_byte = None
+        size = 0
+        async with client.stream(
+            "GET", f"{base}/api/tickets/export", headers={"Authorization": f"Bearer {token}"}
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            with open(out_path, "wb") as out:
+                async for chunk in response.aiter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    size += len(chunk)
+                    out.write(chunk)
+        total = time.perf_counter() - started
+    return {"first_byte": first_byte or total, "total": total, "bytes": size}
+
+
+def verify(path: str) -> int:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    rows = sum(1 for _ in wb.active.iter_rows(values_only=True))
+    wb.close()
+    return rows - 1  # bỏ dòng header
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory(prefix="bench_ticket_export_") as workdir:
+        db_path = os.path.join(workdir, "app.db")
+        log_path = os.path.join(workdir, "app.log")
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        app = _spawn(
+            ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            env={
+                "DATABASE_URL": f"sqlite:///{db_path}",
+                "DATA_DIR": os.path.join(workdir, "data"),
+                "SECRET_KEY": SECRET_KEY,
+                # Không cần HR: trỏ vào cổng không có gì để khởi động không phải chờ
+                "HR_API_URL": "http://127.0.0.1:9/GetEmployeeList",
+            },
+            cwd=workdir,
+            log_path=log_path,
+        )
+        try:
+            await _wait_ready(f"{base}/api/employees/cache-status", app, log_path)
+            started = time.perf_counter()
+            await asyncio.to_thread(seed_tickets, db_path, args.count)
+            print(f"Seeded {args.count} tickets in {time.perf_counter() - started:.1f} s")
+
+            token = jwt.encode({"sub": "bench_admin"}, SECRET_KEY, algorithm="HS256")
+            idle = _rss_mb(app.pid)
+            out_path = os.path.join(workdir, "report.xlsx")
+            r = await run_export(base, token, out_path)
+            after = _rss_mb(app.pid)
+            rows = await asyncio.to_thread(verify, out_path) if args.verify else None
+        finally:
+            _stop(app)
+
+    print(f"GET /api/tickets/export  tickets={args.count}")
+    print(f"  first byte     : {r['first_byte'] * 1000:8.0f} ms")
+    print(f"  total          : {r['total']:8.2f} s  ({args.count / r['total']:.0f} rows/s)")
+    print(f"  file size      : {r['bytes'] / 1024 / 1024:8.1f} MB")
+    print(f"  app RSS before : {_fmt_mb(idle['rss'])} MB (peak {_fmt_mb(idle['peak'])} MB)")
+    print(f"  app RSS after  : {_fmt_mb(after['rss'])} MB (peak {_fmt_mb(after['peak'])} MB)")
+    if rows is not None:
+        print(f"  verify         : {rows} data rows read back ({'OK' if rows == args.count else 'MISMATCH'})")
+    if args.json:
+        print(json.dumps({"count": args.count, **r, "idle": idle, "after": after, "rows": rows}))
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark for GET /api/tickets/export")
+    parser.add_argument("-n", "--count", type=int, default=100_000, help="Tickets in the database")
+    parser.add_argument("--verify", action="store_true", help="Read the XLSX back with openpyxl and count rows")
+    parser.add_argument("--json", action="store_true", help="Also print the raw result as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
@@ -0,0 +1,166 @@
+"""
+Benchmark tìm kiếm ticket: search_tickets() (GET /api/tickets/search) trên SQLite FTS5.
+
+Tạo DB SQLite tạm, ghi thẳng N ticket + M bình luận (mặc định 200k / 1 triệu), dựng chỉ mục
+ticket_search, rồi chạy từng loại truy vấn nhiều lần và ghi lại p50 / p99 / max (ms):
+từ hiếm, từ phổ biến, nhiều từ, tiền tố, có bộ lọc status + khoảng ngày, phân quyền user thường.
+
+    cd backend && python -m benchmarks.bench_ticket_search
+    cd backend && python -m benchmarks.bench_ticket_search -n 20000 -c 100000 -r 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+USERS = 200
+STATUSES = ("Open", "In Progress", "Resolved", "Cancelled")
+DEVICES = ("máy in", "laptop", "màn hình", "bàn phím", "chuột", "switch", "router", "wifi", "ổ cứng", "camera")
+SYMPTOMS = ("không lên nguồn", "kẹt giấy", "mất mạng", "chạy chậm", "treo máy", "màn hình xanh",
+            "không nhận thiết bị", "báo lỗi driver", "mất kết nối VPN", "không đăng nhập được")
+REPLIES = ("Đã kiểm tra cáp mạng", "Đã khởi động lại thiết bị", "Cập nhật driver mới nhất",
+           "Thay linh kiện dự phòng", "Chờ nhà cung cấp bảo hành", "Người dùng xác nhận đã ổn",
+           "Vẫn còn lỗi, nhờ IT xem lại", "Đã cài lại Windows", "Đã reset mật khẩu", "Hẹn kiểm tra chiều nay")
+
+
+def seed(db_path: str, tickets: int, comments: int, seed: int = 0):
+    """Ghi user + ticket + bình luận giả lập. Mỗi ticket có 1 mã serial riêng (SN...) để thử từ hiếm."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany(
+            "INSERT INTO users (username, full_name, hashed_password, role, is_active) VALUES (?, ?, '', ?, 1)",
+            [(f"user{i}", f"Người Dùng {i}", "User") for i in range(1, USERS + 1)],
+        )
+        start = datetime(2023, 1, 1)
+        batch = []
+        for i in range(tickets):
+            created = start + timedelta(minutes=5 * i)
+            status = rng.choice(STATUSES)
+            batch.append((
+                f"{rng.choice(DEVICES).capitalize()} phòng {rng.randint(100, 999)} {rng.choice(SYMPTOMS)}",
+                f"Thiết bị SN{i:07d} {rng.choice(SYMPTOMS)} từ sáng, đã thử {rng.choice(REPLIES).lower()}",
+                str(rng.randint(1, 4)),
+                status,
+                "[]",
+                rng.choice(REPLIES) if status == "Resolved" else None,
+                created.isoformat(sep=" "),
+                rng.randint(1, USERS),
+            ))
+            if len(batch) >= 20_000:
+                _insert_tickets(conn, batch)
+                batch = []
+        if batch:
+            _insert_tickets(conn, batch)
+
+        batch = []
+        for _ in range(comments):
+            ticket_id = rng.randint(1, tickets)
+            batch.append((ticket_id, rng.randint(1, USERS), f"{rng.choice(REPLIES)} ({rng.choice(DEVICES)})"))
+            if len(batch) >= 50_000:
+                _insert_comments(conn, batch)
+                batch = []
+        if batch:
+            _insert_comments(conn, batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _insert_tickets(conn: sqlite3.Connection, rows):
+    conn.executemany(
+        "INSERT INTO tickets (title, description, priority, status, attachments, resolution_note,"
+        " created_at, requester_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+
+
+def _insert_comments(conn: sqlite3.Connection, rows):
+    conn.executemany(
+        "INSERT INTO ticket_comments (ticket_id, user_id, content, type, created_at)"
+        " VALUES (?, ?, ?, 'Comment', CURRENT_TIMESTAMP)",
+        rows,
+    )
+
+
+def _percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main(args):
+    with tempfile.TemporaryDirectory(prefix="bench_ticket_search_") as workdir:
+        # Cấu hình DB phải có trước khi import app
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+        os.environ["DATA_DIR"] = os.path.join(workdir, "data")
+        from app import models
+        from app.database import SessionLocal, engine
+        from app.services.ticket_search_service import ensure_search_index, rebuild_search_index, search_tickets
+
+        models.Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        seed(os.path.join(workdir, "app.db"), args.tickets, args.comments)
+        print(f"Seeded {args.tickets} tickets / {args.comments} comments in {time.perf_counter() - started:.1f} s")
+
+        db = SessionLocal()
+        try:
+            ensure_search_index(engine)
+            started = time.perf_counter()
+            rebuild_search_index(db)
+            build = time.perf_counter() - started
+            print(f"Built search index in {build:.1f} s")
+
+            end = date(2023, 1, 1) + timedelta(minutes=5 * args.tickets)
+            cases = [
+                ("rare (serial)", dict(q=f"SN{args.tickets // 2:07d}")),
+                ("common", dict(q="router")),
+                ("multi-term", dict(q="máy in kẹt giấy")),
+                ("prefix", dict(q="driv")),
+                ("no diacritics", dict(q="mat ket noi")),
+                ("status + dates", dict(q="wifi", status="Resolved",
+                                        start_date=end - timedelta(days=90), end_date=end)),
+                ("requester", dict(q="laptop", requester_id=7)),
+                ("page 10", dict(q="router", offset=200)),
+                ("no match", dict(q="zzzkhongco")),
+            ]
+            results = {}
+            print(f"search_tickets  tickets={args.tickets} comments={args.comments} runs={args.runs}")
+            for name, params in cases:
+                search_tickets(db, **params)  # warm-up
+                times = []
+                for _ in range(args.runs):
+                    t = time.perf_counter()
+                    found = search_tickets(db, **params)
+                    times.append((time.perf_counter() - t) * 1000)
+                    db.expunge_all()
+                results[name] = {
+                    "p50": _percentile(times, 50), "p99": _percentile(times, 99), "max": max(times),
+                    "hits": len(found["items"]),
+                }
+                r = results[name]
+                print(f"  {name:<16}: p50 {r['p50']:7.1f} ms  p99 {r['p99']:7.1f} ms  "
+                      f"max {r['max']:7.1f} ms  ({r['hits']} hits)")
+        finally:
+            db.close()
+            engine.dispose()
+
+    if args.json:
+        print(json.dumps({"tickets": args.tickets, "comments": args.comments, "build": build, "cases": results}))
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark for GET /api/tickets/search")
+    parser.add_argument("-n", "--tickets", type=int, default=200_000, help="Tickets in the database")
+    parser.add_argument("-c", "--comments", type=int, default=1_000_000, help="Comments in the database")
+    parser.add_argument("-r", "--runs", type=int, default=100, help="Runs per query")
+    parser.add_argument("--json", action="store_true", help="Also print the raw result as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(_parse_args()))
@@ -0,0 +1,188 @@
+"""
+Benchmark nhập ảnh hàng loạt: POST /api/upload-zip với 1 file ZIP N ảnh (mặc định 5000).
+
+Dựng ZIP từ vài ảnh chân dung giả lập (bench_photo_profiles.make_sample) lặp lại dưới N mã khác nhau,
+bật 1 process app mới (uvicorn, thư mục ảnh / dữ liệu tạm) rồi gửi ZIP dạng stream và đọc kết quả NDJSON.
+Ghi lại: thời gian nhận file, thời gian xử lý, số ảnh/giây, RSS của process app và các process xử lý ảnh.
+
+    cd backend && python -m benchmarks.bench_zip_import
+    cd backend && python -m benchmarks.bench_zip_import -n 500 --size 3000x4000 --workers 4
+
+Chỉ đọc RSS được trên Linux (/proc).
+"""
+import os
+import json
+import time
+import asyncio
+import zipfile
+import argparse
+import tempfile
+from typing import List, Dict
+
+import httpx
+
+from benchmarks.bench_employees_load import _free_port, _spawn, _stop, _wait_ready, _rss_mb, _fmt_mb
+from benchmarks.bench_photo_profiles import make_sample
+
+FIRST_ID = 20_000_000
+READ_CHUNK = 1024 * 1024
+
+
+def build_archive(path: str, count: int, size, distinct: int, workdir: str):
+    samples = []
+    for seed in range(min(distinct, count)):
+        sample_path = os.path.join(workdir, f"sample_{seed}.jpg")
+        make_sample(sample_path, seed, size)
+        with open(sample_path, "rb") as f:
+            samples.append(f.read())
+        os.remove(sample_path)
+    # Ảnh JPEG đã nén sẵn -> ZIP_STORED như phần lớn công cụ nén khi gặp ảnh
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i in range(count):
+            zf.writestr(f"photos/{FIRST_ID + i}.jpg", samples[i % len(samples)])
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+async def _watch_workers(pid: int, peaks: Dict[int, float], stop: asyncio.Event):
+    """VmHWM của process con (pool xử lý ảnh) chỉ đọc được khi process còn sống -> lấy mẫu định kỳ."""
+    while not stop.is_set():
+        for child in _children(pid):
+            peak = _rss_mb(child)["peak"]
+            if peak is not None:
+                peaks[child] = max(peaks.get(child, 0.0), peak)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _iter_file(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, READ_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def run_import(base: str, zip_path: str, app_pid: int) -> Dict[str, object]:
+    peaks: Dict[int, float] = {}
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(_watch_workers(app_pid, peaks, stop))
+    results, summary, first_result = 0, None, None
+    try:
+        async with httpx.AsyncClient(timeout=None) as client:
+            started = time.perf_counter()
+            async with client.stream(
+                "POST",
+                f"{base}/api/upload-zip",
+                content=_iter_file(zip_path),
+                headers={"Content-Type": "application/zip", "X-User-Role": "hr"},
+            ) as response:
+                # Header về sau khi server đã nhận hết file ZIP và mở được mục lục
+                received = time.perf_counter() - started
+                if response.status_code != 200:
+                    await response.aread()
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("done"):
+                        summary = data
+                    else:
+                        results += 1
+                        if first_result is None:
+                            first_result = time.perf_counter() - started
+            total = time.perf_counter() - started
+    finally:
+        stop.set()
+        await watcher
+    return {
+        "received": received,
+        "first_result": first_result,
+        "total": total,
+        "results": results,
+        "summary": summary,
+        "app": _rss_mb(app_pid),
+        "worker_peak": max(peaks.values()) if peaks else None,
+    }
+
+
+async def main(args):
+    width, height = args.size
+    with tempfile.TemporaryDirectory(prefix="bench_zip_import_") as workdir:
+        zip_path = os.path.join(workdir, "photos.zip")
+        started = time.perf_counter()
+        await asyncio.to_thread(build_archive, zip_path, args.count, args.size, args.distinct, workdir)
+        archive_mb = os.path.getsize(zip_path) / 1024 / 1024
+        print(
+            f"Archive: {args.count} photos {width}x{height} JPEG, {archive_mb:.0f} MB "
+            f"(built in {time.perf_counter() - started:.0f} s)"
+        )
+
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        log_path = os.path.join(workdir, "app.log")
+        env = {
+            "EMPLOYEE_IMAGES_DIR": os.path.join(workdir, "images"),
+            "PHOTO_DERIVATIVES_DIR": os.path.join(workdir, "derivatives"),
+            "DATA_DIR": os.path.join(workdir, "data"),
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'app.db')}",
+            # Không cần HR: trỏ vào cổng không có gì để khởi động không phải chờ
+            "HR_API_URL": "http://127.0.0.1:9/GetEmployeeList",
+        }
+        if args.workers:
+            env["PHOTO_WORKERS"] = str(args.workers)
+        os.makedirs(env["EMPLOYEE_IMAGES_DIR"])
+        app = _spawn(
+            ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            env=env,
+            cwd=workdir,
+            log_path=log_path,
+        )
+        try:
+            await _wait_ready(f"{base}/api/employees/cache-status", app, log_path)
+            r = await run_import(base, zip_path, app.pid)
+            saved_files = len(os.listdir(env["EMPLOYEE_IMAGES_DIR"]))
+        finally:
+            _stop(app)
+
+    summary = r["summary"] or {}
+    processing = r["total"] - r["received"]
+    print(f"  upload + spool : {r['received']:8.1f} s  ({archive_mb / r['received']:.0f} MB/s)")
+    print(f"  first result   : {r['first_result'] or 0:8.1f} s")
+    print(f"  processing     : {processing:8.1f} s  ({r['results'] / processing:.1f} photos/s)")
+    print(f"  end to end     : {r['total']:8.1f} s  ({r['results'] / r['total']:.1f} photos/s)")
+    print(
+        f"  results        : {r['results']} lines, saved={summary.get('saved')} "
+        f"failed={summary.get('failed')}, files on disk={saved_files}"
+    )
+    print(f"  app RSS / peak : {_fmt_mb(r['app']['rss'])} / {_fmt_mb(r['app']['peak'])} MB")
+    print(f"  worker peak    : {_fmt_mb(r['worker_peak'])} MB (largest photo process)")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark for POST /api/upload-zip")
+    parser.add_argument("-n", "--count", type=int, default=5000, help="Photos in the archive")
+    parser.add_argument(
+        "--size",
+        type=lambda s: tuple(int(x) for x in s.lower().split("x")),
+        default=(1500, 2000),
+        help="Photo size WxH (default 1500x2000)",
+    )
+    parser.add_argument("--distinct", type=int, default=16, help="Distinct sample images reused in the archive")
+    parser.add_argument("--workers", type=int, default=None, help="PHOTO_WORKERS for the app")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
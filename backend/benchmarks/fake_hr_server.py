@@ -0,0 +1,133 @@
+"""
+HR Server giả (thay cho gwhrWebService.asmx/GetEmployeeList) để chạy thử / benchmark
+đường /api/employees mà không cần HR thật.
+
+- Trả đúng dạng .asmx: {"d": "<JSON đã escape thành chuỗi>"} (xem hr_fixture.make_payload)
+- Số nhân viên tùy ý, có thể thêm độ trễ và lỗi ngẫu nhiên
+- Đổi cấu hình lúc đang chạy: GET/POST /__config?employees=10000&latency_ms=200&error_rate=0.1
+
+    cd backend && python -m benchmarks.fake_hr_server --employees 10000 --port 9100
+    HR_API_URL=http://127.0.0.1:9100/pidn/api/gwhrWebService.asmx/GetEmployeeList uvicorn app.main:app
+
+Kiểu lỗi (error_kind):
+- http     : trả HTTP error_status (mặc định 500)
+- failure  : HTTP 200 nhưng {"success": false}
+- truncated: HTTP 200, body bị cắt giữa chừng
+- hang     : giữ kết nối hang_seconds giây rồi mới trả (để thử timeout)
+"""
+import json
+import random
+import asyncio
+import argparse
+from typing import Dict, Any, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+from benchmarks.hr_fixture import make_payload
+
+HR_PATH = "/pidn/api/gwhrWebService.asmx/GetEmployeeList"
+ERROR_KINDS = ("http", "failure", "truncated", "hang")
+
+# Cấu hình hiện tại (đổi qua /__config)
+CONFIG: Dict[str, Any] = {
+    "employees": 1000,
+    "seed": 1,
+    "latency_ms": 0.0,
+    "error_rate": 0.0,
+    "error_kind": "http",
+    "error_status": 500,
+    "hang_seconds": 60.0,
+}
+
+# Payload đã sinh theo (employees, seed): sinh 100k mất vài giây, chỉ làm 1 lần
+_PAYLOADS: Dict[Tuple[int, int], bytes] = {}
+STATS = {"requests": 0, "errors": 0}
+
+app = FastAPI(title="Fake HR Server")
+
+
+def get_payload(employees: int, seed: int) -> bytes:
+    key = (employees, seed)
+    payload = _PAYLOADS.get(key)
+    if payload is None:
+        _PAYLOADS.clear()  # chỉ giữ bản đang dùng
+        payload = make_payload(employees, seed).encode("utf-8")
+        _PAYLOADS[key] = payload
+    return payload
+
+
+def _coerce(name: str, value: str):
+    if name not in CONFIG:
+        raise KeyError(name)
+    if name == "error_kind":
+        if value not in ERROR_KINDS:
+            raise ValueError(f"error_kind must be one of {ERROR_KINDS}")
+        return value
+    return type(CONFIG[name])(value)
+
+
+@app.api_route("/__config", methods=["GET", "POST"])
+async def configure(request: Request):
+    changes = dict(request.query_params)
+    try:
+        updated = {name: _coerce(name, value) for name, value in changes.items()}
+    except (KeyError, ValueError) as e:
+        return Response(status_code=400, content=f"Invalid config: {e}")
+    CONFIG.update(updated)
+    # Sinh sẵn payload ngay khi đổi cấu hình (không tính vào thời gian gọi HR)
+    payload = await asyncio.to_thread(get_payload, CONFIG["employees"], CONFIG["seed"])
+    return {**CONFIG, "payload_bytes": len(payload), **STATS}
+
+
+@app.post(HR_PATH)
+async def get_employee_list():
+    STATS["requests"] += 1
+    if CONFIG["latency_ms"] > 0:
+        await asyncio.sleep(CONFIG["latency_ms"] / 1000)
+
+    payload = get_payload(CONFIG["employees"], CONFIG["seed"])
+    if CONFIG["error_rate"] > 0 and random.random() < CONFIG["error_rate"]:
+        STATS["errors"] += 1
+        kind = CONFIG["error_kind"]
+        if kind == "http":
+            return Response(
+                status_code=CONFIG["error_status"],
+                content="System.InvalidOperationException: Fake HR error",
+                media_type="text/plain",
+            )
+        if kind == "failure":
+            inner = json.dumps({"success": False, "message": "Fake HR error", "data": []})
+            return Response(content=json.dumps({"d": inner}), media_type="application/json")
+        if kind == "truncated":
+            return Response(content=payload[: len(payload) // 2], media_type="application/json")
+        await asyncio.sleep(CONFIG["hang_seconds"])
+
+    return Response(content=payload, media_type="application/json; charset=utf-8")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--employees", type=int, default=CONFIG["employees"])
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--error-kind", choices=ERROR_KINDS, default=CONFIG["error_kind"])
+    args = parser.parse_args()
+
+    CONFIG.update(
+        employees=args.employees,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        error_kind=args.error_kind,
+    )
+    get_payload(CONFIG["employees"], CONFIG["seed"])
+    print(f" Fake HR: {CONFIG['employees']} employees at http://{args.host}:{args.port}{HR_PATH}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Sinh response giả của HR Server (.asmx) để benchmark / chạy thử.
+
+    python -m benchmarks.hr_fixture 100000 /tmp/hr_100k.json
+"""
+import sys
+import json
+import random
+
+_LAST = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng"]
+_MIDDLE = ["Văn", "Thị", "Hữu", "Ngọc", "Minh", "Thanh", "Đức", "Quốc"]
+_FIRST = ["An", "Bình", "Cường", "Dũng", "Đào", "Giang", "Hạnh", "Khoa", "Linh", "Yến"]
+_DEPARTMENTS = [f"Phòng {name}" for name in ("Sản Xuất", "Kho", "QA", "Nhân Sự", "Kế Toán", "IT")] + [
+    f"Line {i:02d}" for i in range(1, 35)
+]
+
+
+def _date(r: random.Random, start_year: int, end_year: int, style: int) -> str:
+    y, m, d = r.randint(start_year, end_year), r.randint(1, 12), r.randint(1, 28)
+    # Mỗi cột HR trả 1 kiểu định dạng riêng (cột này DD/MM/YYYY, cột kia ISO có giờ...)
+    if style == 0:
+        return f"{d:02d}/{m:02d}/{y}"
+    if style == 1:
+        return f"{y}-{m:02d}-{d:02d}T00:00:00"
+    return f"{y}-{m:02d}-{d:02d}"
+
+
+def make_raw_employees(n: int, seed: int = 1):
+    r = random.Random(seed)
+    for i in range(n):
+        yield {
+            "id": str(i + 1),
+            "employee_id": f"NV{i:06d}",
+            "employee_old_id": f"OLD{i:05d}" if i % 7 == 0 else "",
+            "employee_name": f"{r.choice(_LAST)} {r.choice(_MIDDLE)} {r.choice(_FIRST)}",
+            "employee_department": r.choice(_DEPARTMENTS),
+            "employee_position": r.choice(["Công nhân", "Tổ trưởng", "Nhân viên", ""]),
+            "employee_status": "Active" if i % 9 else "Resigned",
+            "employee_type": r.choice(["Worker", "Staff"]),
+            "employee_gender": r.choice(["Nam", "Nữ"]),
+            "employee_birth_date": _date(r, 1970, 2005, 0),
+            "employee_join_date": _date(r, 2010, 2025, 1),
+            "employee_left_date": "" if i % 9 else _date(r, 2020, 2025, 1),
+            "contract_type": r.choice(["Xác định thời hạn", "Không xác định thời hạn"]),
+            "contract_id": f"HD-{i:06d}",
+            "contract_begin": _date(r, 2015, 2025, 2),
+            "contract_end": _date(r, 2025, 2030, 0),
+            "maternity_type": r.choice(["", "", "", "Pregnancy", "HasBaby"]),
+            "maternity_begin": "",
+            "maternity_end": "",
+        }
+
+
+def make_payload(n: int, seed: int = 1) -> str:
+    """Response .asmx: {"d": "<JSON đã escape thành chuỗi>"} (ASCII-escape như ASP.NET)."""
+    inner = json.dumps({"success": True, "data": list(make_raw_employees(n, seed))})
+    return json.dumps({"d": inner})
+
+
+def write_payload(path: str, n: int, seed: int = 1) -> int:
+    payload = make_payload(n, seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(payload)
+    return len(payload)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    target = sys.argv[2] if len(sys.argv) > 2 else f"hr_{count}.json"
+    size = write_payload(target, count)
+    print(f"Wrote {count} employees ({size / 1024 / 1024:.1f} MB) to {target}")
@@ -24,12 +24,15 @@ const MyTickets = () => {
     pageSize: 8,
     total: 0,
   });
+  // Cursor trang sau / trang trước do API trả về (sang trang kề bên không cần OFFSET)
+  const [cursors, setCursors] = useState({ next: null, prev: null });
 
   // --- 1. Fetch Data ---
-  const fetchTickets = async (page = 1, pageSize = 8) => {
+  const fetchTickets = async (page = 1, pageSize = 8, cursor = null) => {
     setLoading(true);
     try {
       const params = { page, size: pageSize };
+      if (cursor) params.cursor = cursor;
       const res = await axiosClient.get('/tickets/my-tickets', { params });
 
       // Xử lý dữ liệu trả về từ API phân trang
@@ -40,6 +43,7 @@ const MyTickets = () => {
           pageSize: res.data.size,
           total: res.data.total,
         });
+        setCursors({ next: res.data.next_cursor, prev: res.data.prev_cursor });
       } else {
         // Fallback nếu API trả về mảng (chưa update backend)
         const safeData = Array.isArray(res) ? res : res?.data || [];
@@ -60,7 +64,13 @@ const MyTickets = () => {
 
   // Xử lý khi chuyển trang
   const handleTableChange = (newPagination) => {
-    fetchTickets(newPagination.current, newPagination.pageSize);
+    const { current, pageSize } = newPagination;
+    let cursor = null;
+    if (pageSize === pagination.pageSize) {
+      if (current === pagination.current + 1) cursor = cursors.next;
+      if (current === pagination.current - 1) cursor = cursors.prev;
+    }
+    fetchTickets(current, pageSize, cursor);
   };
 
   // --- 2. Columns Definition ---
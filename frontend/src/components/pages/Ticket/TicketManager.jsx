@@ -51,15 +51,18 @@ const TicketManager = () => {
     status: 'All',
     priority: 'All',
   });
+  // Cursor trang sau / trang trước do API trả về (sang trang kề bên không cần OFFSET)
+  const [cursors, setCursors] = useState({ next: null, prev: null });
 
   // --- 1. Fetch Data ---
-  const fetchTickets = async (page = 1, pageSize = 10) => {
+  const fetchTickets = async (page = 1, pageSize = 10, cursor = null) => {
     setLoading(true);
     try {
       const params = {
         page: page,
         size: pageSize,
       };
+      if (cursor) params.cursor = cursor;
 
       if (filters.status !== 'All') params.status = filters.status;
       if (filters.priority !== 'All') params.priority = filters.priority;
@@ -73,6 +76,7 @@ const TicketManager = () => {
           pageSize: res.data.size || 10,
           total: res.data.total || 0,
         });
+        setCursors({ next: res.data.next_cursor, prev: res.data.prev_cursor });
       } else {
         setTickets([]);
       }
@@ -90,7 +94,13 @@ const TicketManager = () => {
 
   // --- 2. Xử lý khi người dùng bấm chuyển trang ---
   const handleTableChange = (newPagination) => {
-    fetchTickets(newPagination.current, newPagination.pageSize);
+    const { current, pageSize } = newPagination;
+    let cursor = null;
+    if (pageSize === pagination.pageSize) {
+      if (current === pagination.current + 1) cursor = cursors.next;
+      if (current === pagination.current - 1) cursor = cursors.prev;
+    }
+    fetchTickets(current, pageSize, cursor);
   };
 
   // --- 3. Action: Assign to Me ---
@@ -94,8 +94,19 @@ const TicketReports = () => {
       // Lúc này params sẽ là {} hoặc {start_date: "...", end_date: "..."}
       // Không bao giờ bị {start_date: null} -> Backend sẽ không báo lỗi 422 nữa.
 
-      const response = await axiosClient.get('/tickets/export', {
-        params,
+      // --- 2. TẠO FILE CHẠY NỀN: gửi yêu cầu -> hỏi trạng thái tới khi xong ---
+      // (khoảng ngày đã xuất trước đó mà dữ liệu chưa đổi -> server trả file có sẵn ngay)
+      let job = (await axiosClient.post('/tickets/export-jobs', null, { params })).data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = (await axiosClient.get(`/tickets/export-jobs/${job.job_id}`)).data;
+      }
+      if (job.status !== 'completed') {
+        message.error(`Lỗi xuất file: ${job.error || job.status}`);
+        return;
+      }
+
+      const response = await axiosClient.get(`/tickets/export-jobs/${job.job_id}/download`, {
         responseType: 'blob', // Quan trọng: Nhận dữ liệu nhị phân
       });
 
@@ -26,6 +26,7 @@ import {
   FileImageOutlined,
   SyncOutlined,
   LoadingOutlined,
+  FileZipOutlined,
 } from '@ant-design/icons';
 
 // IMPORT PERMISSIONS
@@ -36,12 +37,20 @@ import { useEmployees } from '../../../context/useEmployees';
 const { Title, Text, Paragraph } = Typography;
 const { Dragger } = Upload;
 
+// Chu kỳ hỏi tiến độ job đồng bộ ảnh (ms)
+const SYNC_POLL_INTERVAL = 1500;
+
 const UploadPage = () => {
   const [fileList, setFileList] = useState([]);
   const [uploading, setUploading] = useState(false);
 
   // 🆕 STATE CHO NÚT SYNC
   const [syncing, setSyncing] = useState(false);
+  const [syncProgress, setSyncProgress] = useState(null);
+
+  // 🆕 STATE NHẬP ẢNH TỪ FILE ZIP
+  const [importing, setImporting] = useState(false);
+  const [importProgress, setImportProgress] = useState(null);
 
   // --- LẤY DANH SÁCH NHÂN VIÊN TỪ CONTEXT ---
   const { employees, fetchEmployees, isLoaded } = useEmployees();
@@ -68,23 +77,43 @@ const UploadPage = () => {
   // ------------------------------------------------------------------
   const handleSyncOldPhotos = async () => {
     setSyncing(true);
+    setSyncProgress(null);
     try {
       const token = localStorage.getItem('token');
+      const headers = {
+        'Content-Type': 'application/json',
+        Authorization: `Bearer ${token}`,
+        'X-User-Role': user.role, // Gửi role để backend check quyền Admin
+      };
+
+      // 1. Tạo job chạy nền (hoặc chạy tiếp job dở dang) -> nhận job_id
       const response = await fetch(`${baseUrl}/sync-old-photos`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          Authorization: `Bearer ${token}`,
-          'X-User-Role': user.role, // Gửi role để backend check quyền Admin
-        },
+        headers,
       });
 
-      const data = await response.json();
+      let data = await response.json();
 
       if (!response.ok) {
         throw new Error(data.detail || 'Lỗi kết nối Server');
       }
 
+      // 2. Theo dõi tiến độ đến khi job xong
+      while (data.status !== 'completed' && data.status !== 'failed') {
+        setSyncProgress(data);
+        await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_INTERVAL));
+        const poll = await fetch(`${baseUrl}/sync-old-photos/${data.job_id}`, { headers });
+        const polled = await poll.json();
+        if (!poll.ok) {
+          throw new Error(polled.detail || 'Lỗi kết nối Server');
+        }
+        data = polled;
+      }
+
+      if (data.status === 'failed') {
+        throw new Error(data.error || 'Đồng bộ ảnh thất bại');
+      }
+
       // Thông báo kết quả
       if (data.synced_count > 0) {
         notification.success({
@@ -111,6 +140,95 @@ const UploadPage = () => {
       });
     } finally {
       setSyncing(false);
+      setSyncProgress(null);
+    }
+  };
+
+  // ------------------------------------------------------------------
+  // 🆕 NHẬP ẢNH HÀNG LOẠT TỪ 1 FILE ZIP
+  // Gửi nguyên file ZIP, server trả kết quả từng ảnh (mỗi dòng 1 JSON) ngay khi xử lý xong
+  // ------------------------------------------------------------------
+  const handleImportZip = async (file) => {
+    setImporting(true);
+    setImportProgress({ processed: 0, failed: 0 });
+    try {
+      const response = await fetch(`${baseUrl}/upload-zip`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/zip',
+          Authorization: `Bearer ${localStorage.getItem('token')}`,
+          'X-User-Role': user.role,
+        },
+        body: file,
+      });
+
+      if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || 'Lỗi kết nối Server');
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      const errors = [];
+      let summary = null;
+      let processed = 0;
+      let buffer = '';
+
+      const handleLine = (line) => {
+        if (!line.trim()) return;
+        const item = JSON.parse(line);
+        if (item.done) {
+          summary = item;
+          return;
+        }
+        processed += 1;
+        if (item.error) errors.push(`${item.filename}: ${item.error}`);
+      };
+
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
+        setImportProgress({ processed, failed: errors.length });
+      }
+      handleLine(buffer);
+
+      if (!summary) {
+        throw new Error('Kết nối bị ngắt trước khi nhập xong');
+      }
+
+      const notify = summary.failed > 0 ? notification.warning : notification.success;
+      notify({
+        message: `Đã nhập ${summary.saved} / ${summary.total} ảnh`,
+        description: errors.length > 0 && (
+          <div>
+            {errors.slice(0, 10).map((err) => (
+              <div key={err}>
+                <Text type="danger" style={{ fontSize: 12 }}>
+                  {err}
+                </Text>
+              </div>
+            ))}
+            {errors.length > 10 && (
+              <Text type="secondary" style={{ fontSize: 12 }}>
+                ... và {errors.length - 10} lỗi khác
+              </Text>
+            )}
+          </div>
+        ),
+        duration: 10,
+      });
+    } catch (error) {
+      notification.error({
+        message: 'Nhập ảnh từ ZIP thất bại',
+        description: error.message,
+      });
+    } finally {
+      setImporting(false);
+      setImportProgress(null);
     }
   };
 
@@ -235,12 +353,28 @@ const UploadPage = () => {
   const antIcon = <LoadingOutlined style={{ fontSize: 40 }} spin />;
   return (
     <Spin
-      spinning={syncing}
+      spinning={syncing || importing}
       indicator={antIcon}
       tip={
-        <div style={{ marginTop: 15, fontWeight: 600 }}>
-          Hệ thống đang quét và đồng bộ ảnh... Vui lòng đợi!
-        </div>
+        importing ? (
+          <div style={{ marginTop: 15, fontWeight: 600 }}>
+            Đang nhập ảnh từ file ZIP... Vui lòng đợi!
+            {importProgress && importProgress.processed > 0 && (
+              <div style={{ fontWeight: 400 }}>
+                Đã xử lý {importProgress.processed} ảnh ({importProgress.failed} lỗi)
+              </div>
+            )}
+          </div>
+        ) : (
+          <div style={{ marginTop: 15, fontWeight: 600 }}>
+            Hệ thống đang quét và đồng bộ ảnh... Vui lòng đợi!
+            {syncProgress && syncProgress.total > 0 && (
+              <div style={{ fontWeight: 400 }}>
+                {syncProgress.processed} / {syncProgress.total}
+              </div>
+            )}
+          </div>
+        )
       }
       size="large"
     >
@@ -284,6 +418,27 @@ const UploadPage = () => {
                 Sync Old Photos
               </Button>
             )}
+
+            {/* 🆕 NÚT NHẬP ẢNH TỪ FILE ZIP */}
+            {canUpload && (
+              <Upload
+                accept=".zip"
+                showUploadList={false}
+                disabled={importing || syncing}
+                beforeUpload={(file) => {
+                  handleImportZip(file);
+                  return false; // Tự gửi bằng fetch, không để Upload gửi multipart
+                }}
+              >
+                <Button
+                  icon={<FileZipOutlined />}
+                  loading={importing}
+                  title="Nhập nhiều ảnh cùng lúc từ 1 file ZIP (tên file là Mã NV)"
+                >
+                  Import ZIP
+                </Button>
+              </Upload>
+            )}
           </Flex>
         </Flex>
 